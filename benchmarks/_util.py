@@ -0,0 +1,32 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks always run against a scratch data directory: TRACKME_HOME (and
+HOME, for anything that looks there) is pointed at a temporary directory
+*before* trackme is imported, so ~/.trackme is never touched.
+"""
+import os
+import statistics
+import tempfile
+import time
+
+def scratch_home(data_dir=None):
+    """Point trackme at data_dir (default: inside a fresh temporary HOME); returns HOME."""
+    home = tempfile.mkdtemp(prefix='trackme-bench-')
+    os.environ['HOME'] = home
+    os.environ['TRACKME_HOME'] = os.path.abspath(data_dir) if data_dir else os.path.join(home, '.trackme')
+    return home
+
+def timed(fn, n):
+    """Call fn() n times and return per-call latencies in microseconds."""
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1e6)
+    return out
+
+def summarize(name, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f'{name:<40} median {statistics.median(samples):9.1f}us   p99 {p99:9.1f}us   n={len(samples)}')
+    return {'name': name, 'median_us': statistics.median(samples), 'p99_us': p99, 'n': len(samples)}
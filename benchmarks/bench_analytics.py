@@ -0,0 +1,100 @@
+"""Columnar `trackme stats`: load, cache and compute times per backend.
+
+    python -m benchmarks.bench_analytics [--rows 1000000] [--per-day 100] [--budget-ms 1000]
+
+Fills the scratch database with --rows tasks in one INSERT ... SELECT (about
+14s per million rows here; --rows 10000000 is the 10M target), then, in a
+fresh process per backend (numpy, and TRACKME_NUMPY=0 for array):
+
+  load      query the whole history into columns
+  write     write the analytics.cols cache
+  cached    map the cache and compute every statistic (median of 5)
+  one year  compute over a one-year slice of the mapped snapshot
+
+Exits non-zero if the backends disagree, if the category totals differ from
+`report`, or if cached stats with NumPy exceed --budget-ms.
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+from ._util import scratch_home
+
+FILL_SQL = """WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < ?1 - 1)
+INSERT INTO tasks (task_name, category, notes, start_ts, end_ts, utc_offset, day, duration, status)
+SELECT 'task ' || (i % 997), CASE i % 7 WHEN 0 THEN 'work' WHEN 1 THEN 'meetings' WHEN 2 THEN 'email'
+    WHEN 3 THEN 'review' WHEN 4 THEN 'admin' WHEN 5 THEN 'learning' ELSE '' END, '', s, s + d, 0, s / 86400, d, 'completed'
+FROM (SELECT i, (?2 + i / ?3) * 86400 + 28800 + (i % ?3) * 300 AS s, 60 + (i * 7919) % 5400 AS d FROM n)"""
+START = '2000-01-01'
+
+def measure():
+    """Run in a child process: time one backend and print a JSON line."""
+    import statistics
+    from trackme import analytics, report, storage
+    t0 = time.perf_counter()
+    snap = analytics.load(*storage.day_range())
+    t1 = time.perf_counter()
+    analytics.write_cache(snap)
+    t2 = time.perf_counter()
+    runs = []
+    for _ in range(5):
+        t = time.perf_counter()
+        stats = analytics.compute(analytics.snapshot(cache=True))
+        runs.append(time.perf_counter() - t)
+    t = time.perf_counter()
+    analytics.compute(snap, '2001-01-01', '2001-12-31')
+    year = time.perf_counter() - t
+    stats.pop('backend')
+    by_category = {r['key']: r['total'] for r in report.run_report(None, None)}
+    print(json.dumps({'backend': analytics.backend(), 'rows': len(snap), 'load': t1 - t0, 'write': t2 - t1,
+                      'cached': statistics.median(runs), 'year': year,
+                      'digest': hashlib.md5(json.dumps(stats).encode()).hexdigest(),
+                      'matches_report': {c['category']: c['total'] for c in stats['categories']} == by_category}))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rows', type=int, default=1000000)
+    ap.add_argument('--per-day', type=int, default=100)
+    ap.add_argument('--budget-ms', type=float, default=1000)
+    ap.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.measure:
+        return measure()
+    scratch_home()
+    from trackme import storage
+    t0 = time.perf_counter()
+    with storage.transaction() as conn:
+        conn.execute(FILL_SQL, (args.rows, storage.day_number(START), args.per_day))
+    storage.close()
+    print(f'{args.rows} tasks from {START} ({args.per_day}/day) in {time.perf_counter() - t0:.1f}s, '
+          f'trackme.db {os.path.getsize(storage.DB_FILE) / 2**20:.0f} MiB')
+    results = []
+    for numpy in ('1', '0'):
+        out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_analytics', '--measure'],
+                             env=dict(os.environ, TRACKME_NUMPY=numpy), capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout)
+        if results and r['backend'] == results[0]['backend']:
+            continue    # NumPy is not installed: one backend only
+        results.append(r)
+        print(f"{r['backend']:<6} load {r['load']:7.2f}s   write {r['write'] * 1000:7.1f}ms   "
+              f"cached {r['cached'] * 1000:7.1f}ms   one year {r['year'] * 1000:7.1f}ms")
+    print(f"analytics.cols {os.path.getsize(storage.DB_DIR / 'analytics.cols') / 2**20:.0f} MiB")
+    failed = False
+    if len({r['digest'] for r in results}) != 1:
+        print('FAIL backends disagree')
+        failed = True
+    if not all(r['matches_report'] for r in results):
+        print('FAIL category totals differ from report')
+        failed = True
+    for r in results:
+        if r['backend'] == 'numpy' and r['cached'] * 1000 > args.budget_ms:
+            print(f"FAIL cached stats took {r['cached'] * 1000:.0f}ms (budget {args.budget_ms:.0f}ms)")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Hot/cold archival: size of trackme.db and view latency before and after.
+
+    python -m benchmarks.bench_archive [--years 4] [--per-day 40] [--batch-size 2000]
+
+Fills --years years up to 2024 with tasks, then archives everything before
+2024 with `trackme archive` (full VACUUM) and the first half of 2024 with a
+second run (incremental vacuum). Around each run it times viewday, viewweek,
+viewmonth, report, search, analyze and export on an archived and on a hot
+date, and checks that they return exactly what they did before archiving, that the hot and archive
+rollups match their tasks and that the journal still verifies. Exits
+non-zero on any mismatch.
+"""
+import argparse
+import datetime
+import os
+import random
+import subprocess
+import sys
+
+from ._util import scratch_home, timed, summarize
+
+OLD, NEW = '2022-06-15', '2024-09-16'
+
+def fill(storage, years, per_day):
+    rnd = random.Random(1)
+    cats = ['work', 'meetings', 'email', 'review', 'admin', 'learning', '']
+    rows, tid = [], 0
+    day, last = datetime.date(2025 - years, 1, 1), datetime.date(2024, 12, 31)
+    while day <= last:
+        for i in range(per_day):
+            tid += 1
+            start = datetime.datetime.combine(day, datetime.time(8)) + datetime.timedelta(minutes=10 * i)
+            dur = rnd.randint(60, 3600)
+            rows.append((tid, f'task {rnd.randint(1, 300)}', rnd.choice(cats), '', start.isoformat(),
+                         (start + datetime.timedelta(seconds=dur)).isoformat(), dur, day.isoformat(), 'completed'))
+        day += datetime.timedelta(days=1)
+    with storage.transaction() as conn:
+        conn.executemany(storage.INSERT_TASK_SQL, map(storage.task_row, rows))
+    return len(rows)
+
+def views(storage, report):
+    """name -> (callable, its result)."""
+    from trackme import bulk, intervals, search
+    calls = {
+        f'viewday {OLD} (archived)': lambda: storage.get_tasks_for_date(OLD),
+        f'viewday {NEW}': lambda: storage.get_tasks_for_date(NEW),
+        f'viewweek {OLD} (archived)': lambda: storage.get_weekly_summary(OLD),
+        'viewweek 2022-12-30 (two archives)': lambda: storage.get_weekly_summary('2022-12-30'),
+        'viewmonth 2022-06 (archived)': lambda: storage.get_monthly_summary(2022, 6),
+        'viewmonth 2024-09': lambda: storage.get_monthly_summary(2024, 9),
+        'report 2022 (archived)': lambda: report.run_report('2022-01-01', '2022-12-31'),
+        'report all': lambda: report.run_report(None, None),
+        # bm25 depends on each file's contents, so compare the matches, not their rank
+        'search 2022 (archived)': lambda: sorted(r['id'] for r in search.search('task 7', '2022-01-01', '2022-12-31', 10000)),
+        'search all': lambda: sorted(r['id'] for r in search.search('task 7', None, None, 10000)),
+        f'analyze {OLD} week (archived)': lambda: intervals.analyze('2022-06-13', '2022-06-19', clip=True),
+        'export 2022 (archived)': lambda: list(bulk.iter_tasks('2022-01-01', '2022-12-31')),
+    }
+    return {name: (fn, fn()) for name, fn in calls.items()}
+
+def check(name, ok, detail=''):
+    print(f"{'ok  ' if ok else 'FAIL'} {name}{': ' + detail if detail else ''}")
+    return ok
+
+def archive_consistent(storage):
+    import sqlite3
+    for year in sorted(storage.archived_years()):
+        conn = sqlite3.connect(storage.archive_path(year))
+        try:
+            actual = sorted(conn.execute(storage.ROLLUP_SOURCE_SQL).fetchall())
+            rollup = sorted(conn.execute('SELECT date, category, total, count FROM daily_rollup').fetchall())
+        finally:
+            conn.close()
+        if actual != rollup:
+            return False
+    return True
+
+def run_archive(before, batch):
+    out = subprocess.run([sys.executable, '-m', 'trackme.cli', 'archive', '--before', before, '--batch-size', str(batch)],
+                         env=dict(os.environ, TRACKME_DAEMON='0'), capture_output=True, text=True, check=True)
+    print(out.stdout.strip())
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--years', type=int, default=4)
+    ap.add_argument('--per-day', type=int, default=40)
+    ap.add_argument('--batch-size', type=int, default=2000)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage, report, journal
+    n = fill(storage, args.years, args.per_day)
+    storage.init_db()
+    storage.close()
+    before = views(storage, report)
+    print(f'{n} tasks, trackme.db {os.path.getsize(storage.DB_FILE) / 2**20:.1f} MiB')
+    for name, (fn, _) in before.items():
+        summarize(name, timed(fn, 20))
+    storage.close()
+
+    ok = True
+    for cut in ('2024-01-01', '2024-07-01'):
+        print(f'\n$ trackme archive --before {cut}')
+        run_archive(cut, args.batch_size)
+        hot = storage.get_conn().execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+        print(f'{hot} tasks left, trackme.db {os.path.getsize(storage.DB_FILE) / 2**20:.1f} MiB, '
+              f'archives {sorted(storage.archived_years())}')
+        after = views(storage, report)
+        for name, (fn, result) in after.items():
+            summarize(name, timed(fn, 20))
+            ok &= check(f'{name} unchanged', result == before[name][1])
+        ok &= check('hot rollup matches tasks', not storage.check_rollup())
+        ok &= check('archive rollups match their tasks', archive_consistent(storage))
+        ok &= check('journal verify', not journal.verify())
+        storage.close()
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""`trackme batch` versus one process per command.
+
+    python -m benchmarks.bench_batch [-n 10000] [--sample 500]
+
+Both sides run the same alternating start/stop commands. The per-process side
+runs --sample invocations and extrapolates to n (pass --sample n for the full
+run; 10k interpreter launches take a while).
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from ._util import scratch_home
+
+def commands(n):
+    return [f'start backfill task {i}' if i % 2 == 0 else 'stop' for i in range(n)]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=10000)
+    ap.add_argument('--sample', type=int, default=500)
+    args = ap.parse_args()
+    cmds = commands(args.n)
+
+    scratch_home()
+    env = dict(os.environ)
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'trackme.cli', 'batch', '--quiet'], input='\n'.join(cmds),
+                   text=True, env=env, check=True)
+    batch_s = time.perf_counter() - t0
+
+    scratch_home()
+    env = dict(os.environ)
+    sample = min(args.sample, args.n)
+    t0 = time.perf_counter()
+    for line in cmds[:sample]:
+        subprocess.run([sys.executable, '-m', 'trackme.cli'] + line.split(), env=env,
+                       stdout=subprocess.DEVNULL, check=True)
+    per_process_s = (time.perf_counter() - t0) / sample * args.n
+
+    print(f'batch mode:          {args.n} commands in {batch_s:8.2f}s  ({args.n / batch_s:8.0f} cmd/s)')
+    print(f'process per command: {args.n} commands in {per_process_s:8.2f}s  ({args.n / per_process_s:8.0f} cmd/s)'
+          + (f'  [extrapolated from {sample}]' if sample < args.n else ''))
+    print(f'speedup: {per_process_s / batch_s:.0f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Bulk import/export throughput.
+
+    python -m benchmarks.bench_bulk [-n 1000000] [--batch-size 5000]
+"""
+import argparse
+import json
+import os
+import time
+
+from ._util import scratch_home
+
+def write_jsonl(path, n):
+    with open(path, 'w') as f:
+        for i in range(n):
+            day = f'20{10 + i // 200000 % 15:02d}-{1 + i // 16000 % 12:02d}-{1 + i // 600 % 28:02d}'
+            f.write(json.dumps({'id': i + 1, 'task_name': f'task {i}', 'category': f'cat{i % 7}',
+                                'start_time': f'{day}T09:00:00', 'end_time': f'{day}T09:30:00',
+                                'duration': 1800, 'date': day}) + '\n')
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=1000000)
+    ap.add_argument('--batch-size', type=int, default=5000)
+    args = ap.parse_args()
+    home = scratch_home()
+    from trackme import bulk, storage
+    src = os.path.join(home, 'in.jsonl')
+    write_jsonl(src, args.n)
+
+    t0 = time.perf_counter()
+    with open(src) as f:
+        imported, remapped, skipped = bulk.import_tasks(f, 'jsonl', args.batch_size)
+    dt = time.perf_counter() - t0
+    print(f'import: {imported} rows in {dt:.2f}s ({imported / dt:,.0f} rows/s), {remapped} remapped, {skipped} skipped')
+
+    for fmt in ('jsonl', 'csv'):
+        t0 = time.perf_counter()
+        with open(os.path.join(home, f'out.{fmt}'), 'w', newline='') as out:
+            n = bulk.export_tasks(out, fmt)
+        dt = time.perf_counter() - t0
+        print(f'export {fmt}: {n} rows in {dt:.2f}s ({n / dt:,.0f} rows/s)')
+    storage.close()
+
+if __name__ == '__main__':
+    main()
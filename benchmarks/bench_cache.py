@@ -0,0 +1,58 @@
+"""REPL view cache: warm vs cold view queries, and invalidation checks.
+
+    python -m benchmarks.bench_cache [-n 500] [--per-day 40]
+
+Compares the storage view calls with the cache off and on, then checks that
+a tracker write and a commit from another process are both visible through
+the cache. Exits non-zero if a stale result is served.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import subprocess
+import sys
+
+from ._util import scratch_home, timed, summarize
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=500)
+    ap.add_argument('--per-day', type=int, default=40)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage, tracker
+    from .bench_report import fill_year
+    fill_year(storage, args.per_day)
+    day = '2024-03-14'
+    calls = [
+        ('get_tasks_for_date', lambda: storage.get_tasks_for_date(day)),
+        ('get_weekly_summary', lambda: storage.get_weekly_summary(day)),
+        ('get_monthly_summary', lambda: storage.get_monthly_summary(2024, 3)),
+        ('load_paused + load_active', lambda: (storage.load_paused(), storage.load_active())),
+    ]
+    for name, fn in calls:
+        summarize(f'{name} (no cache)', timed(fn, args.n))
+    storage.enable_cache()
+    for name, fn in calls:
+        summarize(f'{name} (cached)', timed(fn, args.n))
+
+    ok = True
+    today = datetime.date.today().isoformat()
+    before = len(storage.get_tasks_for_date(today))
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.start_new_task_quick('bench cache', 'bench')
+        tracker.stop_active()
+    if len(storage.get_tasks_for_date(today)) != before + 1:
+        print('FAIL: stop_active not visible through the cache')
+        ok = False
+    subprocess.run([sys.executable, '-m', 'trackme.cli', 'start', 'other process'], stdout=subprocess.DEVNULL, check=True)
+    active = storage.load_active()
+    if not active or active['task_name'] != 'other process':
+        print('FAIL: commit from another process not detected')
+        ok = False
+    print(storage.cache_stats())
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
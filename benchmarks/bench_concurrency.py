@@ -0,0 +1,79 @@
+"""Stress test: parallel processes starting and stopping tasks on one database.
+
+    python -m benchmarks.bench_concurrency [--procs 8] [--cycles 200]
+
+Each worker calls tracker.start_new_task_quick / tracker.stop_active in a loop
+and records the ids it was given. Afterwards every id must be unique and must
+be present exactly once in tasks or live_tasks, and no prompt state temp
+file may be left behind. --runs repeats the test on the same database, as
+one flaky run in several is still a failure. Exits non-zero otherwise.
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import time
+
+from ._util import scratch_home
+
+def worker(args):
+    n, cycles = args
+    from trackme import tracker, storage
+    ids = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(cycles):
+            ids.append(tracker.start_new_task_quick(f'worker {n} task {i}', 'stress')['id'])
+            tracker.stop_active()
+    storage.close()
+    return ids
+
+def stored_ids(storage):
+    conn = storage.get_conn()
+    ids = [r[0] for r in conn.execute('SELECT id FROM tasks UNION ALL SELECT id FROM live_tasks')]
+    storage.close()
+    return ids
+
+def run(storage, procs, cycles):
+    before = set(stored_ids(storage))
+
+    t0 = time.perf_counter()
+    with multiprocessing.get_context('spawn').Pool(procs) as pool:
+        results = pool.map(worker, [(n, cycles) for n in range(procs)])
+    elapsed = time.perf_counter() - t0
+
+    issued = [i for ids in results for i in ids]
+    stored = [i for i in stored_ids(storage) if i not in before]
+    ok = len(issued) == len(set(issued)) and sorted(issued) == sorted(stored)
+    leftovers = [n for n in os.listdir(storage.DB_DIR) if n.endswith('.tmp')]
+    transitions = 2 * len(issued)
+    print(f'{procs} processes x {cycles} cycles: {len(issued)} ids issued, '
+          f'{len(set(issued))} unique, {len(stored)} stored')
+    print(f'{transitions} transitions in {elapsed:.2f}s = {transitions / elapsed:.0f} transitions/s')
+    if not ok:
+        print('FAILED: ids collided or tasks were lost')
+    elif leftovers:
+        print(f'FAILED: temp files left behind: {leftovers}')
+        ok = False
+    else:
+        print('OK')
+    return ok
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--procs', type=int, default=8)
+    ap.add_argument('--cycles', type=int, default=200)
+    ap.add_argument('--runs', type=int, default=1)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage
+    storage.init_db()
+    storage.close()
+    ok = True
+    for _ in range(args.runs):
+        ok &= run(storage, args.procs, args.cycles)
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Throughput and latency of `trackme` commands: daemon vs direct.
+
+    python -m benchmarks.bench_daemon [--clients 50] [--per-client 10] [--rows 200]
+
+Fills one day with tasks, starts `trackme daemon` on the scratch data
+directory and has --clients threads each run --per-client commands (status,
+viewday --format tsv, report, in turn) concurrently, three ways:
+
+  direct     a `trackme` process per command, TRACKME_DAEMON=0
+  daemon     a `trackme` process per command, forwarded to the daemon
+  protocol   daemon.forward() from the benchmark process itself: the
+             daemon's own capacity, without interpreter start-up
+
+Prints commands per second and p50/p99 latency for each.
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ._util import scratch_home
+from .bench_viewday import DAY, fill_day
+
+COMMANDS = (['status'], ['viewday', DAY, '--format', 'tsv'], ['report', '--from', DAY, '--to', DAY])
+
+def run_clients(clients, per_client, call):
+    def client(n):
+        out = []
+        for i in range(per_client):
+            t0 = time.perf_counter()
+            call(COMMANDS[(n + i) % len(COMMANDS)])
+            out.append(time.perf_counter() - t0)
+        return out
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        latencies = sorted(x for r in pool.map(client, range(clients)) for x in r)
+    return len(latencies) / (time.perf_counter() - t0), latencies
+
+def report(name, result):
+    rate, lat = result
+    p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+    print(f'{name:<10} {rate:9.1f} commands/s   p50 {statistics.median(lat) * 1000:8.1f}ms   p99 {p99 * 1000:8.1f}ms')
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--clients', type=int, default=50)
+    ap.add_argument('--per-client', type=int, default=10)
+    ap.add_argument('--rows', type=int, default=200)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage, daemon
+    fill_day(storage, args.rows)
+    storage.close()
+
+    server = subprocess.Popen([sys.executable, '-m', 'trackme.cli', 'daemon'], stdout=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            if daemon.control('ping') is not None:
+                break
+            time.sleep(0.05)
+        else:
+            sys.exit('daemon did not start')
+
+        def process(env):
+            def call(argv):
+                subprocess.run([sys.executable, '-m', 'trackme.cli', *argv], env=env, check=True,
+                               stdout=subprocess.DEVNULL)
+            return call
+
+        print(f'{args.clients} clients x {args.per_client} commands, {args.rows} tasks on {DAY}')
+        report('direct', run_clients(args.clients, args.per_client, process(dict(os.environ, TRACKME_DAEMON='0'))))
+        report('daemon', run_clients(args.clients, args.per_client, process(os.environ)))
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_clients(args.clients, args.per_client, daemon.forward)
+        report('protocol', result)
+    finally:
+        daemon.control('stop')
+        server.wait(10)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Import-time budget per one-liner command.
+
+    python -m benchmarks.bench_import [-n 5]
+
+Runs each command in a fresh interpreter under ``python -X importtime`` and
+sums the self time of every module imported after interpreter startup (i.e.
+after ``site``), which is the cost trackme controls. Exits non-zero if a command goes
+over its budget or if a command listed in PLAIN_COMMANDS imports rich.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from ._util import scratch_home
+
+# milliseconds of module import time, generous enough for slow CI machines
+BUDGET_MS = {
+    'status': 30,
+    'start bench task': 30,
+    'pause': 30,
+    'stop': 30,
+    'viewday': 120,
+}
+PLAIN_COMMANDS = ('status', 'start bench task', 'pause', 'stop')
+
+def import_profile(argv, env):
+    code = f'import sys; sys.argv = {["trackme"] + argv!r}; from trackme.cli import main; main()'
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env,
+                          stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        if name.strip() == 'site':
+            modules.clear()
+            continue
+        modules[name.strip()] = int(self_us)
+    return modules
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=5)
+    args = ap.parse_args()
+    scratch_home()
+    env = dict(os.environ)
+    failed = False
+    for cmd, budget in BUDGET_MS.items():
+        runs = [import_profile(cmd.split(), env) for _ in range(args.n)]
+        best = min(sum(m.values()) for m in runs) / 1000
+        rich = any(name == 'rich' for name in runs[0])
+        bad = best > budget or (rich and cmd in PLAIN_COMMANDS)
+        failed = failed or bad
+        print(f"{'FAIL' if bad else 'ok  '} {cmd:<18} imports {best:6.1f}ms (budget {budget}ms)  rich loaded: {rich}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Latency budget for `trackme analyze` over a full year of data.
+
+    python -m benchmarks.bench_intervals [--per-day 100] [--budget-ms 1000]
+
+Uses the bench_report year (overlapping tasks every six minutes from 08:00),
+first checks one day's sweep against a second-by-second count and its
+longest overlaps against every pair, then times the analysis with and
+without --clip, and the longest overlaps of --nested tasks inside each other
+(every pair overlaps). Also checks that --clip finds a task that started
+days before --from and that its look-back stays capped. Exits non-zero on a
+mismatch or if a median exceeds the budget.
+"""
+import argparse
+import sys
+
+from ._util import scratch_home, timed, summarize
+from .bench_report import fill_year
+
+def brute_force(items):
+    """(covered, overlap) by counting every second; the reference for sweep()."""
+    depth = {}
+    for s, e, *_ in items:
+        for t in range(s, e):
+            depth[t] = depth.get(t, 0) + 1
+    return len(depth), sum(1 for d in depth.values() if d >= 2)
+
+def all_overlaps(items):
+    """Every pair's overlap in seconds, longest first; the reference for longest_overlaps()."""
+    return sorted((min(a[1], b[1]) - max(a[0], b[0]) for i, a in enumerate(items) for b in items[i + 1:]
+                   if min(a[1], b[1]) > max(a[0], b[0])), reverse=True)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--per-day', type=int, default=100)
+    ap.add_argument('--budget-ms', type=float, default=1000)
+    ap.add_argument('--nested', type=int, default=4000)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage, intervals
+    n = fill_year(storage, args.per_day)
+    print(f'{n} tasks in 2024')
+    days, _ = intervals.load('2024-03-05', '2024-03-05')
+    items = next(iter(days.values()))
+    covered, overlap, _ = intervals.sweep(items)
+    if (covered, overlap) != brute_force(items):
+        print(f'sweep mismatch: {(covered, overlap)} != {brute_force(items)}')
+        sys.exit(1)
+    for limit in (1, 10, 50):
+        got = [p[0] for p in intervals.longest_overlaps(items, limit)]
+        if got != all_overlaps(items)[:limit]:
+            print(f'longest_overlaps mismatch (limit {limit}): {got} != {all_overlaps(items)[:limit]}')
+            sys.exit(1)
+    failed = False
+    nested = [(i, 2 * args.nested - i, i, f'task {i}', 0) for i in range(args.nested)]
+    r = summarize(f'longest overlaps of {args.nested} nested tasks', timed(lambda: intervals.longest_overlaps(nested, 10), 5))
+    failed = failed or r['median_us'] > args.budget_ms * 1000
+    for clip in (False, True):
+        r = summarize(f"analyze{' --clip' if clip else ''} (year)",
+                      timed(lambda: intervals.analyze('2024-01-01', '2024-12-31', clip), 5))
+        failed = failed or r['median_us'] > args.budget_ms * 1000
+    # a three-day task filed on 2024-12-28 still covers 2024-12-30
+    with storage.transaction() as conn:
+        start = storage.to_epoch('2024-12-28T12:00:00')[0]
+        conn.execute('INSERT INTO tasks (task_name, start_ts, end_ts, utc_offset, day, duration) VALUES (?, ?, ?, ?, ?, ?)',
+                     ('long', start, start + 3 * 86400, storage.to_epoch('2024-12-28T12:00:00')[1],
+                      storage.day_number('2024-12-28'), 3 * 86400))
+    days, _ = intervals.load('2024-12-30', '2024-12-30', clip=True)
+    if not any(i[3] == 'long' for i in days.get(storage.day_number('2024-12-30'), [])):
+        print('--clip missed a task that started two days before --from')
+        failed = True
+    # a bogus year-long task must not widen the look-back past MAX_LOOKBACK days
+    with storage.transaction() as conn:
+        start = storage.to_epoch('2024-01-01T12:00:00')[0]
+        conn.execute('INSERT INTO tasks (task_name, start_ts, end_ts, utc_offset, day, duration) VALUES (?, ?, ?, ?, ?, ?)',
+                     ('bogus', start, start + 365 * 86400, 0, storage.day_number('2024-12-01'), 365 * 86400))
+    if intervals._lookback(storage.day_number('2024-12-30')) != intervals.MAX_LOOKBACK:
+        print(f'look-back is not capped at {intervals.MAX_LOOKBACK} days')
+        failed = True
+    storage.close()
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
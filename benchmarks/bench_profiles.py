@@ -0,0 +1,64 @@
+"""Cross-profile reports: one statement over several attached databases.
+
+    python -m benchmarks.bench_profiles [--profiles 4] [--per-day 25] [--budget-ms 1000]
+
+Fills --profiles profiles with a year of bench_report data each (one
+process per profile, selected with TRACKME_PROFILE) and times
+`report --profiles all` for every group-by, including by profile. Then
+archives the first half of the year in one profile and checks that the
+report is unchanged, and that a profile whose database is a schema version
+behind is refused rather than migrated from here. Exits non-zero if a
+median exceeds the budget, the per-profile totals do not add up to the
+cross-profile one or either check fails.
+"""
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+
+from ._util import scratch_home, timed, summarize
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--profiles', type=int, default=4)
+    ap.add_argument('--per-day', type=int, default=25)
+    ap.add_argument('--budget-ms', type=float, default=1000)
+    args = ap.parse_args()
+    scratch_home()
+    names = [f'client{i}' for i in range(args.profiles)]
+    for name in names:
+        subprocess.run([sys.executable, '-c', 'from trackme import storage; from benchmarks.bench_report import fill_year; '
+                        f'fill_year(storage, {args.per_day}); storage.close()'],
+                       env=dict(os.environ, TRACKME_PROFILE=name), check=True)
+    from trackme import report, profiles
+    names = profiles.resolve('all')
+    print(f'{len(names)} profiles x {366 * args.per_day} tasks')
+    failed = False
+    for group in report.PROFILE_GROUP_KEYS:
+        r = summarize(f'report --profiles all --group-by {group}',
+                      timed(lambda: report.run_report('2024-01-01', '2024-12-31', group, names), 5))
+        failed = failed or r['median_us'] > args.budget_ms * 1000
+    by_profile = report.run_report('2024-01-01', '2024-12-31', 'profile', names)
+    combined = report.totals(report.run_report('2024-01-01', '2024-12-31', 'category', names))
+    if report.totals(by_profile)['total'] != combined['total'] or len(by_profile) != len(names):
+        print(f'totals differ: {by_profile} vs {combined}')
+        failed = True
+    subprocess.run([sys.executable, '-m', 'trackme.cli', 'archive', '--before', '2024-07-01', '--no-vacuum'],
+                   env=dict(os.environ, TRACKME_PROFILE=names[0], TRACKME_DAEMON='0'), check=True)
+    if report.run_report('2024-01-01', '2024-12-31', 'profile', names) != by_profile:
+        print(f'report changed after archiving {names[0]}')
+        failed = True
+    conn = sqlite3.connect(profiles.db_path(names[-1]))
+    conn.execute(f'PRAGMA user_version = {conn.execute("PRAGMA user_version").fetchone()[0] - 1}')
+    conn.close()
+    try:
+        profiles.resolve('all')
+        print(f'{names[-1]} is a schema version behind but was accepted')
+        failed = True
+    except profiles.ProfileError as e:
+        print(f'refused: {e}')
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Latency budget for `trackme prompt`.
+
+    python -m benchmarks.bench_prompt [-n 50]
+
+Measures main() in-process and the end-to-end cost of a fresh interpreter
+running the prompt, reported as overhead on top of a bare `python -c pass`
+(interpreter startup is outside trackme's control). Exits non-zero if either
+median is over budget.
+"""
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+
+from ._util import scratch_home, timed, summarize
+
+IN_PROCESS_BUDGET_US = 500
+OVERHEAD_BUDGET_US = 10000
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=50)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import tracker, storage, prompt
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.start_new_task_quick('bench prompt task', 'bench')
+    storage.close()
+
+    def in_process():
+        with contextlib.redirect_stdout(io.StringIO()):
+            prompt.main([])
+    inproc = summarize('prompt.main() in process', timed(in_process, args.n * 20))
+
+    env = dict(os.environ)
+    run = lambda code: subprocess.run([sys.executable, '-c', code], env=env, stdout=subprocess.DEVNULL, check=True)
+    bare = summarize('python -c pass', timed(lambda: run('pass'), args.n))
+    fast = summarize('trackme-prompt entry point', timed(lambda: run('from trackme.prompt import main; main()'), args.n))
+    cli = summarize('trackme prompt via cli', timed(
+        lambda: run("import sys; sys.argv = ['trackme', 'prompt']; from trackme.cli import main; main()"), args.n))
+
+    overhead = fast['median_us'] - bare['median_us']
+    print(f'entry point overhead over bare interpreter: {overhead:.0f}us (budget {OVERHEAD_BUDGET_US}us)')
+    print(f"cli overhead over bare interpreter: {cli['median_us'] - bare['median_us']:.0f}us")
+    ok = inproc['median_us'] <= IN_PROCESS_BUDGET_US and overhead <= OVERHEAD_BUDGET_US
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Memory and throughput of loading task rows: dicts vs Task records.
+
+    python -m benchmarks.bench_records [-n 1000000]
+
+Loads n completed tasks with the day-view column list, once the old way
+(sqlite3.Row converted to a dict per row) and once through the Task row
+factory, reporting wall time and the memory held by the result list
+(tracemalloc, measured in a separate pass).
+"""
+import argparse
+import gc
+import sqlite3
+import time
+import tracemalloc
+
+from ._util import scratch_home
+
+def fill(storage, n):
+    base = 1704067200   # 2024-01-01 UTC
+    rows = ((i, f'task {i % 500}', 'work', '', base + i * 60, base + i * 60 + 45, 0, (base + i * 60) // 86400, 45,
+             'completed') for i in range(1, n + 1))
+    with storage.transaction() as conn:
+        conn.executemany(storage.INSERT_TASK_SQL, rows)
+
+def fetch(conn, sql, factory):
+    cur = conn.execute(sql)
+    if factory is None:
+        return [dict(r) for r in cur]
+    cur.row_factory = factory
+    return cur.fetchall()
+
+def load(conn, sql, factory):
+    """(rows, seconds, bytes held); timed untraced, then measured under tracemalloc."""
+    gc.collect()
+    t0 = time.perf_counter()
+    n = len(fetch(conn, sql, factory))
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    tracemalloc.start()
+    rows = fetch(conn, sql, factory)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del rows
+    return n, elapsed, held
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=1000000)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage, task
+    fill(storage, args.n)
+    conn = storage.get_conn()
+    conn.row_factory = sqlite3.Row
+    sql = f"SELECT {','.join(storage.TASK_COLUMNS)} FROM tasks"
+    results = {}
+    for name, factory in (('dict(sqlite3.Row)', None), ('Task row factory', task.row_factory)):
+        n, elapsed, held = load(conn, sql, factory)
+        results[name] = held
+        print(f'{name:<20} {n} rows in {elapsed:6.2f}s ({n / elapsed:9,.0f} rows/s)   '
+              f'{held / 2**20:7.1f} MiB ({held / n:5.0f} B/row)')
+    print(f"memory: Task uses {results['Task row factory'] / results['dict(sqlite3.Row)']:.0%} of the dicts")
+
+if __name__ == '__main__':
+    main()
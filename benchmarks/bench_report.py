@@ -0,0 +1,48 @@
+"""Latency budget for `trackme report` over a full year of data.
+
+    python -m benchmarks.bench_report [--per-day 100] [--budget-ms 500]
+
+Exits non-zero if any group-by exceeds the budget (median of 5 runs).
+"""
+import argparse
+import datetime
+import random
+import sys
+
+from ._util import scratch_home, timed, summarize
+
+def fill_year(storage, per_day, year=2024):
+    rnd = random.Random(1)
+    cats = ['work', 'meetings', 'email', 'review', 'admin', 'learning', '']
+    day = datetime.date(year, 1, 1)
+    rows, tid = [], 0
+    while day.year == year:
+        for i in range(per_day):
+            tid += 1
+            start = datetime.datetime.combine(day, datetime.time(8)) + datetime.timedelta(minutes=6 * i)
+            dur = rnd.randint(60, 3600)
+            rows.append((tid, f'task {rnd.randint(1, 300)}', rnd.choice(cats), '', start.isoformat(),
+                         (start + datetime.timedelta(seconds=dur)).isoformat(), dur, day.isoformat(), 'completed'))
+        day += datetime.timedelta(days=1)
+    with storage.transaction() as conn:
+        conn.executemany(storage.INSERT_TASK_SQL, map(storage.task_row, rows))
+    return len(rows)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--per-day', type=int, default=100)
+    ap.add_argument('--budget-ms', type=float, default=500)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage, report
+    n = fill_year(storage, args.per_day)
+    print(f'{n} tasks in 2024')
+    failed = False
+    for group in report.GROUP_KEYS:
+        r = summarize(f'report --group-by {group}', timed(lambda: report.run_report('2024-01-01', '2024-12-31', group), 5))
+        failed = failed or r['median_us'] > args.budget_ms * 1000
+    storage.close()
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""On-disk size of the tasks table and its indexes, and month-report latency.
+
+    python -m benchmarks.bench_schema [--years 2] [--per-day 40] [-n 20]
+
+Loads synthetic history through `trackme import`'s code path, then reports
+the bytes used by tasks, each of its indexes and the FTS/rollup tables
+(from the dbstat virtual table), plus the latency of a one-month
+`trackme report` for every group-by.
+"""
+import argparse
+import datetime
+import json
+import random
+
+from ._util import scratch_home, timed, summarize
+
+def records(years, per_day, seed=5):
+    rnd = random.Random(seed)
+    end = datetime.date(2024, 12, 31)
+    d = end - datetime.timedelta(days=int(365 * years))
+    while d <= end:
+        t = datetime.datetime.combine(d, datetime.time(8))
+        for _ in range(per_day):
+            dur = rnd.randint(60, 1800)
+            yield json.dumps({'task_name': f'task {rnd.randint(1, 400)}', 'category': rnd.choice(['work', 'email', 'admin', '']),
+                              'start_time': t.isoformat(), 'end_time': (t + datetime.timedelta(seconds=dur)).isoformat(),
+                              'duration': dur, 'date': d.isoformat()})
+            t += datetime.timedelta(seconds=dur + 30)
+        d += datetime.timedelta(days=1)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--years', type=float, default=2)
+    ap.add_argument('--per-day', type=int, default=40)
+    ap.add_argument('-n', type=int, default=20)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage, bulk, report
+    n = bulk.import_tasks(records(args.years, args.per_day), 'jsonl')[0]
+    conn = storage.get_conn()
+    conn.execute('ANALYZE')
+    print(f'{n} tasks')
+    names = {r[0]: r[1] for r in conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')")}
+    sizes = conn.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY name').fetchall()
+    index_total = 0
+    for name, size in sizes:
+        if names.get(name) in ('tasks', 'daily_rollup') or name.startswith('tasks_fts'):
+            print(f'  {name:<28} {size / 1024:10.0f} KiB')
+            if name.startswith('idx_') and names.get(name) == 'tasks':
+                index_total += size
+    print(f'  {"indexes on tasks":<28} {index_total / 1024:10.0f} KiB')
+    for group_by in report.GROUP_KEYS:
+        summarize(f'month report by {group_by}',
+                  timed(lambda: report.run_report('2024-06-01', '2024-06-30', group_by), args.n))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""FTS5 search versus a LIKE scan on a synthetic dataset.
+
+    python -m benchmarks.bench_search [-n 1000000]
+"""
+import argparse
+import random
+import time
+
+from ._util import scratch_home, timed, summarize
+
+WORDS = 'review deploy fix refactor meeting email plan sync debug write test design triage'.split()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=1000000)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage, search
+    rnd = random.Random(7)
+
+    def rows():
+        for i in range(1, args.n + 1):
+            day = f'{2015 + i * 10 // args.n}-{1 + i % 12:02d}-{1 + i % 28:02d}'
+            name = f'{rnd.choice(WORDS)} {rnd.choice(WORDS)} PRJ-{rnd.randint(1, 50000)}'
+            notes = f'{rnd.choice(WORDS)} follow-up for ABC-{rnd.randint(1, 200000)}'
+            yield (i, name, 'work', notes, f'{day}T09:00:00', f'{day}T10:00:00', 3600, day, 'completed')
+
+    t0 = time.perf_counter()
+    with storage.transaction() as conn:
+        conn.executemany(storage.INSERT_TASK_SQL, map(storage.task_row, rows()))
+    print(f'loaded {args.n} rows (FTS index maintained by triggers) in {time.perf_counter() - t0:.1f}s')
+
+    conn = storage.get_conn()
+    summarize('search ABC-123 (fts5, top 20)', timed(lambda: search.search('ABC-123'), 20))
+    summarize('search "deploy PRJ-42" in 2019', timed(
+        lambda: search.search('deploy PRJ-42', '2019-01-01', '2019-12-31'), 20))
+    summarize("LIKE '%ABC-123%' scan", timed(lambda: conn.execute(
+        'SELECT id FROM tasks WHERE task_name LIKE ? OR notes LIKE ? LIMIT 20', ('%ABC-123%', '%ABC-123%')).fetchall(), 3))
+    storage.close()
+
+if __name__ == '__main__':
+    main()
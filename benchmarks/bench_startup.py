@@ -0,0 +1,42 @@
+"""Startup cost (open + migration check) as the tasks table grows.
+
+    python -m benchmarks.bench_startup [--sizes 1000,100000,500000]
+
+Exits non-zero if startup on the largest table is more than --max-ratio times
+slower than on the smallest one, i.e. if startup stops being flat.
+"""
+import argparse
+import sys
+
+from ._util import scratch_home, timed, summarize
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sizes', default='1000,100000,500000')
+    ap.add_argument('--max-ratio', type=float, default=3.0)
+    ap.add_argument('-n', type=int, default=200)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage
+
+    results = []
+    done = 0
+    for size in [int(x) for x in args.sizes.split(',')]:
+        with storage.transaction() as conn:
+            conn.executemany(storage.INSERT_TASK_SQL, (storage.task_row(
+                (i, f'task {i}', 'bench', '', '2024-01-01T09:00:00', '2024-01-01T09:30:00', 1800,
+                 '2024-01-01', 'completed')) for i in range(done + 1, size + 1)))
+        done = size
+        storage.close()
+
+        def startup():
+            storage.get_conn()
+            storage.close()
+        results.append(summarize(f'startup with {size} rows', timed(startup, args.n)))
+
+    ratio = results[-1]['median_us'] / results[0]['median_us']
+    print(f'largest/smallest median ratio: {ratio:.2f} (budget {args.max_ratio})')
+    sys.exit(0 if ratio <= args.max_ratio else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Per-call latency of storage operations: connection-per-call vs the engine.
+
+    python -m benchmarks.bench_storage [-n 2000]
+"""
+import argparse
+import sqlite3
+
+from ._util import scratch_home, timed, summarize
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=2000)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage
+    storage.init_db()
+
+    seq = iter(range(1, 10 ** 9))
+
+    def task():
+        i = next(seq)
+        return {'id': i, 'task_name': f'task {i}', 'category': 'bench', 'notes': '',
+                'start_time': '2024-01-01T09:00:00', 'end_time': '2024-01-01T09:30:00',
+                'duration': 1800, 'date': '2024-01-01', 'status': 'completed'}
+
+    # Baseline: the pre-engine pattern of connect + schema probe + close per call.
+    def legacy_save():
+        t = task()
+        # the same stored row save_completed writes (start_ts/end_ts/day rather than ISO text)
+        row = dict(zip(storage.STORED_COLUMNS, storage.task_row([t[c] for c in storage.TASK_COLUMNS])))
+        conn = sqlite3.connect(storage.DB_FILE)
+        cur = conn.cursor()
+        cur.execute('PRAGMA table_info(tasks)')
+        cols = [r[1] for r in cur.fetchall()]
+        cur.execute(f"INSERT INTO tasks ({','.join(cols)}) VALUES ({','.join('?' * len(cols))})",
+                    tuple(row.get(c) for c in cols))
+        conn.commit()
+        conn.close()
+
+    def legacy_read():
+        conn = sqlite3.connect(storage.DB_FILE)
+        conn.row_factory = sqlite3.Row
+        rows = [dict(r) for r in conn.execute(storage.DAY_SQL, (storage.day_number('2024-01-01'),))]
+        conn.close()
+        return rows
+
+    summarize('save_completed (connect per call)', timed(legacy_save, args.n))
+    summarize('save_completed (engine)', timed(lambda: storage.save_completed(task()), args.n))
+    summarize('get_tasks_for_date (connect per call)', timed(legacy_read, args.n // 10))
+    summarize('get_tasks_for_date (engine)', timed(lambda: storage.get_tasks_for_date('2024-01-01'), args.n // 10))
+    storage.close()
+
+if __name__ == '__main__':
+    main()
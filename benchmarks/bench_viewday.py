@@ -0,0 +1,54 @@
+"""viewday on a very large day: table vs streaming formats.
+
+    python -m benchmarks.bench_viewday [--rows 5000]
+
+Reports wall time and peak Python memory (tracemalloc) for each --format,
+plus the time to the first page of the table output.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import time
+import tracemalloc
+
+from ._util import scratch_home
+
+DAY = '2024-06-03'
+
+def fill_day(storage, rows):
+    start = datetime.datetime.fromisoformat(DAY + 'T00:00:00')
+    data = []
+    for i in range(1, rows + 1):
+        t = start + datetime.timedelta(seconds=10 * i)
+        data.append((i, f'auto {i % 50}', 'auto', '', t.isoformat(), (t + datetime.timedelta(seconds=8)).isoformat(),
+                     8, DAY, 'completed'))
+    with storage.transaction() as conn:
+        conn.executemany(storage.INSERT_TASK_SQL, map(storage.task_row, data))
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rows', type=int, default=5000)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage, utils
+    fill_day(storage, args.rows)
+    print(f'{args.rows} tasks on {DAY}')
+    for fmt in ('tsv', 'json', 'table'):
+        elapsed, peak = measure(lambda: utils.view_day(DAY, fmt=fmt))
+        print(f'--format {fmt:<6} {elapsed * 1000:9.1f}ms   peak {peak / 1024:9.0f}KiB')
+    elapsed, peak = measure(lambda: utils.view_day(DAY, limit=utils.PAGE_SIZE))
+    print(f'first table page  {elapsed * 1000:9.1f}ms   peak {peak / 1024:9.0f}KiB')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Journal replay check: replaying the event log must reproduce the database.
+
+    python -m benchmarks.check_journal [-n 2000] [--seed 7]
+
+Drives random start/pause/resume/stop/complete transitions (plus a bulk
+import and a batch) through trackme, records the full state at a few points
+in time, and checks that journal.replay() reproduces the tasks table
+exactly at the end and every recorded state as of its timestamp, also after
+compaction and after a transaction that fails once its events are staged.
+Reports the cost of a transition with and without the journal.
+Exits non-zero on any mismatch.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+from ._util import scratch_home, timed, summarize
+
+def db_state(storage, journal):
+    conn = storage.get_conn()
+    tasks = {r[0]: list(r) for r in conn.execute(f"SELECT {','.join(storage.TASK_COLUMNS)} FROM tasks")}
+    active = storage.load_active()
+    paused = {p['id']: [p.get(c) for c in journal.PAUSED_FIELDS] for p in storage.load_paused()}
+    return tasks, [active.get(c) for c in journal.ACTIVE_FIELDS] if active else None, paused
+
+def same(state, expected):
+    return (state.tasks, state.active, state.paused) == expected
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=2000)
+    ap.add_argument('--seed', type=int, default=7)
+    args = ap.parse_args()
+    scratch_home()
+    from trackme import storage, tracker, journal, bulk, cli
+    storage.init_db()
+    rnd = random.Random(args.seed)
+    checkpoints = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.n):
+            paused = [p['id'] for p in storage.load_paused()]
+            op = rnd.random()
+            if op < 0.3 or not (paused or storage.load_active()):
+                tracker.start_new_task_quick(f'task {rnd.randint(1, 50)}', rnd.choice(['', 'work', 'home']), 'n')
+            elif op < 0.5:
+                tracker.pause_active()
+            elif op < 0.65 and paused:
+                tracker.resume_task(rnd.choice(paused))
+            elif op < 0.8:
+                tracker.stop_active()
+            elif paused:
+                (tracker.stop_paused if op < 0.9 else tracker.complete_task)(rnd.choice(paused))
+            if i % (args.n // 4) == 0:
+                checkpoints.append((time.time(), db_state(storage, journal)))
+        lines = [json.dumps({'task_name': f'imported {k}', 'category': 'import', 'start_time': '2023-01-01T09:00:00',
+                             'end_time': '2023-01-01T09:30:00', 'duration': 1800, 'date': '2023-01-01'})
+                 for k in range(500)]
+        bulk.import_tasks(lines, 'jsonl', batch_size=200)
+        cli.run_batch(['start batch one', 'pause', 'start batch two', 'stop', 'resume 999999999'])
+    checkpoints.append((time.time(), db_state(storage, journal)))
+    ok = True
+
+    problems = journal.verify()
+    print(f'{len(problems)} differences after {args.n} transitions, an import and a batch')
+    ok &= not problems
+    for t, expected in checkpoints:
+        if not same(journal.replay(t), expected):
+            print(f'FAIL: replay as of {t} differs from the recorded state')
+            ok = False
+    print(f'{len(checkpoints)} point-in-time replays checked')
+
+    middle = checkpoints[len(checkpoints) // 2][0]
+    journal.snapshot()
+    journal.compact(before=time.time())
+    ok &= not journal.verify()
+    ok &= same(journal.replay(), checkpoints[-1][1])
+    try:
+        journal.replay(middle)
+        print('FAIL: replay before the compaction point should be refused')
+        ok = False
+    except journal.NoHistory:
+        pass
+    size = os.path.getsize(journal.EVENTS_FILE)
+    print(f'after compaction: verify {"ok" if not journal.verify() else "FAILED"}, events.log {size} bytes')
+
+    # events staged by a transaction that then fails must not reach the next commit
+    class Abort(Exception):
+        pass
+    def abort():
+        raise Abort
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            with storage.transaction():
+                tracker.start_new_task_quick('rolled back')
+                storage.engine().before_commit(abort)
+        except Abort:
+            pass
+        tracker.start_new_task_quick('after the rollback')
+        tracker.stop_active()
+    problems = journal.verify()
+    print(f'after a failed commit: verify {"ok" if not problems else "FAILED: " + problems[0]}')
+    ok &= not problems
+
+    def cycle():
+        task = tracker.start_new_task_quick('bench journal')
+        tracker.pause_active()
+        tracker.resume_task(task['id'])
+        tracker.stop_active()
+    with contextlib.redirect_stdout(io.StringIO()):
+        on = timed(cycle, 100)
+        os.environ['TRACKME_JOURNAL'] = '0'
+        off = timed(cycle, 100)
+    summarize('transition cycle (journal on)', on)
+    summarize('transition cycle (journal off)', off)
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
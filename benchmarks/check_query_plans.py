@@ -0,0 +1,43 @@
+"""EXPLAIN QUERY PLAN regression check for the view queries.
+
+    python -m benchmarks.check_query_plans
+
+Exits non-zero if any query falls back to a full scan of a table.
+"""
+import sys
+
+from ._util import scratch_home
+
+def view_queries(storage):
+    from trackme import intervals, report
+    return [
+        ('viewday', storage.DAY_SQL, (storage.day_number('2024-01-01'),)),
+        ('viewweek/viewmonth', storage.SUMMARY_SQL, ('2024-01-01', '2024-01-31')),
+        ('category', 'SELECT day, SUM(duration) FROM tasks WHERE category = ? AND day BETWEEN ? AND ? GROUP BY day',
+         ('work',) + storage.day_range('2024-01-01', '2024-01-31')),
+        ('analyze --clip look-back', intervals.LONGEST_SQL.format(source='tasks'),
+         storage.day_range('2024-01-01', '2024-01-31')),
+    ] + [(f'report --group-by {g}', report.report_sql(g), storage.day_range('2024-01-01', '2024-12-31'))
+         for g in report.GROUP_KEYS]
+
+def full_scans(conn, sql, params):
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    plan = [r[3] for r in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+    # "SCAN t USING (COVERING) INDEX" walks an index in order and is fine, as
+    # are scans of CTEs and subqueries; a bare "SCAN <table>" reads the table.
+    return [p for p in plan if p.startswith('SCAN') and 'INDEX' not in p and p.split()[1] in tables], plan
+
+def main():
+    scratch_home()
+    from trackme import storage
+    conn = storage.get_conn()
+    failed = False
+    for name, sql, params in view_queries(storage):
+        scans, plan = full_scans(conn, sql, params)
+        print(f"{'FAIL' if scans else 'ok  '} {name}: {' | '.join(plan)}")
+        failed = failed or bool(scans)
+    storage.close()
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Delta sync check between two local data directories.
+
+    python -m benchmarks.check_sync [--per-day 20]
+
+Fills data directory A with a year of tasks and copies its database to B,
+as machines were kept in step before sync existed. Then:
+
+  1. both sides record new tasks (their local ids collide), deltas go
+     A -> B -> A -> B with --peer, and both must hold the same tasks under
+     the same uids, with journals that still verify;
+  2. the same task is edited differently on both sides and the deltas are
+     applied in both orders: both must settle on the same version;
+  3. the cost of an export one change after the last one is compared with a
+     full export;
+  4. A archives the first half of the year and imports a full delta from B:
+     the archived uids must be skipped, not inserted into A again.
+
+Every step runs `trackme` in its own process with TRACKME_HOME set. Exits
+non-zero on any failure.
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+
+from ._util import scratch_home
+
+COLUMNS = 'uid, task_name, category, notes, start_ts, end_ts, utc_offset, day, duration, status'
+
+def trackme(home, *argv):
+    env = dict(os.environ, TRACKME_HOME=home, TRACKME_DAEMON='0')
+    r = subprocess.run([sys.executable, '-m', 'trackme.cli', *argv], env=env, capture_output=True, text=True)
+    if r.returncode:
+        sys.exit(f'trackme {" ".join(argv)} failed in {home}:\n{r.stdout}{r.stderr}')
+    return r.stdout + r.stderr
+
+def rows(home):
+    conn = sqlite3.connect(os.path.join(home, 'trackme.db'))
+    try:
+        return conn.execute(f'SELECT {COLUMNS} FROM tasks ORDER BY uid').fetchall()
+    finally:
+        conn.close()
+
+def edit(home, uid, notes):
+    conn = sqlite3.connect(os.path.join(home, 'trackme.db'))
+    with conn:
+        conn.execute('UPDATE tasks SET notes = ? WHERE uid = ?', (notes, uid))
+    conn.close()
+
+def check(name, ok, detail=''):
+    print(f"{'ok  ' if ok else 'FAIL'} {name}{': ' + detail if detail else ''}")
+    return ok
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--per-day', type=int, default=20)
+    args = ap.parse_args()
+    home = scratch_home()
+    a, b = os.path.join(home, 'a'), os.path.join(home, 'b')
+    delta = lambda name: os.path.join(home, name + '.jsonl.gz')
+    env = dict(os.environ, TRACKME_HOME=a)
+    subprocess.run([sys.executable, '-c', 'from trackme import storage; from benchmarks.bench_report import fill_year; '
+                    f'fill_year(storage, {args.per_day}); storage.close()'], env=env, check=True)
+    os.makedirs(b)
+    shutil.copy(os.path.join(a, 'trackme.db'), b)
+    ok = True
+
+    # 1. new tasks on both sides
+    for side in (a, b):
+        for i in range(3):
+            trackme(side, 'start', f'{os.path.basename(side)} task {i}')
+            trackme(side, 'stop')
+    trackme(a, 'sync', 'export', '-o', delta('a1'), '--peer', 'b')
+    print(trackme(b, 'sync', 'import', delta('a1')).strip())
+    trackme(b, 'sync', 'export', '-o', delta('b1'), '--peer', 'a')
+    print(trackme(a, 'sync', 'import', delta('b1')).strip())
+    trackme(a, 'sync', 'export', '-o', delta('a2'), '--peer', 'b')
+    print(trackme(b, 'sync', 'import', delta('a2')).strip())
+    ra, rb = rows(a), rows(b)
+    ok &= check('same tasks on both sides', ra == rb, f'{len(ra)} / {len(rb)} tasks')
+    ok &= check('six new tasks, no duplicates', len(ra) == len(set(r[0] for r in ra)) == 366 * args.per_day + 6)
+    for side in (a, b):
+        ok &= check(f'journal verify ({os.path.basename(side)})', 'matches' in trackme(side, 'journal', 'verify'))
+
+    # 2. the same task edited on both sides
+    uid = ra[len(ra) // 2][0]
+    edit(a, uid, 'edited on a')
+    edit(b, uid, 'edited on b')
+    trackme(a, 'sync', 'export', '-o', delta('a3'), '--peer', 'b')
+    trackme(b, 'sync', 'export', '-o', delta('b3'), '--peer', 'a')
+    trackme(a, 'sync', 'import', delta('b3'))
+    trackme(b, 'sync', 'import', delta('a3'))
+    ra, rb = rows(a), rows(b)
+    winner = {r[0]: r for r in ra}[uid][3]
+    ok &= check('conflict resolves the same way on both sides', ra == rb, f'winner: {winner!r}')
+
+    # 3. cost follows the number of changes (after sending b the winner a took from it)
+    trackme(a, 'sync', 'export', '-o', delta('a4'), '--peer', 'b')
+    trackme(a, 'start', 'one more')
+    trackme(a, 'stop')
+    t0 = time.perf_counter()
+    out = trackme(a, 'sync', 'export', '-o', delta('a5'), '--peer', 'b')
+    incremental = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    trackme(a, 'sync', 'export', '-o', delta('full'), '--since', '0')
+    full = time.perf_counter() - t0
+    ok &= check('incremental export ships one task', 'Exported 1 changed' in out, out.strip())
+    print(f'export of 1 change {incremental * 1000:7.1f}ms ({os.path.getsize(delta("a5"))} bytes)   '
+          f'full export {full * 1000:7.1f}ms ({os.path.getsize(delta("full"))} bytes)')
+
+    # 4. archived tasks stay archived
+    report = lambda: json.loads(trackme(a, 'report', '--from', '2024-01-01', '--to', '2024-12-31', '--json'))['totals']
+    trackme(a, 'archive', '--before', '2024-07-01')
+    before = report()
+    trackme(b, 'sync', 'export', '-o', delta('b4'), '--since', '0')
+    out = trackme(a, 'sync', 'import', delta('b4')).strip()
+    print(out)
+    ok &= check('archived uids are skipped', ' 0 new' in out and ' 0 archived' not in out)
+    ok &= check('no archived task counted twice', report() == before, str(before))
+    ok &= check('journal verify (a, archived)', 'matches' in trackme(a, 'journal', 'verify'))
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
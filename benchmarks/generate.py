@@ -0,0 +1,72 @@
+"""Synthetic trackme history generator.
+
+    python -m benchmarks.generate DATA_DIR [--years 3] [--per-day 40] [--paused 5] [--active]
+
+Fills DATA_DIR (a ~/.trackme-style directory, used via TRACKME_HOME) with
+completed tasks spread over working days, plus paused and active state.
+Output is deterministic for a given --seed.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+
+CATEGORIES = ['work', 'meetings', 'email', 'review', 'admin', 'learning', 'support', '']
+VERBS = ['fix', 'review', 'write', 'plan', 'debug', 'deploy', 'triage', 'design', 'sync', 'test']
+NOUNS = ['login', 'billing', 'search', 'api', 'docs', 'release', 'backlog', 'oncall', 'metrics']
+
+def generate(storage, years=3, per_day=40, paused=5, active=True, seed=1, end=None):
+    """Populate the database behind `storage`; returns the number of completed tasks."""
+    rnd = random.Random(seed)
+    end = end or datetime.date.today() - datetime.timedelta(days=1)
+    day = end - datetime.timedelta(days=365 * years)
+
+    def rows():
+        tid = 0
+        d = day
+        while d <= end:
+            if d.weekday() < 5 or rnd.random() < 0.1:
+                t = datetime.datetime.combine(d, datetime.time(8, rnd.randint(0, 59)))
+                for _ in range(max(1, int(rnd.gauss(per_day, per_day / 4)))):
+                    dur = max(30, int(rnd.expovariate(1 / 900)))
+                    tid += 1
+                    ticket = f'{rnd.choice(["ABC", "OPS", "WEB"])}-{rnd.randint(1, 5000)}'
+                    yield (tid, f'{rnd.choice(VERBS)} {rnd.choice(NOUNS)} {ticket}', rnd.choice(CATEGORIES),
+                           rnd.choice(['', '', f'follow-up on {ticket}', 'pairing']), t.isoformat(),
+                           (t + datetime.timedelta(seconds=dur)).isoformat(), dur, d.isoformat(), 'completed')
+                    t += datetime.timedelta(seconds=dur + rnd.randint(0, 300))
+            d += datetime.timedelta(days=1)
+
+    with storage.transaction() as conn:
+        conn.executemany(storage.INSERT_TASK_SQL, map(storage.task_row, rows()))
+        n = conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+        today = datetime.date.today().isoformat()
+        for i in range(paused):
+            storage.add_paused({'id': storage.generate_id(), 'task_name': f'paused task {i}', 'category': 'work',
+                                'notes': '', 'elapsed': rnd.randint(60, 7200), 'date': today})
+        if active:
+            start = datetime.datetime.now() - datetime.timedelta(minutes=25)
+            storage.save_active({'id': storage.generate_id(), 'task_name': 'active benchmark task',
+                                 'category': 'work', 'notes': '', 'start_time': start.isoformat(), 'date': today})
+    return n
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('data_dir')
+    ap.add_argument('--years', type=float, default=3)
+    ap.add_argument('--per-day', type=int, default=40)
+    ap.add_argument('--paused', type=int, default=5)
+    ap.add_argument('--no-active', dest='active', action='store_false')
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args()
+    if os.path.exists(os.path.join(args.data_dir, 'trackme.db')):
+        sys.exit(f'{args.data_dir} already has a trackme.db; refusing to add to it')
+    os.environ['TRACKME_HOME'] = os.path.abspath(args.data_dir)
+    from trackme import storage
+    n = generate(storage, args.years, args.per_day, args.paused, args.active, args.seed)
+    storage.close()
+    print(f'{n} completed tasks, {args.paused} paused, {int(args.active)} active in {args.data_dir}')
+
+if __name__ == '__main__':
+    main()
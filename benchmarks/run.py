@@ -0,0 +1,132 @@
+"""Benchmark suite for trackme's hot paths, with JSON results for comparison.
+
+    python -m benchmarks.run [--data-dir DIR] [--years 3] [--per-day 40]
+                             [-o results.json] [--compare baseline.json] [--threshold 1.25]
+
+Without --data-dir a scratch directory is generated with benchmarks.generate.
+An existing --data-dir is used as is (and written to by the write scenarios),
+so never point it at real data. --compare exits non-zero if any scenario's
+median is more than --threshold times slower than in the baseline file.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+
+from ._util import scratch_home, timed, summarize
+
+def scenarios(storage, tracker, utils, days):
+    rnd = random.Random(3)
+    pick = lambda: rnd.choice(days)
+
+    def save_completed():
+        tid = storage.generate_id()
+        now = datetime.datetime.now()
+        storage.save_completed({'id': tid, 'task_name': f'bench {tid}', 'category': 'bench', 'notes': '',
+                                'start_time': now.isoformat(), 'end_time': now.isoformat(), 'duration': 60,
+                                'date': now.date().isoformat(), 'status': 'completed'})
+
+    def view_day():
+        utils.view_day(pick())
+
+    def cycle():
+        task = tracker.start_new_task_quick('bench cycle', 'bench')
+        tracker.pause_active()
+        tracker.resume_task(task['id'])
+        tracker.stop_active()
+
+    def month():
+        d = datetime.date.fromisoformat(pick())
+        storage.get_monthly_summary(d.year, d.month)
+
+    return [
+        ('storage.save_completed', save_completed, 500),
+        ('storage.get_tasks_for_date', lambda: storage.get_tasks_for_date(pick()), 500),
+        ('storage.get_weekly_summary', lambda: storage.get_weekly_summary(pick()), 500),
+        ('storage.get_monthly_summary', month, 500),
+        ('utils.view_day render', view_day, 50),
+        ('tracker start/pause/resume/stop', cycle, 200),
+    ]
+
+def cold_start(n):
+    env = dict(os.environ)
+    run = lambda: subprocess.run([sys.executable, '-m', 'trackme.cli', 'status'], env=env,
+                                 stdout=subprocess.DEVNULL, check=True)
+    return [('cold process startup (trackme status)', run, n)]
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        old = {s['name']: s for s in json.load(f)['scenarios']}
+    regressions = 0
+    print(f'\ncompared with {baseline_path}:')
+    for s in results['scenarios']:
+        if s['name'] not in old:
+            continue
+        ratio = s['median_us'] / old[s['name']]['median_us']
+        bad = ratio > threshold
+        regressions += bad
+        print(f"  {'REGRESSION' if bad else 'ok        '} {s['name']:<40} x{ratio:5.2f}")
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--data-dir')
+    ap.add_argument('--years', type=float, default=3)
+    ap.add_argument('--per-day', type=int, default=40)
+    ap.add_argument('--cold-runs', type=int, default=20)
+    ap.add_argument('-o', '--output')
+    ap.add_argument('--compare')
+    ap.add_argument('--threshold', type=float, default=1.25)
+    args = ap.parse_args()
+
+    scratch_home(args.data_dir)
+    from trackme import storage, tracker, utils
+    from rich.console import Console
+    from . import generate
+    if not os.path.exists(storage.DB_FILE):
+        t0 = time.perf_counter()
+        n = generate.generate(storage, args.years, args.per_day)
+        print(f'generated {n} tasks in {time.perf_counter() - t0:.1f}s')
+    utils.console = Console(file=io.StringIO(), width=120)
+    days = [r[0] for r in storage.get_conn().execute('SELECT DISTINCT date FROM daily_rollup')] or [
+        datetime.date.today().isoformat()]
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'tasks': storage.get_conn().execute('SELECT COUNT(*) FROM tasks').fetchone()[0],
+        'scenarios': [],
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        samples = [(name, timed(fn, n)) for name, fn, n in scenarios(storage, tracker, utils, days)]
+    storage.close()
+    samples += [(name, timed(fn, n)) for name, fn, n in cold_start(args.cold_runs)]
+    for name, s in samples:
+        results['scenarios'].append(summarize(name, s))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'results written to {args.output}')
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
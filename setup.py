@@ -9,9 +9,14 @@ setup(
     install_requires=[
         'rich>=13.0.0'
     ],
+    extras_require={
+        # vectorised `trackme stats`; it falls back to the array module without it
+        'analytics': ['numpy'],
+    },
     entry_points={
         'console_scripts': [
             'trackme=trackme.cli:main',
+            'trackme-prompt=trackme.prompt:main',
         ],
     },
     python_requires='>=3.8',
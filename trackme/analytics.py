@@ -0,0 +1,311 @@
+"""Columnar analytics over the task history (`trackme stats`).
+
+`snapshot` reads a date range from SQLite once into parallel columns, one
+small integer per task:
+
+    day        day number (int32)
+    hour       local start hour, -1 without a start time (int8)
+    duration   seconds (int32)
+    category   index into Snapshot.categories ('' and NULL are '-') (int32)
+
+and `compute` derives every statistic from them in a few passes: daily
+totals with a trailing rolling average, per-category totals and duration
+histograms, and a weekday x hour heatmap of tracked time (by start hour, as
+in `report --group-by hour`). With NumPy installed (pip install
+trackme[analytics]) the passes are bincounts over the arrays; without it
+the columns are `array` buffers and one Python loop does the same work.
+TRACKME_NUMPY=0 forces the fallback.
+
+Reading the rows is most of the cost. With cache=True the columns are also
+written to analytics.cols in the data directory and later runs map that
+file instead of querying. It is used while the range it holds covers the
+one asked for and nothing has been saved since: every insert and edit bumps
+the changelog seq, and archiving changes the archive files, so the latest
+seq and the archives' sizes and mtimes are the file's key. Archived years
+are read like report reads them (storage.tasks_source).
+"""
+import array
+import json
+import mmap
+import os
+import sys
+from bisect import bisect_right
+
+from . import storage
+from .report import WEEKDAYS
+
+np = None
+if os.environ.get('TRACKME_NUMPY', '1') != '0':
+    try:
+        import numpy as np
+    except ImportError:
+        pass
+
+# (name, array typecode, numpy dtype)
+COLUMNS = (('day', 'i', 'i4'), ('hour', 'b', 'i1'), ('duration', 'i', 'i4'), ('category', 'i', 'i4'))
+SOURCE_COLUMNS = 'day, category, start_ts, utc_offset, duration'
+LOAD_SQL = """SELECT day, COALESCE((start_ts + utc_offset) % 86400 / 3600, -1),
+    MIN(COALESCE(duration, 0), 2147483647), COALESCE(NULLIF(category, ''), '-')
+    FROM {source} WHERE day BETWEEN ?1 AND ?2"""
+FETCH = 65536
+
+# lower bounds of the duration histogram bins, in seconds
+DURATION_BINS = (0, 300, 900, 1800, 3600, 7200)
+BIN_LABELS = ('<5m', '5-15m', '15-30m', '30m-1h', '1-2h', '2h+')
+
+CACHE_NAME = 'analytics.cols'
+MAGIC = b'trackme-columns 1\n'
+
+class _Codes(dict):
+    """Dictionary encoding: an unseen key gets the next code."""
+    def __missing__(self, key):
+        code = self[key] = len(self)
+        return code
+
+class Snapshot:
+    """Tasks of the day range [first, last] as columns (NumPy arrays or array-like buffers)."""
+    __slots__ = ('first', 'last', 'key', 'categories', 'columns')
+
+    def __init__(self, first, last, key, categories, columns):
+        self.first = first
+        self.last = last
+        self.key = key
+        self.categories = categories
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns['day'])
+
+def backend():
+    return 'numpy' if np is not None else 'array'
+
+def _signature(conn):
+    seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM changelog').fetchone()[0]
+    archives = []
+    for year in sorted(storage.archived_years()):
+        st = os.stat(storage.archive_path(year))
+        archives.append([year, st.st_size, st.st_mtime_ns])
+    return [seq, archives]
+
+def _view(buf, dtype):
+    return np.frombuffer(buf, dtype) if np is not None else buf
+
+def load(first, last, key=None):
+    """Query the day range [first, last] into a Snapshot."""
+    conn = storage.get_conn()
+    if key is None:
+        key = _signature(conn)
+    codes = _Codes()
+    day, hour, duration, category = cols = [array.array(code) for _, code, _ in COLUMNS]
+    cur = conn.execute(LOAD_SQL.format(source=storage.tasks_source(first, last, SOURCE_COLUMNS)), (first, last))
+    while True:
+        rows = cur.fetchmany(FETCH)
+        if not rows:
+            break
+        d, h, du, c = zip(*rows)
+        day.extend(d)
+        hour.extend(h)
+        duration.extend(du)
+        category.extend(map(codes.__getitem__, c))
+    columns = {name: _view(col, dtype) for (name, _, dtype), col in zip(COLUMNS, cols)}
+    return Snapshot(first, last, key, list(codes), columns)
+
+# Cache file: MAGIC, a JSON header line, then each column's bytes at an 8-byte boundary.
+def cache_path():
+    return storage.DB_DIR / CACHE_NAME
+
+def _align(n):
+    return (n + 7) & ~7
+
+def write_cache(snap, path=None):
+    path = path or cache_path()
+    header = {'first': snap.first, 'last': snap.last, 'key': snap.key, 'categories': snap.categories,
+              'count': len(snap), 'byteorder': sys.byteorder}
+    tmp = path.with_name(path.name + '.new')
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + json.dumps(header, separators=(',', ':')).encode() + b'\n')
+        for name, _, _ in COLUMNS:
+            f.write(b'\0' * (_align(f.tell()) - f.tell()))
+            f.write(snap.columns[name])
+    os.replace(tmp, path)
+
+def read_cache(path=None):
+    """The cached Snapshot, mapped rather than read, or None if there is no usable one."""
+    path = path or cache_path()
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            header = json.loads(f.readline())
+            offset = _align(f.tell())
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if header['byteorder'] != sys.byteorder:
+            return None
+        columns, count = {}, int(header['count'])
+        for name, code, dtype in COLUMNS:
+            size = count * array.array(code).itemsize
+            if not 0 <= size <= len(mm) - offset:
+                return None     # truncated
+            columns[name] = _view(memoryview(mm)[offset:offset + size].cast(code), dtype)
+            offset = _align(offset + size)
+        return Snapshot(header['first'], header['last'], header['key'], list(header['categories']), columns)
+    except (OSError, ValueError, LookupError, TypeError):
+        return None     # a torn or foreign header is a miss: the caller rebuilds
+
+def snapshot(date_from=None, date_to=None, cache=False):
+    """The tasks of a date range as a Snapshot, from the cache file when it is current."""
+    first, last = storage.day_range(date_from, date_to)
+    key = _signature(storage.get_conn())
+    if cache:
+        snap = read_cache()
+        if snap is not None and snap.key == key and snap.first <= first and last <= snap.last:
+            return snap
+    snap = load(first, last, key)
+    if cache:
+        write_cache(snap)
+    return snap
+
+# Statistics
+def _numpy_pass(snap, first, last):
+    c = snap.columns
+    day, hour, duration, category = c['day'], c['hour'], c['duration'], c['category']
+    if first > snap.first or last < snap.last:
+        keep = (day >= first) & (day <= last)
+        day, hour, duration, category = day[keep], hour[keep], duration[keep], category[keep]
+    if not len(day):
+        return None
+    lo, hi = int(day.min()), int(day.max())
+    ncat, nbins = len(snap.categories), len(DURATION_BINS)
+    weights = duration.astype(np.float64)
+    daily = np.bincount(day - lo, weights, hi - lo + 1)
+    totals = np.bincount(category, weights, ncat)
+    counts = np.bincount(category, minlength=ncat)
+    bins = np.searchsorted(np.array(DURATION_BINS[1:]), duration, side='right')
+    histogram = np.bincount(category.astype(np.int64) * nbins + bins, minlength=ncat * nbins)
+    timed = hour >= 0
+    cells = (day[timed] + 4) % 7 * 24 + hour[timed]
+    heatmap = np.bincount(cells, weights[timed], 7 * 24)
+    as_int = lambda a: a.round().astype(np.int64).tolist()
+    return (lo, hi, as_int(daily), as_int(totals), counts.tolist(), histogram.tolist(), as_int(heatmap))
+
+def _array_pass(snap, first, last):
+    c = snap.columns
+    day, hour, duration, category = c['day'], c['hour'], c['duration'], c['category']
+    if not len(day):
+        return None
+    narrow = first > snap.first or last < snap.last
+    if narrow:
+        inside = [d for d in day if first <= d <= last]
+        if not inside:
+            return None
+        lo, hi = min(inside), max(inside)
+    else:
+        lo, hi = min(day), max(day)
+    ncat, nbins = len(snap.categories), len(DURATION_BINS)
+    edges = DURATION_BINS[1:]
+    daily, totals, counts = [0] * (hi - lo + 1), [0] * ncat, [0] * ncat
+    histogram, heatmap = [0] * (ncat * nbins), [0] * (7 * 24)
+    for d, h, du, cat in zip(day, hour, duration, category):
+        if narrow and not first <= d <= last:
+            continue
+        daily[d - lo] += du
+        totals[cat] += du
+        counts[cat] += 1
+        histogram[cat * nbins + bisect_right(edges, du)] += 1
+        if h >= 0:
+            heatmap[(d + 4) % 7 * 24 + h] += du
+    return lo, hi, daily, totals, counts, histogram, heatmap
+
+def _rolling(values, window):
+    """Trailing mean over `window` entries (fewer at the start)."""
+    out, total = [], 0
+    for i, v in enumerate(values):
+        total += v
+        if i >= window:
+            total -= values[i - window]
+        out.append(total / min(i + 1, window))
+    return out
+
+def compute(snap, date_from=None, date_to=None, window=7):
+    """Statistics of the snapshot's tasks within [date_from, date_to] as a JSON-ready dict."""
+    first, last = storage.day_range(date_from, date_to)
+    first, last = max(first, snap.first), min(last, snap.last)
+    result = (_numpy_pass if np is not None else _array_pass)(snap, first, last)
+    out = {'from': date_from, 'to': date_to, 'backend': backend(), 'window': window, 'tasks': 0, 'total': 0,
+           'daily': [], 'bins': list(BIN_LABELS), 'categories': [], 'weekdays': WEEKDAYS, 'heatmap': []}
+    if result is None:
+        return out
+    lo, hi, daily, totals, counts, histogram, heatmap = result
+    # open-ended bounds follow the data; given ones keep their empty days
+    lo = first if date_from else lo
+    hi = last if date_to else hi
+    daily = [0] * (result[0] - lo) + daily + [0] * (hi - result[1])
+    nbins = len(DURATION_BINS)
+    out['tasks'], out['total'] = sum(counts), sum(totals)
+    out['daily'] = [[storage.day_date(lo + i), v, round(avg, 1)] for i, (v, avg) in enumerate(zip(daily, _rolling(daily, window)))]
+    cats = [{'category': name, 'total': totals[i], 'count': counts[i], 'avg': totals[i] / counts[i],
+             'histogram': histogram[i * nbins:(i + 1) * nbins]}
+            for i, name in enumerate(snap.categories) if counts[i]]
+    out['categories'] = sorted(cats, key=lambda r: (-r['total'], r['category']))
+    out['heatmap'] = [heatmap[w * 24:(w + 1) * 24] for w in range(7)]
+    return out
+
+SHADES = ' .:-=+*#%@'
+
+def print_stats(stats, days=14):
+    from rich.table import Table
+    from rich.console import Console
+    from .utils import format_seconds
+    console = Console()
+    span = f"{stats['from'] or 'start'} .. {stats['to'] or 'end'}"
+    console.print(f"[bold]Stats {span}[/bold]: {stats['tasks']} tasks, {format_seconds(stats['total'])} "
+                  f"({stats['backend']})")
+    table = Table(title='By category (duration histogram)')
+    table.add_column('Category')
+    for c in ('Total', 'Count', 'Avg', *stats['bins']):
+        table.add_column(c, justify='right')
+    for r in stats['categories']:
+        table.add_row(r['category'], format_seconds(r['total']), str(r['count']), format_seconds(r['avg']),
+                      *map(str, r['histogram']))
+    console.print(table)
+    # one character per hour, darker for more tracked time
+    peak = max((v for row in stats['heatmap'] for v in row), default=0) or 1
+    lines = ['     ' + ''.join(f'{h:<6}' for h in range(0, 24, 6))]
+    for name, row in zip(stats['weekdays'], stats['heatmap']):
+        lines.append(f'{name}  ' + ''.join(SHADES[min(len(SHADES) - 1, -(-v * (len(SHADES) - 1) // peak))] for v in row))
+    console.print('Weekday x start hour', highlight=False)
+    console.print('\n'.join(lines), highlight=False, markup=False)
+    if days and stats['daily']:
+        table = Table(title=f"Daily totals, {stats['window']}-day average")
+        table.add_column('Date')
+        table.add_column('Total', justify='right')
+        table.add_column('Average', justify='right')
+        for date, total, avg in stats['daily'][-days:]:
+            table.add_row(date, format_seconds(total), format_seconds(avg))
+        console.print(table)
+
+def main(argv):
+    """trackme stats [--from D] [--to D] [--window N] [--days N] [--cache] [--json]"""
+    import argparse
+    ap = argparse.ArgumentParser(prog='trackme stats')
+    ap.add_argument('--from', dest='date_from', type=storage.date_arg, metavar='YYYY-MM-DD',
+                    help='first day (default: the first task)')
+    ap.add_argument('--to', dest='date_to', type=storage.date_arg, metavar='YYYY-MM-DD',
+                    help='last day (default: the last task)')
+    ap.add_argument('--window', type=int, default=7, metavar='DAYS', help='rolling average window (default 7)')
+    ap.add_argument('--days', type=int, default=14, metavar='N', help='daily rows to print (default 14)')
+    ap.add_argument('--cache', action='store_true', help=f'reuse or write the columnar snapshot ({CACHE_NAME})')
+    ap.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = ap.parse_args(argv)
+    if args.window < 1:
+        ap.error('--window must be at least 1')
+    snap = snapshot(args.date_from, args.date_to, args.cache)
+    stats = compute(snap, args.date_from, args.date_to, args.window)
+    if args.json:
+        json.dump(stats, sys.stdout)
+        print()
+    elif not stats['tasks']:
+        print('No data for this range.')
+    else:
+        print_stats(stats, args.days)
+    return 0
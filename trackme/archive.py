@@ -0,0 +1,212 @@
+"""Hot/cold archival of old tasks (`trackme archive --before DATE`).
+
+Tasks dated before DATE move out of trackme.db into archive-YYYY.db, one
+file per year in the data directory, each with the tasks table and its own
+daily_rollup. viewday, viewweek, viewmonth and report attach the archives a
+range reaches into (see storage.tasks_source), so the move is invisible to
+them while the hot file, and the working set of everyday commands, stays
+small.
+
+Rows move in batches of --batch-size, each in its own short write
+transaction on the hot file: the batch is first committed to the archive,
+then deleted from tasks (the triggers take it out of daily_rollup and the
+search index) and recorded as 'archive' events in the journal, which follows
+the hot table. A crash between the two commits leaves a batch in both places
+and the next run finishes it. The freed pages are then returned to the file
+system: with one full VACUUM the first time, which switches the hot file to
+incremental auto-vacuum, and with short incremental_vacuum steps after that.
+
+search, analyze and export read the archives through tasks_source as well
+(each archive has its own search index). Sync no longer exports archived
+tasks, and an import skips the uids found in an archive, so a delta from
+another machine cannot bring them back into the hot file (each archive
+indexes uid for that lookup).
+"""
+import os
+import sqlite3
+import time
+
+from . import storage, journal
+
+BATCH = 2000
+# pages freed per incremental_vacuum step (each step is its own transaction)
+VACUUM_STEP = 2048
+SCHEMA_VERSION = 3
+
+COLUMNS = storage.STORED_COLUMNS + ['uid']
+SELECT_SQL = f"SELECT {','.join(COLUMNS)} FROM tasks WHERE day < ? LIMIT ?"
+INSERT_SQL = f"INSERT INTO tasks ({','.join(COLUMNS)}) VALUES ({','.join(['?'] * len(COLUMNS))})"
+
+ROLLUP_TABLE_SQL = """CREATE TABLE daily_rollup (
+    date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (date, category)
+) WITHOUT ROWID"""
+# version 2: sync.import_delta looks archived uids up
+UID_INDEX_SQL = 'CREATE INDEX IF NOT EXISTS idx_tasks_uid ON tasks (uid)'
+
+def _add_fts(conn):
+    """Version 3: the hot file's search index, so `trackme search` reaches archived years."""
+    try:
+        conn.execute(storage.FTS_TABLE_SQL)
+    except sqlite3.OperationalError:
+        return    # no FTS5: search falls back to LIKE here as well
+    for trigger in storage.FTS_TRIGGERS:
+        conn.execute(trigger)
+    conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+
+def _create(path):
+    """Build an empty archive next to `path` and move it into place, so readers never see half a schema."""
+    tmp = path.with_name(path.name + '.new')
+    if tmp.exists():
+        tmp.unlink()
+    conn = sqlite3.connect(tmp, isolation_level=None)
+    try:
+        conn.execute('BEGIN')
+        conn.execute(storage.TASKS_TABLE_SQL)
+        conn.execute('ALTER TABLE tasks ADD COLUMN uid TEXT')
+        for sql in storage.TASK_INDEXES + (UID_INDEX_SQL, ROLLUP_TABLE_SQL) + storage.CURRENT_ROLLUP_TRIGGERS:
+            conn.execute(sql)
+        _add_fts(conn)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+
+def _open(year):
+    path = storage.archive_path(year)
+    if not path.exists():
+        _create(path)
+    # rollback journal rather than WAL: each archive stays one self-contained file
+    conn = sqlite3.connect(path, timeout=storage.BUSY_TIMEOUT, isolation_level=None)
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version in (1, 2):
+        conn.execute('BEGIN IMMEDIATE')
+        if version == 1:
+            conn.execute(UID_INDEX_SQL)
+            conn.execute('DROP TRIGGER IF EXISTS tasks_rollup_upd')
+            conn.execute(storage.ROLLUP_UPDATE_TRIGGER)
+        _add_fts(conn)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.execute('COMMIT')
+        version = SCHEMA_VERSION
+    if version != SCHEMA_VERSION:
+        conn.close()
+        raise sqlite3.DatabaseError(f'{path}: unsupported archive version {version}')
+    return conn
+
+def _year(row):
+    return int(storage.day_date(row[COLUMNS.index('day')])[:4])
+
+def _store(archives, rows):
+    """Commit `rows` to their years' archives; rows already there are replaced."""
+    by_year = {}
+    for row in rows:
+        by_year.setdefault(_year(row), []).append(row)
+    for year, part in by_year.items():
+        if year not in archives:
+            archives[year] = _open(year)
+        conn = archives[year]
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # DELETE then INSERT rather than REPLACE, so the rollup triggers see both
+            conn.executemany('DELETE FROM tasks WHERE id = ?', ((r[0],) for r in part))
+            conn.executemany(INSERT_SQL, part)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+    return {year: len(part) for year, part in by_year.items()}
+
+def move(before, batch=BATCH):
+    """Move the tasks dated before `before` into the archives.
+
+    Returns ({year: tasks moved}, batches, longest write transaction in seconds).
+    """
+    cutoff = storage.day_number(before)
+    archives, moved, batches, longest = {}, {}, 0, 0.0
+    try:
+        while True:
+            t0 = time.perf_counter()
+            with storage.transaction() as conn:
+                rows = conn.execute(SELECT_SQL, (cutoff, batch)).fetchall()
+                if not rows:
+                    break
+                for year, n in _store(archives, rows).items():
+                    moved[year] = moved.get(year, 0) + n
+                ids = [(r[0],) for r in rows]
+                conn.executemany('DELETE FROM tasks WHERE id = ?', ids)
+                conn.executemany('DELETE FROM changelog WHERE task_id = ?', ids)
+                journal.record_many('archive', ids)
+            batches += 1
+            longest = max(longest, time.perf_counter() - t0)
+    finally:
+        for conn in archives.values():
+            conn.close()
+        storage.clear_cache()
+    return moved, batches, longest
+
+def vacuum(step=VACUUM_STEP):
+    """Return the hot file's free pages to the file system; returns its (old, new) size in bytes.
+
+    The first run's full VACUUM adds the pointer-map pages incremental mode needs,
+    so the file can come out a little larger when there was little to free.
+    """
+    conn = storage.get_conn()
+    size = os.path.getsize(storage.DB_FILE)
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+        while conn.execute('PRAGMA freelist_count').fetchone()[0]:
+            conn.execute(f'PRAGMA incremental_vacuum({step})').fetchall()
+    else:
+        # auto_vacuum only changes with a full VACUUM; from then on the steps above do
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return size, os.path.getsize(storage.DB_FILE)
+
+def archives():
+    """[(year, tasks, bytes)] for every archive file."""
+    out = []
+    for year in sorted(storage.archived_years()):
+        path = storage.archive_path(year)
+        conn = sqlite3.connect(path)
+        try:
+            count = conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+        finally:
+            conn.close()
+        out.append((year, count, os.path.getsize(path)))
+    return out
+
+def main(argv):
+    """trackme archive [--before YYYY-MM-DD] [--batch-size N] [--no-vacuum]"""
+    import argparse
+    ap = argparse.ArgumentParser(prog='trackme archive',
+                                 description='Move old tasks into per-year archive files; without --before, list the archives.')
+    ap.add_argument('--before', type=storage.date_arg, metavar='YYYY-MM-DD', help='archive the tasks dated before this day')
+    ap.add_argument('--batch-size', type=int, default=BATCH, metavar='N',
+                    help=f'tasks moved per write transaction (default {BATCH})')
+    ap.add_argument('--no-vacuum', action='store_true', help='leave the freed space in trackme.db')
+    args = ap.parse_args(argv)
+    if args.batch_size < 1:
+        ap.error('--batch-size must be at least 1')
+    if args.before is None:
+        rows = archives()
+        if not rows:
+            print('No archives.')
+        for year, count, size in rows:
+            print(f'{year}  {count:>8} tasks  {size / 2**20:7.1f} MiB  {storage.archive_path(year)}')
+        return 0
+    moved, batches, longest = move(args.before, args.batch_size)
+    if not moved:
+        print(f'No tasks before {args.before}.')
+        return 0
+    years = ', '.join(f'{year}: {n}' for year, n in sorted(moved.items()))
+    print(f'Archived {sum(moved.values())} tasks ({years}) in {batches} batches; '
+          f'longest write lock {longest * 1000:.0f}ms.')
+    if not args.no_vacuum:
+        old, new = vacuum()
+        print(f'Vacuumed trackme.db: {old / 2**20:.1f} MiB -> {new / 2**20:.1f} MiB.')
+    return 0
@@ -0,0 +1,197 @@
+"""Streaming bulk export/import of completed tasks (CSV and JSONL).
+
+Export iterates a single SQLite cursor, so memory stays flat however many
+rows there are. Import parses lazily, validates each record, and inserts
+with executemany in batches, one transaction per batch. Imported ids that
+are missing or already taken are remapped to fresh ones.
+"""
+import argparse
+import csv
+import datetime
+import json
+import sys
+from itertools import islice
+
+from . import storage, profiling, journal
+
+COLUMNS = storage.TASK_COLUMNS
+DEFAULT_BATCH = 5000
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+def _guess_format(path, fmt):
+    if fmt:
+        return fmt
+    return 'csv' if path and path.endswith('.csv') else 'jsonl'
+
+# Export
+def iter_tasks(date_from=None, date_to=None):
+    """Completed tasks in range, archived years included, in day and start order."""
+    bounds = storage.day_range(date_from, date_to)
+    source = storage.tasks_source(*bounds, ','.join(COLUMNS + ['day', 'start_ts']))
+    sql = f"SELECT {','.join(COLUMNS)} FROM {source} WHERE day BETWEEN ?1 AND ?2 ORDER BY day, start_ts, id"
+    cur = storage.get_conn().execute(sql, bounds)
+    for row in cur:
+        yield tuple(row)
+
+def export_tasks(out, fmt='jsonl', date_from=None, date_to=None):
+    n = 0
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(COLUMNS)
+        for n, row in enumerate(iter_tasks(date_from, date_to), 1):
+            writer.writerow(row)
+    else:
+        for n, row in enumerate(iter_tasks(date_from, date_to), 1):
+            line = _encode(dict(zip(COLUMNS, row))) + '\n'
+            out.write(line)
+            if profiling.enabled:
+                profiling.add_bytes('json_written', len(line.encode()))
+    return n
+
+# Import
+class InvalidRecord(ValueError):
+    pass
+
+def _int_or_none(v):
+    if v is None or v == '':
+        return None
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        raise InvalidRecord(f'not an integer: {v!r}')
+
+def validate(rec):
+    """Normalise one input record into a tuple ordered like COLUMNS."""
+    if not isinstance(rec, dict):
+        raise InvalidRecord('record is not an object')
+    for key in ('task_name', 'category', 'notes', 'status'):
+        if rec.get(key) is not None and not isinstance(rec[key], str):
+            raise InvalidRecord(f'{key} is not a string: {rec[key]!r}')
+    name = (rec.get('task_name') or '').strip()
+    if not name:
+        raise InvalidRecord('task_name is required')
+    start = rec.get('start_time') or None
+    end = rec.get('end_time') or None
+    try:
+        for ts in (start, end):
+            if ts:
+                datetime.datetime.fromisoformat(ts)
+        date = rec.get('date') or (start[:10] if start else None)
+        if date:
+            datetime.date.fromisoformat(date)
+    except (TypeError, ValueError):
+        raise InvalidRecord('bad date or timestamp')
+    if not date:
+        raise InvalidRecord('date or start_time is required')
+    duration = _int_or_none(rec.get('duration'))
+    if duration is None and start and end:
+        duration = int((datetime.datetime.fromisoformat(end) - datetime.datetime.fromisoformat(start)).total_seconds())
+    return (_int_or_none(rec.get('id')), name, rec.get('category') or '', rec.get('notes') or '',
+            start, end, duration or 0, date, rec.get('status') or 'completed')
+
+def parse(lines, fmt):
+    """Yield (line_no, record) pairs; records are dicts or the exception raised while parsing."""
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for rec in reader:
+            yield reader.line_num, rec
+        return
+    for n, line in enumerate(lines, 1):
+        if profiling.enabled:
+            profiling.add_bytes('json_read', len(line.encode()))
+        if line.strip():
+            try:
+                yield n, json.loads(line)
+            except ValueError as e:
+                yield n, InvalidRecord(f'bad JSON: {e}')
+
+def _taken_ids(conn, ids):
+    taken = set()
+    for i in range(0, len(ids), storage.IN_CHUNK):
+        chunk = ids[i:i + storage.IN_CHUNK]
+        # numbered parameters, so both lists share one set of bound values
+        marks = ','.join(f'?{k}' for k in range(1, len(chunk) + 1))
+        taken.update(r[0] for r in conn.execute(
+            f'SELECT id FROM tasks WHERE id IN ({marks}) UNION SELECT id FROM live_tasks WHERE id IN ({marks})',
+            chunk))
+    return taken
+
+def import_tasks(lines, fmt='jsonl', batch_size=DEFAULT_BATCH, errors=None):
+    """Import records; returns (imported, remapped, skipped).
+
+    Invalid records are skipped and, if `errors` is a list, appended to it as
+    (line_no, message).
+    """
+    imported = remapped = skipped = 0
+    records = parse(lines, fmt)
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            break
+        batch = []
+        for n, rec in chunk:
+            try:
+                if isinstance(rec, Exception):
+                    raise rec
+                batch.append(validate(rec))
+            except InvalidRecord as e:
+                skipped += 1
+                if errors is not None:
+                    errors.append((n, str(e)))
+        if not batch:
+            continue
+        with storage.transaction() as conn:
+            # read under this batch's write lock: other processes may have taken ids since the last one
+            next_free = conn.execute(storage.NEXT_ID_SQL).fetchone()[0]
+            ids = [r[0] for r in batch if r[0] is not None]
+            taken = _taken_ids(conn, ids)
+            # fresh ids go past the batch's own ids, so one remapped row cannot displace the next
+            next_free = max([next_free] + [i + 1 for i in ids])
+            rows = []
+            for row in batch:
+                tid = row[0]
+                if tid is None or tid in taken:
+                    remapped += tid is not None
+                    tid = next_free
+                taken.add(tid)
+                next_free = max(next_free, tid + 1)
+                rows.append((tid,) + row[1:])
+            conn.executemany(storage.INSERT_TASK_SQL, map(storage.task_row, rows))
+            journal.record_many('import', rows)
+            conn.execute("UPDATE meta SET value = MAX(value, ?) WHERE key = 'next_id'", (next_free,))
+        imported += len(rows)
+    return imported, remapped, skipped
+
+def main(cmd, argv):
+    """trackme export [...] / trackme import FILE [...]"""
+    ap = argparse.ArgumentParser(prog=f'trackme {cmd}')
+    ap.add_argument('--format', choices=('csv', 'jsonl'), help='default: from the file extension, else jsonl')
+    if cmd == 'export':
+        ap.add_argument('-o', '--output', help='file to write (default stdout)')
+        ap.add_argument('--from', dest='date_from', type=storage.date_arg, metavar='YYYY-MM-DD')
+        ap.add_argument('--to', dest='date_to', type=storage.date_arg, metavar='YYYY-MM-DD')
+        args = ap.parse_args(argv)
+        fmt = _guess_format(args.output, args.format)
+        if not args.output:
+            n = export_tasks(sys.stdout, fmt, args.date_from, args.date_to)
+        else:
+            with open(args.output, 'w', encoding='utf-8', newline='') as out:
+                n = export_tasks(out, fmt, args.date_from, args.date_to)
+        print(f'Exported {n} tasks.', file=sys.stderr)
+        return 0
+    ap.add_argument('file', help="file to read, or '-' for stdin")
+    ap.add_argument('--batch-size', type=int, default=DEFAULT_BATCH)
+    args = ap.parse_args(argv)
+    fmt = _guess_format(args.file, args.format)
+    errors = []
+    if args.file == '-':
+        result = import_tasks(sys.stdin, fmt, args.batch_size, errors)
+    else:
+        with open(args.file, encoding='utf-8', newline='') as f:
+            result = import_tasks(f, fmt, args.batch_size, errors)
+    for n, msg in errors[:20]:
+        print(f'line {n}: {msg}', file=sys.stderr)
+    if len(errors) > 20:
+        print(f'... and {len(errors) - 20} more invalid records', file=sys.stderr)
+    print('Imported {} tasks ({} ids remapped, {} invalid records skipped).'.format(*result))
+    return 1 if errors else 0
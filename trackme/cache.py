@@ -0,0 +1,80 @@
+from collections import OrderedDict
+
+def _copy(value):
+    # Callers decorate the rows they get back (view_day fills in status), so
+    # the cache only ever hands out copies. Rows are dicts or Task records.
+    if isinstance(value, list):
+        return [r.copy() for r in value]
+    if value is not None:
+        return value.copy()
+    return value
+
+class ViewCache:
+    """Bounded LRU of query results, invalidated by tag.
+
+    Each entry carries tags such as ('day', '2024-05-01'); a write calls
+    invalidate() with the tags it affects and only those entries are dropped.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.tagged = {}
+        self.data_version = None
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key, load, tags=()):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return _copy(entry[0])
+        self.misses += 1
+        value = load()
+        self.put(key, value, tags)
+        return _copy(value)
+
+    def put(self, key, value, tags=()):
+        self.discard(key)
+        self.entries[key] = (value, tags)
+        for tag in tags:
+            self.tagged.setdefault(tag, set()).add(key)
+        while len(self.entries) > self.maxsize:
+            self.discard(next(iter(self.entries)))
+            self.evictions += 1
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        for tag in entry[1]:
+            keys = self.tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tagged[tag]
+        return True
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            for key in list(self.tagged.get(tag, ())):
+                if self.discard(key):
+                    self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+        self.tagged.clear()
+
+    def check_version(self, version):
+        """Drop everything if another connection has committed since the last check."""
+        if version != self.data_version:
+            if self.data_version is not None:
+                self.clear()
+            self.data_version = version
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'size': len(self.entries), 'maxsize': self.maxsize,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
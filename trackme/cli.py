@@ -1,5 +1,9 @@
 import sys
-from . import tracker, utils, storage
+
+# tracker/storage (and sqlite3 behind them) are imported inside the functions
+# below, so that `trackme prompt` can answer before any of them load.
+# Commands that render tables; only these import utils (and with it rich).
+RENDER_COMMANDS = ('viewday', 'viewweek', 'viewmonth', 'rollup')
 
 HELP_TEXT = """TrackMe - interactive mode (commands)
 Commands:
@@ -9,10 +13,33 @@ Commands:
   stop [<id>]                  Stop active task or stop a paused task by id
   complete [<id>]              Mark a paused or active task as completed (without resuming)
   status                       Show active task status
-  viewday [YYYY-MM-DD]         Show tasks for day (default today)
+  prompt [--format FMT]        One-line active task for shell prompts (one-liner only)
+  viewday [YYYY-MM-DD] [--format table|tsv|json] [--limit N] [--offset N]
+                               Show tasks for day (default today)
   viewweek [YYYY-MM-DD]        Show weekly summary (week of date)
   viewmonth [YYYY MM]          Show monthly summary
   paused                       List paused tasks
+  report [--from D] [--to D] [--group-by category|task|date|hour|weekday|profile] [--profiles A,B|all] [--json]
+                               Totals, counts, averages and percentiles (one-liner only)
+  analyze [--from D] [--to D] [--clip] [--min-gap S] [--limit N] [--json]
+                               Overlaps, gaps and idle time per day (one-liner only)
+  stats [--from D] [--to D] [--window N] [--days N] [--cache] [--json]
+                               Rolling averages, duration histograms, weekday x hour heatmap (one-liner only)
+  search QUERY [--from D] [--to D] [--limit N] [--sort rank|date]
+                               Full-text search of task names and notes (one-liner only)
+  batch [FILE] [--atomic]      Run commands from FILE or stdin in one process (one-liner only)
+  journal verify|replay [--at T]|snapshot|compact [--before T]
+                               Event history of every transition (one-liner only)
+  rollup [check|rebuild]       Verify or rebuild the daily summary table
+  daemon [run|stop|status]     Keep trackme resident; one-liners are forwarded to it (one-liner only)
+  export [-o FILE] [--from D] [--to D]   Stream tasks out as CSV/JSONL (one-liner only)
+  import FILE [--batch-size N] Bulk-load tasks from CSV/JSONL (one-liner only)
+  sync export [-o FILE] [--since SEQ] [--peer NAME] | sync import FILE | sync status
+                               Ship changed tasks between machines as delta files (one-liner only)
+  archive [--before D] [--batch-size N] [--no-vacuum]
+                               Move tasks dated before D into per-year archive files (one-liner only)
+  profiles                     List profiles; pick one with trackme -P NAME ... (one-liner only)
+  cache                        Show view cache hits/misses (interactive mode only)
   help                         Show this help
   exit                         Quit
 """
@@ -20,7 +47,10 @@ Commands:
 def _one_liner(args):
     if not args:
         return False
+    from . import tracker
     cmd = args[0]
+    if cmd in RENDER_COMMANDS:
+        from . import utils
     if cmd == 'start':
         name = ' '.join(args[1:]).strip() or None
         if name:
@@ -65,8 +95,12 @@ def _one_liner(args):
         tracker.status()
         return True
     if cmd == 'viewday':
-        dt = args[1] if len(args) > 1 else ''
-        utils.view_day(dt)
+        try:
+            dt, opts = _day_args(args[1:])
+        except CommandError as e:
+            print(e)
+            return True
+        utils.view_day(dt, **opts)
         return True
     if cmd == 'viewweek':
         dt = args[1] if len(args) > 1 else ''
@@ -82,9 +116,114 @@ def _one_liner(args):
         else:
             utils.view_month()
         return True
+    if cmd == 'rollup':
+        utils.rollup(args[1] if len(args) > 1 else 'check')
+        return True
     return False
 
+class CommandError(Exception):
+    """Bad arguments for a REPL/batch command."""
+
+# Commands whose tracker call returns None when nothing was changed.
+TRANSITIONS = ('start', 'pause', 'resume', 'stop', 'complete')
+
+def _task_id(arg):
+    try:
+        return int(arg)
+    except ValueError:
+        raise CommandError('ID must be a number')
+
+DAY_USAGE = 'Usage: viewday [YYYY-MM-DD] [--format table|tsv|json] [--limit N] [--offset N]'
+
+def _day_args(args):
+    """Split viewday arguments into the date and view_day keyword options."""
+    import datetime
+    dt, opts = '', {}
+    args = list(args)
+    while args:
+        a = args.pop(0)
+        if a in ('--format', '--limit', '--offset') and args:
+            value = args.pop(0)
+            if a == '--format':
+                if value not in ('table', 'tsv', 'json'):
+                    raise CommandError(DAY_USAGE)
+                opts['fmt'] = value
+            else:
+                try:
+                    opts[a[2:]] = int(value)
+                except ValueError:
+                    raise CommandError(DAY_USAGE)
+                if opts[a[2:]] < 0:
+                    raise CommandError(DAY_USAGE)
+        elif a.startswith('-') or dt:
+            raise CommandError(DAY_USAGE)
+        else:
+            try:
+                datetime.date.fromisoformat(a)
+            except ValueError:
+                raise CommandError(f'Invalid date {a!r}. {DAY_USAGE}')
+            dt = a
+    return dt, opts
+
+def run_command(cmd, args, interactive=True):
+    """Execute one command in REPL syntax and return the tracker result, if any."""
+    from . import tracker
+    if cmd == 'start':
+        name = ' '.join(args).strip()
+        if name:
+            return tracker.start_new_task_quick(name)
+        if not interactive:
+            raise CommandError('Usage: start <task name>')
+        return tracker.start_new_task_interactive()
+    if cmd == 'pause':
+        return tracker.pause_active()
+    if cmd == 'resume':
+        if not args:
+            raise CommandError('Usage: resume <id>')
+        return tracker.resume_task(_task_id(args[0]))
+    if cmd == 'stop':
+        return tracker.stop_paused(_task_id(args[0])) if args else tracker.stop_active()
+    if cmd == 'complete':
+        return tracker.complete_task(_task_id(args[0]) if args else None)
+    if cmd == 'status':
+        return tracker.status()
+    from . import utils
+    if cmd == 'paused':
+        utils.show_paused()
+    elif cmd == 'viewday':
+        dt, opts = _day_args(args)
+        utils.view_day(dt, **opts)
+    elif cmd == 'viewweek':
+        utils.view_week(args[0] if args else '')
+    elif cmd == 'viewmonth':
+        if len(args) >= 2:
+            try:
+                y = int(args[0]); m = int(args[1])
+            except ValueError:
+                raise CommandError('Usage: viewmonth YEAR MONTH')
+            if not (1 <= y <= 9999 and 1 <= m <= 12):
+                raise CommandError('Usage: viewmonth YEAR MONTH (month 1-12)')
+            utils.view_month(y, m)
+        else:
+            utils.view_month()
+    elif cmd == 'rollup':
+        utils.rollup(args[0] if args else 'check')
+    else:
+        raise CommandError('Unknown command. Type help for commands.')
+    return None
+
+def _cache_stats():
+    from . import storage
+    stats = storage.cache_stats()
+    if stats is None:
+        return 'View cache is off.'
+    return ('View cache: {hits} hits, {misses} misses ({rate:.0%} hit rate), {size}/{maxsize} entries, '
+            '{evictions} evicted, {invalidations} invalidated').format(rate=stats['hit_rate'], **stats)
+
 def repl():
+    from . import storage
+    # The session stays open all day, so repeated views are served from memory.
+    storage.enable_cache()
     print('🎯 TrackMe Interactive Mode — type help for commands, exit to quit')
     try:
         while True:
@@ -93,75 +232,209 @@ def repl():
                 continue
             parts = line.split()
             cmd = parts[0].lower()
-            args = parts[1:]
             if cmd == 'help':
                 print(HELP_TEXT)
-            elif cmd == 'start':
-                name = ' '.join(args).strip() or None
-                tracker.start_new_task_quick(name) if name else tracker.start_new_task_interactive()
-            elif cmd == 'pause':
-                tracker.pause_active()
-            elif cmd == 'resume':
-                if not args:
-                    print('Usage: resume <id>')
-                    continue
-                try:
-                    tid = int(args[0])
-                    tracker.resume_task(tid)
-                except:
-                    print('ID must be number')
-                    continue
-            elif cmd == 'stop':
-                if args:
-                    try:
-                        tid = int(args[0])
-                        tracker.stop_paused(tid)
-                    except:
-                        print('ID must be a number')
-                else:
-                    tracker.stop_active()
-            elif cmd == 'complete':
-                if args:
-                    try:
-                        tid = int(args[0])
-                        tracker.complete_task(tid)
-                    except:
-                        print('ID must be a number')
-                else:
-                    tracker.complete_task(None)
-            elif cmd == 'status':
-                tracker.status()
-            elif cmd == 'paused':
-                utils.show_paused()
-            elif cmd == 'viewday':
-                dt = args[0] if args else ''
-                utils.view_day(dt)
-            elif cmd == 'viewweek':
-                dt = args[0] if args else ''
-                utils.view_week(dt)
-            elif cmd == 'viewmonth':
-                if len(args) >= 2:
-                    try:
-                        y = int(args[0]); m = int(args[1])
-                        utils.view_month(y,m)
-                    except:
-                        print('Usage: viewmonth YEAR MONTH')
-                else:
-                    utils.view_month()
+            elif cmd == 'cache':
+                print(_cache_stats())
             elif cmd in ('exit','quit'):
                 print('👋 Goodbye!')
                 break
             else:
-                print('Unknown command. Type help for commands.')
+                try:
+                    run_command(cmd, parts[1:])
+                except CommandError as e:
+                    print(e)
     except (EOFError, KeyboardInterrupt):
         print('\n👋 Goodbye!')
 
+BATCH_CHUNK = 500
+
+def run_batch(lines, atomic=False, quiet=False):
+    """Run REPL-syntax commands in one process; returns a list of (line_no, line, error).
+
+    Writes are grouped into transactions of BATCH_CHUNK commands, each command
+    in its own savepoint so a failure only undoes that command. With atomic=True
+    the whole batch is one transaction and the first failure rolls it all back.
+    """
+    import contextlib, io
+    from . import storage
+
+    class Failed(Exception):
+        pass
+
+    errors = []
+    out = io.StringIO() if quiet else sys.stdout
+    commands = [(n, line.strip()) for n, line in enumerate(lines, 1)]
+    commands = [(n, line) for n, line in commands if line and not line.startswith('#')]
+    chunk = len(commands) if atomic else BATCH_CHUNK
+    try:
+        for i in range(0, len(commands), max(chunk, 1)):
+            with storage.transaction(), contextlib.redirect_stdout(out):
+                for n, line in commands[i:i + chunk]:
+                    parts = line.split()
+                    cmd = parts[0].lower()
+                    try:
+                        with storage.transaction():
+                            result = run_command(cmd, parts[1:], interactive=False)
+                            if result is None and cmd in TRANSITIONS:
+                                raise CommandError('no matching task')
+                    except Exception as e:
+                        errors.append((n, line, str(e) or e.__class__.__name__))
+                        if atomic:
+                            raise Failed()
+                    if quiet:
+                        out.seek(0)
+                        out.truncate()
+    except Failed:
+        pass
+    return errors
+
+def batch(args):
+    """trackme batch [FILE|-] [--atomic] [--quiet]"""
+    atomic = '--atomic' in args
+    quiet = '--quiet' in args or '-q' in args
+    paths = [a for a in args if not a.startswith('-') or a == '-']
+    if len(paths) > 1:
+        print('Usage: trackme batch [FILE|-] [--atomic] [--quiet]')
+        return 2
+    if not paths or paths[0] == '-':
+        lines = sys.stdin.readlines()
+    else:
+        with open(paths[0], encoding='utf-8') as f:
+            lines = f.readlines()
+    errors = run_batch(lines, atomic=atomic, quiet=quiet)
+    for n, line, err in errors:
+        print(f'line {n}: {line}: {err}', file=sys.stderr)
+    if errors and atomic:
+        print('batch rolled back: no commands were applied', file=sys.stderr)
+    elif errors:
+        print(f'{len(errors)} command(s) failed; the rest were applied', file=sys.stderr)
+    return 1 if errors else 0
+
+def _setup_profiling(argv):
+    """Consume leading profiling options and enable instrumentation if asked for.
+
+    --profile[=FILE]  span/SQL/JSON breakdown to stderr (or JSON to FILE); also TRACKME_TRACE
+    --slow-ms N       slow-query log threshold; also TRACKME_SLOW_MS
+    --cprofile FILE   cProfile dump; also TRACKME_CPROFILE
+    """
+    import os
+    trace = os.environ.get('TRACKME_TRACE')
+    slow = os.environ.get('TRACKME_SLOW_MS')
+    cprofile = os.environ.get('TRACKME_CPROFILE')
+    while argv and argv[0].startswith('--'):
+        opt = argv.pop(0)
+        if opt == '--profile':
+            trace = trace or '1'
+        elif opt.startswith('--profile='):
+            trace = opt.split('=', 1)[1]
+        elif opt == '--slow-ms' and argv:
+            slow = argv.pop(0)
+        elif opt == '--cprofile' and argv:
+            cprofile = argv.pop(0)
+        else:
+            argv.insert(0, opt)
+            break
+    if trace or slow or cprofile:
+        from . import profiling
+        profiling.install(output=None if trace in (None, '', '1') else trace,
+                          slow_ms=float(slow) if slow else None, cprofile=cprofile, report=bool(trace))
+    return argv
+
+def _select_data_dir(argv):
+    """Consume leading data directory options; they are passed on through the environment.
+
+    -P/--data-profile NAME  profile NAME (see profiles.py); also TRACKME_PROFILE
+    --home DIR              DIR instead of ~/.trackme; also TRACKME_HOME
+
+    (--profile is the profiling switch.) Profiling options are left in place.
+    """
+    import os
+    rest = []
+    while argv and argv[0].startswith('-'):
+        opt = argv.pop(0)
+        if opt in ('-P', '--data-profile', '--home') and argv:
+            value = argv.pop(0)
+        elif opt.startswith(('--data-profile=', '--home=')):
+            opt, value = opt.split('=', 1)
+        else:
+            rest.append(opt)
+            if opt in ('--slow-ms', '--cprofile') and argv:
+                rest.append(argv.pop(0))
+            continue
+        if opt == '--home':
+            os.environ['TRACKME_HOME'] = os.path.abspath(os.path.expanduser(value))
+        else:
+            os.environ['TRACKME_PROFILE'] = value
+    return rest + argv
+
+def run(argv):
+    """Run one command line (without the program name) in this process; returns the exit status."""
+    cmd = argv[0]
+    if cmd == 'batch':
+        return batch(argv[1:])
+    if cmd in ('export', 'import'):
+        from . import bulk
+        return bulk.main(cmd, argv[1:])
+    if cmd == 'report':
+        from . import report
+        return report.main(argv[1:])
+    if cmd == 'analyze':
+        from . import intervals
+        return intervals.main(argv[1:])
+    if cmd == 'journal':
+        from . import journal
+        return journal.main(argv[1:])
+    if cmd == 'stats':
+        from . import analytics
+        return analytics.main(argv[1:])
+    if cmd == 'search':
+        from . import search
+        return search.main(argv[1:])
+    if cmd == 'sync':
+        from . import sync
+        return sync.main(argv[1:])
+    if cmd == 'archive':
+        from . import archive
+        return archive.main(argv[1:])
+    if cmd == 'profiles':
+        from . import profiles
+        return profiles.main(argv[1:])
+    _one_liner(argv)
+    return 0
+
 def main():
+    import os
+    from .paths import valid_profile
+    sys.argv[1:] = _select_data_dir(sys.argv[1:])
+    profile = os.environ.get('TRACKME_PROFILE')
+    if profile and not valid_profile(profile):
+        print(f'trackme: invalid profile name {profile!r} (letters, digits, - _ . only)', file=sys.stderr)
+        sys.exit(2)
+    if sys.argv[1:2] == ['prompt']:
+        # before the daemon client, which would import json and socket
+        from . import prompt
+        sys.exit(prompt.main(sys.argv[2:]))
+    from . import daemon
+    if sys.argv[1:2] == ['daemon']:
+        sys.exit(daemon.main(sys.argv[2:]))
+    # Handled by a running `trackme daemon` when there is one.
+    status = daemon.forward(sys.argv[1:])
+    if status is not None:
+        sys.exit(status)
+    sys.argv[1:] = _setup_profiling(sys.argv[1:])
+    if sys.argv[1:2] == ['prompt']:
+        from . import prompt
+        sys.exit(prompt.main(sys.argv[2:]))
+    from . import storage
     storage.init_db()
-    if len(sys.argv) > 1:
-        _one_liner(sys.argv[1:])
-    else:
-        repl()
+    try:
+        if len(sys.argv) > 1:
+            sys.exit(run(sys.argv[1:]))
+        else:
+            repl()
+    finally:
+        storage.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,284 @@
+"""Resident mode: `trackme daemon` and the client that forwards to it.
+
+A plain `trackme status` starts an interpreter, imports sqlite3 and rich,
+opens the database and checks its migrations, all to answer one query. The
+daemon does that once, keeps the connection and the view cache warm, and
+runs the commands it is sent over a Unix socket in the data directory.
+
+cli.main forwards FORWARDED commands whenever the socket answers and runs
+them in-process otherwise, or always with TRACKME_DAEMON=0. Only the client
+half is imported on that path; asyncio and the rest of trackme load in the
+daemon.
+
+Protocol, one JSON object per line: the client sends
+{"argv": [...], "env": {...}, "tty": bool}; the daemon streams back
+{"out": text} and {"err": text} as the command writes them and finishes with
+{"exit": status}. {"op": "ping"} and {"op": "stop"} control the daemon.
+
+asyncio serves any number of clients at once. The commands themselves run
+one at a time on a single worker thread, which owns the SQLite connection:
+there is one writer either way, and stdout is redirected per command.
+"""
+import json
+import os
+import socket
+import sys
+
+from .paths import data_dir
+
+SOCKET_NAME = 'daemon.sock'
+
+# One-liners that neither prompt for input nor read files relative to the
+# caller's working directory (`start` only with a task name).
+FORWARDED = ('start', 'pause', 'resume', 'stop', 'complete', 'status', 'viewday', 'viewweek', 'viewmonth',
+             'rollup', 'report', 'analyze', 'search')
+
+# The caller's terminal, applied while its command runs so rich renders for
+# that terminal rather than the daemon's.
+TERMINAL_ENV = ('TERM', 'COLORTERM', 'NO_COLOR', 'FORCE_COLOR', 'COLUMNS')
+
+# Output is sent to the client in chunks of about this many characters.
+CHUNK = 65536
+
+def socket_path():
+    return os.path.join(data_dir(), SOCKET_NAME)
+
+def _connect(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+def _terminal():
+    env = {k: os.environ[k] for k in TERMINAL_ENV if k in os.environ}
+    if 'COLUMNS' not in env:
+        # what rich would measure in this process
+        for fd in (0, 1, 2):
+            try:
+                columns = os.get_terminal_size(fd).columns
+            except OSError:
+                continue
+            if columns > 0:
+                env['COLUMNS'] = str(columns)
+            break
+    return env
+
+def forward(argv):
+    """Run argv in the daemon; returns its exit status, or None when it has to run here."""
+    if not argv or argv[0] not in FORWARDED or argv == ['start']:
+        return None
+    if os.environ.get('TRACKME_DAEMON') == '0':
+        return None
+    if any(os.environ.get(k) for k in ('TRACKME_TRACE', 'TRACKME_SLOW_MS', 'TRACKME_CPROFILE')):
+        return None
+    sock = _connect(socket_path())
+    if sock is None:
+        return None
+    with sock, sock.makefile('rb') as replies:
+        request = {'argv': argv, 'env': _terminal(), 'tty': sys.stdout.isatty()}
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        for line in replies:
+            msg = json.loads(line)
+            if 'out' in msg:
+                sys.stdout.write(msg['out'])
+            elif 'err' in msg:
+                sys.stderr.write(msg['err'])
+            elif 'exit' in msg:
+                sys.stdout.flush()
+                return msg['exit']
+    sys.stderr.write('trackme: the daemon closed the connection before the command finished\n')
+    return 1
+
+def control(op, path=None):
+    """Send a control request; returns the reply, or None if no daemon is listening."""
+    sock = _connect(path or socket_path())
+    if sock is None:
+        return None
+    with sock, sock.makefile('rb') as replies:
+        sock.sendall(json.dumps({'op': op}).encode() + b'\n')
+        line = replies.readline()
+    return json.loads(line) if line else None
+
+# Daemon side
+
+class _Output:
+    """stdout/stderr of one command: what is written goes to its client."""
+
+    encoding = 'utf-8'
+
+    def __init__(self, send, key, tty):
+        self.send = send
+        self.key = key
+        self.tty = tty
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= CHUNK:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.parts:
+            text = ''.join(self.parts)
+            self.parts, self.size = [], 0
+            self.send({self.key: text})
+
+    def isatty(self):
+        return self.tty
+
+def _open():
+    from . import storage
+    storage.init_db()
+    storage.enable_cache()
+
+def _close():
+    from . import storage
+    storage.close()
+
+def _consoles():
+    """Drop consoles created for an earlier caller's terminal."""
+    from . import tracker
+    tracker._console = None
+    utils = sys.modules.get(__package__ + '.utils')
+    if utils is not None:
+        utils.console = None
+
+def execute(request, send):
+    """Run one forwarded command on the worker thread; returns its exit status."""
+    import contextlib, traceback
+    from . import cli
+    out = _Output(send, 'out', bool(request.get('tty')))
+    err = _Output(send, 'err', False)
+    saved = {k: os.environ.get(k) for k in TERMINAL_ENV}
+    env = request.get('env') or {}
+    for k in TERMINAL_ENV:
+        if k in env:
+            os.environ[k] = env[k]
+        else:
+            os.environ.pop(k, None)
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            _consoles()
+            try:
+                status = cli.run(list(request['argv']))
+            except SystemExit as e:
+                status = e.code if isinstance(e.code, int) else 0 if e.code is None else 1
+                if not isinstance(e.code, (int, type(None))):
+                    print(e.code, file=sys.stderr)
+            except Exception:
+                traceback.print_exc()
+                status = 1
+            out.flush()
+            err.flush()
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return status
+
+class Daemon:
+    def __init__(self, path):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        self.path = path
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='trackme-worker')
+        self.stopping = asyncio.Event()
+        self.served = 0
+
+    async def serve(self):
+        import asyncio, signal
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.worker, _open)
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stopping.set)
+        try:
+            await self.stopping.wait()
+        finally:
+            server.close()
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            await loop.run_in_executor(self.worker, _close)
+            self.worker.shutdown()
+
+    async def _reply(self, writer, msg):
+        writer.write(json.dumps(msg).encode() + b'\n')
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        gone = False
+
+        def send(msg):
+            # Called on the worker thread; waiting for the drain is the back-pressure.
+            nonlocal gone
+            if gone:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._reply(writer, msg), loop).result()
+            except (ConnectionError, RuntimeError):
+                gone = True     # the command still runs to completion
+
+        try:
+            request = json.loads(await reader.readline())
+            op = request.get('op')
+            if op == 'ping':
+                from . import storage
+                await self._reply(writer, {'pid': os.getpid(), 'served': self.served, 'cache': storage.cache_stats()})
+            elif op == 'stop':
+                await self._reply(writer, {'stopping': True})
+                self.stopping.set()
+            elif request.get('argv'):
+                status = await loop.run_in_executor(self.worker, execute, request, send)
+                self.served += 1
+                if not gone:
+                    await self._reply(writer, {'exit': status})
+        except (ValueError, AttributeError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+def main(argv):
+    """Usage: trackme daemon [run|stop|status]"""
+    cmd = argv[0] if argv else 'run'
+    path = socket_path()
+    if cmd == 'status':
+        reply = control('ping', path)
+        if reply is None:
+            print('trackme daemon is not running')
+            return 1
+        print(f"trackme daemon running (pid {reply['pid']}), {reply['served']} commands served on {path}")
+        return 0
+    if cmd == 'stop':
+        if control('stop', path) is None:
+            print('trackme daemon is not running')
+            return 1
+        print('trackme daemon stopped')
+        return 0
+    if cmd != 'run' or len(argv) > 1:
+        print(main.__doc__)
+        return 2
+    if control('ping', path) is not None:
+        print(f'trackme daemon is already running on {path}', file=sys.stderr)
+        return 1
+    try:
+        os.unlink(path)     # left behind by a daemon that did not shut down
+    except FileNotFoundError:
+        pass
+    import asyncio
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    print(f'trackme daemon listening on {path}', flush=True)
+    asyncio.run(Daemon(path).serve())
+    return 0
@@ -0,0 +1,209 @@
+"""Overlap, gap and idle-time analysis of completed tasks (`trackme analyze`).
+
+resume_task back-dates start_time and stop_paused synthesises one, so
+completed tasks can overlap or leave unexplained gaps. This module loads the
+intervals of a date range from idx_tasks_day_start, archived years included
+(see storage.tasks_source), sorts them per day and runs one sweep over their
+start/end events: O(n log n) overall.
+
+By default a task counts for the day it is filed under (its date). With
+clip=True each task is split at local midnights and every piece counts for
+the day it falls on, so work past midnight is not all charged to the start
+date. Tasks filed more than MAX_LOOKBACK days before the range are not
+looked at, so a bogus multi-week task cannot widen every query.
+"""
+import heapq
+import itertools
+import json
+import sys
+from collections import defaultdict
+
+from . import storage
+
+DAY = 86400
+
+INTERVAL_COLUMNS = 'id, task_name, start_ts, end_ts, utc_offset, day'
+INTERVALS_SQL = """SELECT {columns} FROM {source}
+    WHERE day BETWEEN ?1 AND ?2 AND start_ts IS NOT NULL AND end_ts IS NOT NULL"""
+# the longest task filed in the MAX_LOOKBACK days before the range bounds how
+# far back --clip has to look; idx_tasks_day_start serves the day range
+MAX_LOOKBACK = 31
+LONGEST_SQL = 'SELECT MAX(end_ts - start_ts) FROM {source} WHERE day BETWEEN ?1 AND ?2'
+
+def _first(item):
+    return item[0]
+
+def _clock(ts, offset):
+    return storage._wall(ts, offset)[11:19]
+
+def _pieces(start, end, offset):
+    """Split [start, end) at local midnights; yields (day, start, end)."""
+    day = (start + offset) // DAY
+    boundary = (day + 1) * DAY - offset
+    while start < end:
+        stop = min(end, boundary)
+        yield day, start, stop
+        start, day, boundary = stop, day + 1, boundary + DAY
+
+def _lookback(first):
+    """Days before `first` that a task filed before the range could still reach into."""
+    bounds = (first - MAX_LOOKBACK, first - 1)
+    sql = LONGEST_SQL.format(source=storage.tasks_source(*bounds, 'day, start_ts, end_ts'))
+    longest = storage.get_conn().execute(sql, bounds).fetchone()[0] or 0
+    return min(-(-longest // DAY) + 1, MAX_LOOKBACK)
+
+def load(date_from=None, date_to=None, clip=False):
+    """Return ({day: [(start, end, id, name, offset), ...]}, invalid_count)."""
+    first, last = storage.day_range(date_from, date_to)
+    # a task that started before the range can run into it
+    bounds = (first - _lookback(first) if clip else first, last)
+    sql = INTERVALS_SQL.format(columns=INTERVAL_COLUMNS, source=storage.tasks_source(*bounds, INTERVAL_COLUMNS))
+    cur = storage.get_conn().execute(sql, bounds)
+    days = defaultdict(list)
+    invalid = 0
+    for tid, name, start, end, offset, day in cur:
+        offset = offset or 0
+        if end < start:
+            invalid += 1
+            continue
+        if not clip:
+            days[day].append((start, end, tid, name, offset))
+            continue
+        for d, s, e in _pieces(start, end, offset):
+            if first <= d <= last and e > s:
+                days[d].append((s, e, tid, name, offset))
+    return days, invalid
+
+def sweep(intervals):
+    """Covered, overlapped and uncovered time of one day's intervals.
+
+    Returns (covered, overlap, gaps) where gaps lists the uncovered
+    (start, end) stretches between the first start and the last end.
+    """
+    events = sorted([(s, 1) for s, e, *_ in intervals] + [(e, -1) for s, e, *_ in intervals])
+    covered = overlap = depth = 0
+    gaps = []
+    prev = None
+    for t, delta in events:
+        if prev is not None:
+            if depth >= 1:
+                covered += t - prev
+            if depth >= 2:
+                overlap += t - prev
+            if depth == 0 and t > prev:
+                gaps.append((prev, t))
+        depth += delta
+        prev = t
+    return covered, overlap, gaps
+
+def longest_overlaps(intervals, limit):
+    """The `limit` longest overlaps between two intervals, as (seconds, start, a, b), longest first.
+
+    With b the later-starting interval of a pair, the overlap is
+    min(a_end, b_end) - b_start: largest for the partners that end last. So
+    only the `limit` latest-ending intervals seen so far can be among b's
+    `limit` best partners, and that is all b looks at; both heaps stay at
+    `limit` entries, which keeps this O(n log n) however deeply tasks nest.
+    """
+    if limit <= 0:
+        return []
+    ends, best = [], []
+    for s, e, tid, name, _ in sorted(intervals):
+        for ae, aid, aname in ends:
+            if ae > s:
+                pair = (min(ae, e) - s, s, (aid, aname), (tid, name))
+                if len(best) < limit:
+                    heapq.heappush(best, pair)
+                elif pair[:2] > best[0][:2]:
+                    heapq.heapreplace(best, pair)
+        if len(ends) < limit:
+            heapq.heappush(ends, (e, tid, name))
+        elif e > ends[0][0]:
+            heapq.heapreplace(ends, (e, tid, name))
+    return sorted(best, key=lambda p: p[:2], reverse=True)
+
+def analyze(date_from=None, date_to=None, clip=False, min_gap=60, limit=20):
+    """Per-day and total coverage, plus the `limit` longest overlaps and gaps."""
+    days, invalid = load(date_from, date_to, clip)
+    rows, overlaps, gaps = [], [], []
+    for day in sorted(days):
+        items = days[day]
+        covered, overlap, day_gaps = sweep(items)
+        offset = items[0][4]
+        day_gaps = [(e - s, s, e, day, offset) for s, e in day_gaps if e - s >= min_gap]
+        first, last = min(i[0] for i in items), max(i[1] for i in items)
+        rows.append({'date': storage.day_date(day), 'tasks': len({i[2] for i in items}),
+                     'first': _clock(first, offset), 'last': _clock(last, offset), 'span': last - first,
+                     'tracked': sum(e - s for s, e, *_ in items), 'covered': covered, 'overlap': overlap,
+                     'idle': sum(g[0] for g in day_gaps)})
+        gaps.extend(day_gaps)
+        # keep raw tuples and a bounded heap; only the winners get formatted
+        overlaps = heapq.nlargest(limit, itertools.chain(overlaps, (
+            (sec, s, day, offset, a, b) for sec, s, a, b in longest_overlaps(items, limit))), key=_first)
+    totals = {k: sum(r[k] for r in rows) for k in ('span', 'tracked', 'covered', 'overlap', 'idle')}
+    totals['days'] = len(rows)
+    totals['invalid'] = invalid
+    return {'days': rows, 'totals': totals,
+            'overlaps': [{'date': storage.day_date(d), 'start': _clock(s, off), 'seconds': sec,
+                          'a': {'id': a[0], 'task_name': a[1]}, 'b': {'id': b[0], 'task_name': b[1]}}
+                         for sec, s, d, off, a, b in overlaps],
+            'gaps': [{'date': storage.day_date(d), 'start': _clock(s, off), 'end': _clock(e, off), 'seconds': sec}
+                     for sec, s, e, d, off in heapq.nlargest(limit, gaps, key=_first)]}
+
+def print_analysis(result, date_from, date_to, clip):
+    from rich.table import Table
+    from rich.console import Console
+    from rich.markup import escape
+    from .utils import format_seconds
+    console = Console()
+    title = f"Coverage {date_from} .. {date_to}{' (clipped at midnight)' if clip else ''}"
+    table = Table(title=title)
+    for c in ('Date', 'Tasks', 'First', 'Last', 'Tracked', 'Covered', 'Overlap', 'Idle'):
+        table.add_column(c, justify='left' if c == 'Date' else 'right')
+    for r in result['days']:
+        table.add_row(r['date'], str(r['tasks']), r['first'], r['last'], format_seconds(r['tracked']),
+                      format_seconds(r['covered']), format_seconds(r['overlap']), format_seconds(r['idle']))
+    t = result['totals']
+    table.add_row('[bold]Total[/bold]', '', '', '', format_seconds(t['tracked']),
+                  f"[bold]{format_seconds(t['covered'])}[/bold]", format_seconds(t['overlap']), format_seconds(t['idle']))
+    console.print(table)
+    if result['overlaps']:
+        table = Table(title='Longest overlaps')
+        for c in ('Date', 'At', 'Overlap', 'Task', 'Overlaps with'):
+            table.add_column(c)
+        for o in result['overlaps']:
+            table.add_row(o['date'], o['start'], format_seconds(o['seconds']),
+                          f"[{o['a']['id']}] {escape(o['a']['task_name'] or '')}",
+                          f"[{o['b']['id']}] {escape(o['b']['task_name'] or '')}")
+        console.print(table)
+    if result['gaps']:
+        table = Table(title='Longest gaps')
+        for c in ('Date', 'From', 'To', 'Idle'):
+            table.add_column(c)
+        for g in result['gaps']:
+            table.add_row(g['date'], g['start'], g['end'], format_seconds(g['seconds']))
+        console.print(table)
+    if t['invalid']:
+        print(f"{t['invalid']} tasks end before they start and were left out.")
+
+def main(argv):
+    import argparse, datetime
+    today = datetime.date.today()
+    ap = argparse.ArgumentParser(prog='trackme analyze')
+    ap.add_argument('--from', dest='date_from', type=storage.date_arg, default=today.replace(day=1).isoformat(),
+                    metavar='YYYY-MM-DD')
+    ap.add_argument('--to', dest='date_to', type=storage.date_arg, default=today.isoformat(), metavar='YYYY-MM-DD')
+    ap.add_argument('--clip', action='store_true', help='split tasks at midnight and count each piece for its own day')
+    ap.add_argument('--min-gap', type=int, default=60, metavar='SECONDS', help='ignore shorter gaps (default 60)')
+    ap.add_argument('--limit', type=int, default=10, help='overlaps and gaps to list (default 10)')
+    ap.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = ap.parse_args(argv)
+    result = analyze(args.date_from, args.date_to, args.clip, args.min_gap, args.limit)
+    if args.json:
+        json.dump(dict(result, **{'from': args.date_from, 'to': args.date_to, 'clip': args.clip}), sys.stdout, indent=2)
+        print()
+    elif not result['days']:
+        print('No data for this range.')
+    else:
+        print_analysis(result, args.date_from, args.date_to, args.clip)
+    return 0
@@ -0,0 +1,339 @@
+"""Append-only journal of task state transitions (`trackme journal`).
+
+Every start, pause, resume, stop and complete (and every imported, synced or
+archived task) is appended to journal/events.log as one compact JSON array:
+
+    [t, kind, field, ...]
+
+where t is the epoch time of the transition and the fields are those of
+EVENT_FIELDS[kind]. Lines are buffered per transaction and written with a
+single fsync just before COMMIT, while the write lock is held, so the log is
+in commit order and a rolled-back transition never reaches it.
+
+Snapshots (journal/snapshot-<t>.jsonl) hold the complete state at time t: a
+header line with the active and paused tasks, then one line per completed
+task. One is taken when the journal is created, after SNAPSHOT_EVERY events
+(or as many events as there are tasks, if more), and on demand. State as of any time T is the latest snapshot at or
+before T plus the events after it up to T; compaction drops events and
+snapshots that are older than a chosen snapshot.
+"""
+import datetime
+import json
+import os
+import sys
+import time
+
+from . import storage
+
+JOURNAL_DIR = storage.DB_DIR / 'journal'
+EVENTS_FILE = JOURNAL_DIR / 'events.log'
+SNAPSHOT_EVERY = 1000
+
+ACTIVE_FIELDS = [c.strip() for c in storage.ACTIVE_COLUMNS.split(',')]
+PAUSED_FIELDS = [c.strip() for c in storage.PAUSED_COLUMNS.split(',')]
+EVENT_FIELDS = {
+    'start': ACTIVE_FIELDS,
+    'resume': ACTIVE_FIELDS,
+    'pause': PAUSED_FIELDS,
+    'stop': storage.TASK_COLUMNS,
+    'complete': storage.TASK_COLUMNS,
+    'import': storage.TASK_COLUMNS,
+    'sync': storage.TASK_COLUMNS,
+    'archive': ['id'],
+}
+
+# plain UPDATE + SELECT rather than RETURNING, which needs SQLite 3.35
+COUNTER_SQL = "UPDATE meta SET value = value + ? WHERE key = 'journal_events'"
+COUNTER_INIT_SQL = "INSERT OR IGNORE INTO meta (key, value) VALUES ('journal_events', 0)"
+COUNTER_READ_SQL = "SELECT value FROM meta WHERE key = 'journal_events'"
+
+_pending = []
+
+def enabled():
+    return os.environ.get('TRACKME_JOURNAL', '1') != '0'
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+def _flush():
+    lines, _pending[:] = ''.join(_pending), []
+    JOURNAL_DIR.mkdir(parents=True, exist_ok=True)
+    with open(EVENTS_FILE, 'a', encoding='utf-8') as f:
+        f.write(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _discard():
+    _pending[:] = []
+
+def _stage(line):
+    if not _pending:
+        eng = storage.engine()
+        eng.before_commit(_flush)
+        # lines of a transaction that rolls back must not reach the next one
+        eng.on_rollback(_discard)
+    _pending.append(line)
+
+def record(kind, task):
+    """Journal one transition of `task` (a dict) as part of the current transaction."""
+    record_many(kind, [[task.get(f) for f in EVENT_FIELDS[kind]]])
+
+def record_many(kind, rows):
+    """Journal events whose field values are already in EVENT_FIELDS[kind] order."""
+    if not enabled() or not rows:
+        return
+    t = round(time.time(), 6)
+    lines = ''.join(_dumps([t, kind] + list(row)) + '\n' for row in rows)
+    eng = storage.engine()
+    eng.before_commit(lambda: _stage(lines))
+    conn = storage.get_conn()
+    if not conn.execute(COUNTER_SQL, (len(rows),)).rowcount:
+        conn.execute(COUNTER_INIT_SQL)
+        conn.execute(COUNTER_SQL, (len(rows),))
+    count = conn.execute(COUNTER_READ_SQL).fetchone()[0]
+    if count >= SNAPSHOT_EVERY:
+        eng.on_commit(snapshot)
+
+# Snapshots
+def _snapshot_files():
+    """(t, path) of every snapshot, oldest first."""
+    if not JOURNAL_DIR.exists():
+        return []
+    found = []
+    for path in JOURNAL_DIR.glob('snapshot-*.jsonl'):
+        try:
+            found.append((int(path.stem.split('-', 1)[1]) / 1e6, path))
+        except ValueError:
+            pass
+    return sorted(found)
+
+def snapshot():
+    """Write the complete current state as a new snapshot; returns its path.
+
+    The write lock is held only while the snapshot's time is chosen and a
+    second connection opens a read transaction: every event journaled up to
+    then has committed, and every later one is newer. The tasks are then
+    dumped from that read transaction while other commands go on writing.
+    """
+    import sqlite3
+    reader = sqlite3.connect(storage.DB_FILE, timeout=storage.BUSY_TIMEOUT, isolation_level=None)
+    try:
+        with storage.transaction() as conn:
+            t = round(time.time(), 6)
+            active = storage.load_active()
+            paused = storage.load_paused()
+            reader.execute('BEGIN')
+            rows = reader.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+            # the next snapshot is due after max(SNAPSHOT_EVERY, tasks) events, so
+            # rewriting every task stays O(1) per event however large the table gets
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('journal_events', ?)",
+                         (-max(0, rows - SNAPSHOT_EVERY),))
+        JOURNAL_DIR.mkdir(parents=True, exist_ok=True)
+        path = JOURNAL_DIR / f'snapshot-{int(t * 1e6)}.jsonl'
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            header = {'t': t,
+                      'active': [active.get(c) for c in ACTIVE_FIELDS] if active else None,
+                      'paused': [[p.get(c) for c in PAUSED_FIELDS] for p in paused]}
+            f.write(_dumps(header) + '\n')
+            for row in reader.execute(f"SELECT {','.join(storage.TASK_COLUMNS)} FROM tasks ORDER BY id"):
+                f.write(_dumps(list(row)) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        reader.close()
+    return path
+
+def ensure_base():
+    """Snapshot the existing data the first time the journal is used."""
+    if enabled() and not EVENTS_FILE.exists() and not _snapshot_files():
+        snapshot()
+
+# Replay
+class State:
+    """Active, paused and completed tasks, keyed by id, as lists of field values."""
+
+    def __init__(self, t=None):
+        self.t = t
+        self.active = None
+        self.paused = {}
+        self.tasks = {}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            state = cls(header['t'])
+            state.active = header['active']
+            state.paused = {p[0]: p for p in header['paused']}
+            for line in f:
+                row = json.loads(line)
+                state.tasks[row[0]] = row
+        return state
+
+    def apply(self, kind, values):
+        tid = values[0]
+        if kind in ('start', 'resume'):
+            self.paused.pop(tid, None)
+            self.active = values
+        elif kind == 'pause':
+            if self.active and self.active[0] == tid:
+                self.active = None
+            self.paused[tid] = values
+        elif kind == 'archive':
+            self.tasks.pop(tid, None)
+        else:
+            self.tasks[tid] = storage.task_values(values)
+            self.paused.pop(tid, None)
+            if self.active and self.active[0] == tid:
+                self.active = None
+
+def events(after=None, until=None):
+    """Yield (t, kind, values) from the log with after < t <= until."""
+    if not EVENTS_FILE.exists():
+        return
+    with open(EVENTS_FILE, encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break   # torn final write
+            ev = json.loads(line)
+            t = ev[0]
+            if (after is None or t > after) and (until is None or t <= until):
+                yield t, ev[1], ev[2:]
+
+class NoHistory(Exception):
+    """The requested time is before the oldest snapshot (journal start or last compaction)."""
+
+def replay(at=None):
+    """Rebuild the State as of epoch time `at` (default: now)."""
+    snaps = _snapshot_files()
+    base = [s for s in snaps if at is None or s[0] <= at]
+    if base:
+        state = State.load(base[-1][1])
+    elif snaps:
+        raise NoHistory(f'journal history starts at {_fmt_time(snaps[0][0])}')
+    else:
+        state = State()
+    for t, kind, values in events(state.t, at):
+        state.apply(kind, values)
+        state.t = t
+    return state
+
+def verify():
+    """Compare a replay of the journal with the database; returns a list of problems."""
+    state = replay()
+    conn = storage.get_conn()
+    problems = []
+    db_tasks = {r[0]: list(r) for r in conn.execute(f"SELECT {','.join(storage.TASK_COLUMNS)} FROM tasks")}
+    for tid in sorted(set(db_tasks) | set(state.tasks)):
+        have, want = state.tasks.get(tid), db_tasks.get(tid)
+        if have != want:
+            problems.append(f'task {tid}: journal={have} database={want}')
+    active = storage.load_active()
+    want = [active.get(c) for c in ACTIVE_FIELDS] if active else None
+    if state.active != want:
+        problems.append(f'active: journal={state.active} database={want}')
+    want = {p['id']: [p.get(c) for c in PAUSED_FIELDS] for p in storage.load_paused()}
+    if state.paused != want:
+        problems.append(f'paused: journal={sorted(state.paused)} database={sorted(want)}')
+    return problems
+
+def compact(before=None):
+    """Drop history older than the latest snapshot at or before `before`.
+
+    Without `before` a fresh snapshot is taken first and all earlier history
+    goes. Returns (events_kept, snapshots_removed).
+    """
+    with storage.transaction():
+        if before is None:
+            snapshot()
+        snaps = [s for s in _snapshot_files() if before is None or s[0] <= before]
+        if not snaps:
+            return None
+        base_t = snaps[-1][0]
+        kept = 0
+        tmp = EVENTS_FILE.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as out:
+            for t, kind, values in events(base_t):
+                out.write(_dumps([t, kind] + values) + '\n')
+                kept += 1
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, EVENTS_FILE)
+        removed = 0
+        for t, path in _snapshot_files():
+            if t < base_t:
+                path.unlink()
+                removed += 1
+    return kept, removed
+
+def _fmt_time(t):
+    return datetime.datetime.fromtimestamp(t).isoformat(timespec='seconds')
+
+def _parse_time(text):
+    """YYYY-MM-DD or an ISO datetime (local time) -> epoch seconds; a date means its end."""
+    if len(text) == 10:
+        return (datetime.datetime.fromisoformat(text) + datetime.timedelta(days=1)).timestamp() - 1e-6
+    return datetime.datetime.fromisoformat(text).timestamp()
+
+def _state_json(state):
+    fields = lambda cols, v: dict(zip(cols, v)) if v else None
+    return {'as_of': _fmt_time(state.t) if state.t else None,
+            'active': fields(ACTIVE_FIELDS, state.active),
+            'paused': [fields(PAUSED_FIELDS, p) for _, p in sorted(state.paused.items())],
+            'tasks': [fields(storage.TASK_COLUMNS, r) for _, r in sorted(state.tasks.items())]}
+
+def main(argv):
+    """trackme journal verify|replay|snapshot|compact [...]"""
+    import argparse
+    ap = argparse.ArgumentParser(prog='trackme journal')
+    sub = ap.add_subparsers(dest='action', required=True)
+    sub.add_parser('verify', help='check that replaying the journal reproduces the database')
+    rp = sub.add_parser('replay', help='show the state as of a point in time')
+    rp.add_argument('--at', metavar='DATETIME', help='YYYY-MM-DD[THH:MM[:SS]] local time (default: now)')
+    rp.add_argument('--json', action='store_true', help='dump the full state as JSON')
+    sub.add_parser('snapshot', help='write a snapshot of the current state')
+    cp = sub.add_parser('compact', help='drop history older than a snapshot')
+    cp.add_argument('--before', metavar='DATETIME', help='keep history from the last snapshot before this time')
+    args = ap.parse_args(argv)
+
+    if args.action == 'verify':
+        problems = verify()
+        for p in problems[:20]:
+            print(p)
+        if len(problems) > 20:
+            print(f'... and {len(problems) - 20} more')
+        print(f'{len(problems)} differences' if problems else 'Journal replay matches the database.')
+        return 1 if problems else 0
+    if args.action == 'snapshot':
+        print(f'Snapshot written: {snapshot()}')
+        return 0
+    if args.action == 'compact':
+        result = compact(_parse_time(args.before) if args.before else None)
+        if result is None:
+            print('No snapshot before that time; nothing compacted.')
+            return 1
+        print('Compacted: {} events kept, {} old snapshots removed.'.format(*result))
+        return 0
+    try:
+        state = replay(_parse_time(args.at) if args.at else None)
+    except NoHistory as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.json:
+        json.dump(_state_json(state), sys.stdout, ensure_ascii=False)
+        print()
+        return 0
+    print(f'As of {_fmt_time(state.t) if state.t else "the beginning"}:')
+    if state.active:
+        a = dict(zip(ACTIVE_FIELDS, state.active))
+        print(f"  active: [{a['id']}] {a['task_name']} since {a['start_time']}")
+    else:
+        print('  active: none')
+    for p in sorted(state.paused.values()):
+        p = dict(zip(PAUSED_FIELDS, p))
+        print(f"  paused: [{p['id']}] {p['task_name']} ({p['elapsed']}s)")
+    total = sum(r[storage.TASK_COLUMNS.index('duration')] or 0 for r in state.tasks.values())
+    print(f'  completed: {len(state.tasks)} tasks, {total}s in total')
+    return 0
@@ -0,0 +1,24 @@
+"""Where trackme keeps its data.
+
+TRACKME_HOME (default ~/.trackme) is the data directory of the 'default'
+profile; profile NAME lives in $TRACKME_HOME/profiles/NAME and is chosen
+with -P/--data-profile NAME or TRACKME_PROFILE (see profiles.py). Only os is
+imported here, so the `trackme prompt` fast path can use it too.
+"""
+import os
+
+PROFILES_DIR = 'profiles'
+
+def home_dir():
+    return os.environ.get('TRACKME_HOME') or os.path.join(os.path.expanduser('~'), '.trackme')
+
+def data_dir(profile=None):
+    """Data directory of `profile` (default: TRACKME_PROFILE); 'default' is the home directory itself."""
+    if profile is None:
+        profile = os.environ.get('TRACKME_PROFILE')
+    if not profile or profile == 'default':
+        return home_dir()
+    return os.path.join(home_dir(), PROFILES_DIR, profile)
+
+def valid_profile(name):
+    return bool(name) and not name.startswith('.') and all(c.isalnum() or c in '-_.' for c in name)
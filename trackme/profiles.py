@@ -0,0 +1,130 @@
+"""Profiles: one data directory per project (`trackme -P NAME ...`).
+
+Profile NAME lives in $TRACKME_HOME/profiles/NAME (TRACKME_HOME defaults to
+~/.trackme, which is itself the 'default' profile), with its own database,
+journal and daemon socket, so each project's database stays small. It is
+chosen with -P/--data-profile NAME or TRACKME_PROFILE; the path logic is in
+paths.py.
+
+Cross-profile reports ATTACH the profiles' databases, and the archive-YYYY.db
+files their range reaches into, read-only to one in-memory connection and
+read them in a single statement: nothing is copied. Only the current
+profile's database is migrated on the way; an older one elsewhere has to be
+opened by its own profile first, since the migrations read files from the
+data directory they run in.
+"""
+import os
+
+from .paths import PROFILES_DIR, data_dir, home_dir, valid_profile
+
+DB_NAME = 'trackme.db'
+# SQLite's default SQLITE_MAX_ATTACHED
+MAX_ATTACHED = 10
+
+class ProfileError(ValueError):
+    pass
+
+def db_path(name):
+    return os.path.join(data_dir(name), DB_NAME)
+
+def _read_only(path):
+    from pathlib import Path
+    return Path(path).resolve().as_uri() + '?mode=ro'
+
+def list_profiles():
+    """Names of the profiles that have a database, 'default' first."""
+    names = ['default'] if os.path.exists(db_path('default')) else []
+    root = os.path.join(home_dir(), PROFILES_DIR)
+    if os.path.isdir(root):
+        names += sorted(n for n in os.listdir(root) if valid_profile(n) and os.path.exists(db_path(n)))
+    return names
+
+def _schema_version(path):
+    import sqlite3
+    conn = sqlite3.connect(_read_only(path), uri=True)
+    try:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        conn.close()
+
+def resolve(spec):
+    """'all' or a comma-separated list -> profile names, checked to exist and to be up to date."""
+    from . import storage
+    names = list_profiles() if spec == 'all' else [n.strip() for n in spec.split(',') if n.strip()]
+    if not names:
+        raise ProfileError('no profiles found' if spec == 'all' else 'no profiles given')
+    for name in names:
+        if not valid_profile(name):
+            raise ProfileError(f'invalid profile name: {name!r}')
+        if not os.path.exists(db_path(name)):
+            raise ProfileError(f'profile {name!r} has no database ({db_path(name)})')
+        if os.path.abspath(db_path(name)) == os.path.abspath(storage.DB_FILE):
+            storage.get_conn()
+        elif _schema_version(db_path(name)) < len(storage.MIGRATIONS):
+            raise ProfileError(f"profile {name!r} has an older database; run 'trackme -P {name} status' once to upgrade it")
+    if len(names) > MAX_ATTACHED:
+        raise ProfileError(f'at most {MAX_ATTACHED} profiles per query')
+    return list(dict.fromkeys(names))
+
+def _archived_years(name):
+    """Years that have an archive file in the profile's data directory."""
+    from .storage import ARCHIVE_PREFIX
+    names = os.listdir(data_dir(name))
+    return sorted(int(n[len(ARCHIVE_PREFIX):-3]) for n in names
+                  if n.startswith(ARCHIVE_PREFIX) and n.endswith('.db') and n[len(ARCHIVE_PREFIX):-3].isdigit())
+
+def _sources(names, first_day, last_day):
+    """[(profile, schema, path)]: p0, p1, ... and p{i}a{year} for the archives in range."""
+    from . import storage
+    first, last = int(storage.day_date(first_day)[:4]), int(storage.day_date(last_day)[:4])
+    out = []
+    for i, name in enumerate(names):
+        out.append((name, f'p{i}', db_path(name)))
+        out += [(name, f'p{i}a{y}', os.path.join(data_dir(name), f'{storage.ARCHIVE_PREFIX}{y}.db'))
+                for y in _archived_years(name) if first <= y <= last]
+    if len(out) > MAX_ATTACHED:
+        raise ProfileError(f'at most {MAX_ATTACHED} databases per query, archives included; narrow the range')
+    return out
+
+def attach(names, first_day, last_day):
+    """A connection with each profile's database, and its archives between
+    `first_day` and `last_day`, attached read-only (see _sources)."""
+    import sqlite3
+    conn = sqlite3.connect(':memory:', uri=True)
+    conn.row_factory = sqlite3.Row
+    for _, schema, path in _sources(names, first_day, last_day):
+        conn.execute(f'ATTACH DATABASE ? AS {schema}', (_read_only(path),))
+    return conn
+
+def union_sql(names, columns, first_day, last_day):
+    """A FROM-able union of the profiles' hot and archived tasks with a leading
+    profile column, bounded by ?1 and ?2 like storage.tasks_source."""
+    branches = [f"SELECT '{name}' AS profile, {columns} FROM {schema}.tasks WHERE day BETWEEN ?1 AND ?2"
+                for name, schema, _ in _sources(names, first_day, last_day)]
+    return '(' + ' UNION ALL '.join(branches) + ')'
+
+def main(argv):
+    """Usage: trackme profiles"""
+    if argv:
+        print(main.__doc__)
+        return 2
+    import sqlite3
+    current = os.environ.get('TRACKME_PROFILE') or 'default'
+    names = list_profiles()
+    if current not in names:
+        names.append(current)
+    for name in names:
+        path = db_path(name)
+        if os.path.exists(path):
+            conn = sqlite3.connect(_read_only(path), uri=True)
+            try:
+                count = conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+            except sqlite3.Error:
+                count = 0
+            finally:
+                conn.close()
+            info = f'{count} tasks, {os.path.getsize(path) / 2**20:.1f} MiB'
+        else:
+            info = 'no database yet'
+        print(f"{'*' if name == current else ' '} {name:<20} {info:<28} {data_dir(name)}")
+    return 0
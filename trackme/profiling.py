@@ -0,0 +1,180 @@
+"""Opt-in per-command latency instrumentation.
+
+Enabled by `trackme --profile ...` or the TRACKME_TRACE environment variable
+(``1`` prints to stderr, any other value is a file to write JSON to). When
+enabled, install() wraps the cli dispatch, every public storage function and
+the render/transition entry points in timing spans, times first-time module
+imports, and swaps in a SQLite connection class that times each statement.
+At exit a breakdown of span wall times, SQL statements and JSON bytes
+read/written is reported.
+
+Extras (also available as --slow-ms N / --cprofile FILE):
+  TRACKME_SLOW_MS=N      log statements slower than N ms to TRACKME_SLOW_LOG
+                         (default: slow-queries.log in the data directory)
+  TRACKME_CPROFILE=FILE  dump cProfile stats for the whole command to FILE
+
+When none of this is enabled nothing is wrapped; the only cost left is the
+`if profiling.enabled` check around JSON byte counting.
+"""
+import functools
+import os
+import sqlite3
+import sys
+import time
+
+enabled = False
+spans = {}      # name -> [calls, seconds]
+statements = {} # sql -> [calls, seconds]
+counters = {'json_read': 0, 'json_written': 0}
+_slow_ms = None
+_slow_log = None
+_started = None
+
+def add_bytes(kind, n):
+    counters[kind] += n
+
+def span(name, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            s = spans.setdefault(name, [0, 0.0])
+            s[0] += 1
+            s[1] += time.perf_counter() - t0
+    return wrapper
+
+def _record_sql(sql, elapsed):
+    key = ' '.join(sql.split())
+    s = statements.setdefault(key, [0, 0.0])
+    s[0] += 1
+    s[1] += elapsed
+    if _slow_ms is not None and elapsed * 1000 >= _slow_ms:
+        with open(_slow_log, 'a', encoding='utf-8') as f:
+            f.write(f'{time.strftime("%Y-%m-%dT%H:%M:%S")}\t{elapsed * 1000:.2f}ms\t{key}\n')
+
+def tracing_connection_class():
+    """sqlite3.Connection subclass that times execute/executemany/executescript.
+
+    Built on demand so that importing this module stays cheap when disabled.
+    """
+    class TracingConnection(sqlite3.Connection):
+        def execute(self, sql, *args):
+            t0 = time.perf_counter()
+            try:
+                return super().execute(sql, *args)
+            finally:
+                _record_sql(sql, time.perf_counter() - t0)
+
+        def executemany(self, sql, *args):
+            t0 = time.perf_counter()
+            try:
+                return super().executemany(sql, *args)
+            finally:
+                _record_sql(sql, time.perf_counter() - t0)
+
+        def executescript(self, sql):
+            t0 = time.perf_counter()
+            try:
+                return super().executescript(sql)
+            finally:
+                _record_sql(sql, time.perf_counter() - t0)
+    return TracingConnection
+
+# plumbing that every call goes through; spans for these would only be noise
+_SKIP = {'atomic', 'engine', 'get_conn', 'transaction'}
+
+def _wrap_module(module, names=None):
+    prefix = module.__name__.rsplit('.', 1)[-1]
+    for name in names or [n for n, v in vars(module).items()
+                          if callable(v) and not isinstance(v, type) and not n.startswith('_')
+                          and n not in _SKIP and getattr(v, '__module__', None) == module.__name__]:
+        setattr(module, name, span(f'{prefix}.{name}', getattr(module, name)))
+
+def _timing_import(original):
+    """builtins.__import__ replacement recording the outermost uncached imports."""
+    depth = [0]
+
+    def __import__(name, globals=None, locals=None, fromlist=(), level=0):
+        if depth[0]:
+            return original(name, globals, locals, fromlist, level)
+        depth[0] += 1
+        t0 = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            depth[0] -= 1
+            elapsed = time.perf_counter() - t0
+            if elapsed > 0.0002:  # anything faster was already in sys.modules
+                if level:
+                    name = '.'.join(filter(None, [(globals or {}).get('__package__'), name]))
+                    if fromlist:
+                        name += '.' + (fromlist[0] if len(fromlist) == 1 else '{' + ','.join(fromlist) + '}')
+                s = spans.setdefault(f'import {name}', [0, 0.0])
+                s[0] += 1
+                s[1] += elapsed
+    return __import__
+
+def install(output=None, slow_ms=None, cprofile=None, report=True):
+    """Turn instrumentation on for the rest of the process."""
+    global enabled, _slow_ms, _slow_log, _started
+    import atexit, builtins
+    enabled = True
+    _started = time.perf_counter()
+    builtins.__import__ = _timing_import(builtins.__import__)
+    from . import storage, tracker, cli
+    storage.CONNECTION_FACTORY = tracing_connection_class()
+    _wrap_module(storage)
+    _wrap_module(tracker, ['start_new_task_quick', 'start_new_task_interactive', 'pause_active', 'resume_task',
+                           'stop_active', 'stop_paused', 'complete_task', 'status'])
+    _wrap_module(cli, ['_one_liner', 'run_command', 'run_batch'])
+    if slow_ms is not None:
+        _slow_ms = slow_ms
+        _slow_log = os.environ.get('TRACKME_SLOW_LOG') or str(storage.DB_DIR / 'slow-queries.log')
+    profiler = None
+    if cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if report or profiler is not None:
+        atexit.register(_finish, output, profiler, cprofile, report)
+
+def wrap_renderers(utils):
+    """utils is imported lazily, so it calls this itself once loaded."""
+    _wrap_module(utils, ['view_day', 'view_week', 'view_month', 'show_paused', 'print_tasks_table', 'rollup'])
+
+def results():
+    return {
+        'wall_ms': (time.perf_counter() - _started) * 1000,
+        'spans': [{'name': k, 'calls': v[0], 'ms': v[1] * 1000}
+                  for k, v in sorted(spans.items(), key=lambda kv: -kv[1][1])],
+        'sql': [{'sql': k, 'calls': v[0], 'ms': v[1] * 1000}
+                for k, v in sorted(statements.items(), key=lambda kv: -kv[1][1])],
+        'json_bytes': dict(counters),
+    }
+
+def _finish(output, profiler, cprofile, report):
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(cprofile)
+    if not report:
+        return
+    r = results()
+    if output:
+        import json
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(r, f, indent=2)
+        return
+    out = sys.stderr
+    print(f"\n--- trackme profile: {r['wall_ms']:.2f}ms since startup of instrumentation ---", file=out)
+    print(f"{'span':<40} {'calls':>6} {'ms':>10}", file=out)
+    for s in r['spans']:
+        print(f"{s['name']:<40} {s['calls']:>6} {s['ms']:>10.3f}", file=out)
+    sql_ms = sum(s['ms'] for s in r['sql'])
+    print(f"SQL: {sum(s['calls'] for s in r['sql'])} statements, {sql_ms:.3f}ms", file=out)
+    for s in r['sql'][:15]:
+        print(f"  {s['ms']:>9.3f}ms x{s['calls']:<4} {s['sql'][:100]}", file=out)
+    print(f"JSON: {r['json_bytes']['json_read']} bytes read, {r['json_bytes']['json_written']} bytes written", file=out)
+    if cprofile:
+        print(f'cProfile stats written to {cprofile}', file=out)
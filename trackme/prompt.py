@@ -0,0 +1,101 @@
+"""Active-task line for shell prompts (`trackme prompt` / `trackme-prompt`).
+
+storage mirrors the active task into a one-line, tab-separated state file
+whenever it changes. Rendering a prompt only reads that file: no database,
+no migrations, no rich, and only stdlib modules that are already loaded at
+interpreter startup.
+
+Format fields: {id} {name} {category} {elapsed} {seconds} {minutes} {start}
+"""
+import os, sys, time
+
+from .paths import data_dir
+
+STATE_NAME = 'prompt'
+DEFAULT_FORMAT = '[{id}] {name} {elapsed}'
+
+def state_path():
+    return os.path.join(data_dir(), STATE_NAME)
+
+def read_state(path=None):
+    try:
+        with open(path or state_path(), encoding='utf-8') as f:
+            tid, start, name, category = f.read().rstrip('\n').split('\t', 3)
+        return {'id': int(tid), 'start': int(start), 'name': name, 'category': category}
+    except (OSError, ValueError):
+        return None
+
+def write_state(path, task):
+    """Write (or, for task=None, remove) the state file atomically."""
+    path = os.fspath(path)
+    if task is None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        return
+    import datetime
+    start = int(datetime.datetime.fromisoformat(task['start_time']).timestamp())
+    clean = lambda v: ' '.join(str(v or '').split())
+    import tempfile
+    # a temp file of its own, so concurrent writers never rename each other's
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=STATE_NAME + '.', suffix='.tmp')
+    try:
+        with open(fd, 'w', encoding='utf-8') as f:
+            f.write(f"{task['id']}\t{start}\t{clean(task.get('task_name'))}\t{clean(task.get('category'))}\n")
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def format_seconds(s):
+    """Seconds as '1h 5m', '5m 30s' or '30s'; utils re-exports it for the rich views."""
+    if not s:
+        return '0s'
+    m, sec = divmod(int(s), 60)
+    h, m = divmod(m, 60)
+    parts = []
+    if h:
+        parts.append(f"{h}h")
+    if m:
+        parts.append(f"{m}m")
+    if sec and not h:
+        parts.append(f"{sec}s")
+    return ' '.join(parts) if parts else '0s'
+
+def render(fmt, state, now=None):
+    seconds = max(0, int((now or time.time()) - state['start']))
+    return fmt.format(id=state['id'], name=state['name'], category=state['category'],
+                      elapsed=format_seconds(seconds), seconds=seconds, minutes=seconds // 60,
+                      start=time.strftime('%H:%M', time.localtime(state['start'])))
+
+def main(argv=None):
+    """Usage: trackme prompt [--format FMT] [--idle TEXT]
+
+    Defaults come from TRACKME_PROMPT_FORMAT and TRACKME_PROMPT_IDLE.
+    Prints nothing (or the idle text) when no task is active.
+    """
+    args = sys.argv[1:] if argv is None else list(argv)
+    fmt = os.environ.get('TRACKME_PROMPT_FORMAT', DEFAULT_FORMAT)
+    idle = os.environ.get('TRACKME_PROMPT_IDLE', '')
+    while args:
+        opt = args.pop(0)
+        if opt in ('--format', '-f') and args:
+            fmt = args.pop(0)
+        elif opt == '--idle' and args:
+            idle = args.pop(0)
+        else:
+            sys.stderr.write(main.__doc__.split('\n')[0] + '\n')
+            return 2
+    state = read_state()
+    try:
+        out = render(fmt, state) if state else idle
+    except (KeyError, IndexError, ValueError) as e:
+        sys.stderr.write(f'trackme prompt: bad format string: {e}\n')
+        return 2
+    if out:
+        sys.stdout.write(out + '\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Range reports grouped by category, task, date, hour or weekday.
+
+Each report is one SQL statement: grouping, totals, averages and
+nearest-rank percentiles (via window functions) all run inside SQLite and
+read only the covering index idx_tasks_report, never the table itself.
+Dates, hours and weekdays are bucketed with integer arithmetic on the
+stored day number and epoch seconds.
+
+With profiles=[...] the same statement runs over several profiles'
+databases attached to one connection (see profiles.py), and the rows can
+also be grouped by profile.
+"""
+import argparse
+import datetime
+import json
+import sys
+
+from . import storage
+
+GROUP_KEYS = {
+    'category': "COALESCE(NULLIF(category, ''), '-')",
+    'task': 'task_name',
+    'date': 'day',
+    # local hour and weekday straight from the integer columns (1970-01-01 was a Thursday)
+    'hour': '(start_ts + utc_offset) % 86400 / 3600',
+    'weekday': '(day + 4) % 7',
+}
+# cross-profile reports can also group by profile
+PROFILE_GROUP_KEYS = dict(GROUP_KEYS, profile='profile')
+# what the report reads from each profile or archive: the columns of idx_tasks_report
+PROFILE_COLUMNS = 'day, category, task_name, start_ts, utc_offset, duration'
+WEEKDAYS = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
+PERCENTILES = (50, 90, 95)
+COLUMNS = ['key', 'total', 'count', 'avg', 'min', 'max'] + [f'p{p}' for p in PERCENTILES]
+
+def report_sql(group_by, source='tasks'):
+    key = PROFILE_GROUP_KEYS[group_by]
+    # nearest-rank percentile: the ceil(p * n / 100)-th smallest duration
+    pcts = ''.join(f',\n        MAX(CASE WHEN rn = (n * {p} + 99) / 100 THEN d END) AS p{p}' for p in PERCENTILES)
+    order = 'total DESC, key' if group_by in ('category', 'task') else 'key'
+    return f"""WITH t AS (
+        SELECT {key} AS key, COALESCE(duration, 0) AS d,
+               ROW_NUMBER() OVER w AS rn,
+               COUNT(*) OVER (w ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING) AS n
+        FROM {source} WHERE day BETWEEN ?1 AND ?2
+        WINDOW w AS (PARTITION BY {key} ORDER BY COALESCE(duration, 0))
+    )
+    SELECT key, SUM(d) AS total, COUNT(*) AS count, AVG(d) AS avg, MIN(d) AS min, MAX(d) AS max{pcts}
+    FROM t GROUP BY key ORDER BY {order}"""
+
+def run_report(date_from, date_to, group_by='category', profiles=None):
+    """Return a list of dicts with COLUMNS as keys."""
+    params = storage.day_range(date_from, date_to)
+    if profiles:
+        from . import profiles as _profiles
+        conn = _profiles.attach(profiles, *params)
+        try:
+            sql = report_sql(group_by, _profiles.union_sql(profiles, PROFILE_COLUMNS, *params))
+            rows = [dict(r) for r in conn.execute(sql, params)]
+        finally:
+            conn.close()
+    else:
+        sql = report_sql(group_by, storage.tasks_source(*params, PROFILE_COLUMNS))
+        rows = [dict(r) for r in storage.get_conn().execute(sql, params)]
+    label = {'date': storage.day_date, 'weekday': WEEKDAYS.__getitem__, 'hour': '{:02d}'.format}.get(group_by)
+    if label:
+        for r in rows:
+            if r['key'] is not None:
+                r['key'] = label(r['key'])
+    return rows
+
+def totals(rows):
+    total = sum(r['total'] for r in rows)
+    count = sum(r['count'] for r in rows)
+    return {'total': total, 'count': count, 'avg': total / count if count else 0}
+
+def print_report(rows, group_by, date_from, date_to, profiles=None):
+    from rich.table import Table
+    from rich.console import Console
+    from .utils import format_seconds
+    table = Table(title=f"Report {date_from} .. {date_to} by {group_by}{' for ' + ', '.join(profiles) if profiles else ''}")
+    table.add_column(group_by.capitalize())
+    for c in COLUMNS[1:]:
+        table.add_column(c.capitalize() if c[0] != 'p' else c, justify='right')
+    for r in rows:
+        table.add_row(str(r['key']), format_seconds(r['total']), str(r['count']),
+                      *[format_seconds(r[c]) for c in COLUMNS[3:]])
+    t = totals(rows)
+    table.add_row('[bold]Total[/bold]', f"[bold]{format_seconds(t['total'])}[/bold]", str(t['count']),
+                  format_seconds(t['avg']), *[''] * (len(COLUMNS) - 4))
+    Console().print(table)
+
+def main(argv):
+    today = datetime.date.today()
+    ap = argparse.ArgumentParser(prog='trackme report')
+    ap.add_argument('--from', dest='date_from', type=storage.date_arg, default=today.replace(day=1).isoformat(),
+                    metavar='YYYY-MM-DD')
+    ap.add_argument('--to', dest='date_to', type=storage.date_arg, default=today.isoformat(), metavar='YYYY-MM-DD')
+    ap.add_argument('--group-by', choices=list(PROFILE_GROUP_KEYS), default='category')
+    ap.add_argument('--profiles', metavar='A,B,...|all', help='report across these profiles in one query')
+    ap.add_argument('--json', action='store_true', help='print machine-readable JSON')
+    args = ap.parse_args(argv)
+    profiles = None
+    if args.profiles:
+        from .profiles import resolve, ProfileError
+        try:
+            profiles = resolve(args.profiles)
+            rows = run_report(args.date_from, args.date_to, args.group_by, profiles)
+        except ProfileError as e:
+            ap.error(str(e))
+    elif args.group_by == 'profile':
+        ap.error('--group-by profile needs --profiles')
+    else:
+        rows = run_report(args.date_from, args.date_to, args.group_by)
+    if args.json:
+        json.dump({'from': args.date_from, 'to': args.date_to, 'group_by': args.group_by, 'profiles': profiles,
+                   'rows': rows, 'totals': totals(rows)}, sys.stdout, indent=2)
+        print()
+    elif not rows:
+        print('No data for this range.')
+    else:
+        print_report(rows, args.group_by, args.date_from, args.date_to, profiles)
+    return 0
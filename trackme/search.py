@@ -0,0 +1,103 @@
+"""Full-text search over task names and notes (`trackme search`).
+
+Backed by the FTS5 table tasks_fts, an external-content index over
+tasks(task_name, notes) kept in sync by triggers. Results are ranked with
+bm25, weighting name matches above notes. On SQLite builds without FTS5 the
+search falls back to a LIKE scan. Archive files have their own tasks_fts;
+the ones a range reaches into are searched in the same statement.
+"""
+import argparse
+import json
+import sys
+
+from . import storage
+
+# bm25 column weights: task_name, notes
+WEIGHTS = (2.0, 1.0)
+HL_START, HL_END = '\x02', '\x03'
+
+# one branch per database (the hot file and the archives a range reaches
+# into); ?1 is the MATCH query, ?2 the LIKE pattern, ?3/?4 the day range
+FTS_BRANCH = f"""SELECT t.id, t.task_name, t.category, t.date, t.duration, t.notes,
+        snippet(tasks_fts, -1, '{HL_START}', '{HL_END}', '…', 10) AS snippet,
+        bm25(tasks_fts, {WEIGHTS[0]}, {WEIGHTS[1]}) AS rank
+    FROM {{schema}}.tasks_fts JOIN {{schema}}.tasks t ON t.id = tasks_fts.rowid
+    WHERE tasks_fts MATCH ?1 AND t.day BETWEEN ?3 AND ?4"""
+
+LIKE_BRANCH = """SELECT id, task_name, category, date, duration, notes, NULL AS snippet, 0 AS rank
+    FROM {schema}.tasks WHERE (task_name LIKE ?2 OR notes LIKE ?2) AND day BETWEEN ?3 AND ?4"""
+
+SEARCH_SQL = 'SELECT * FROM ({branches}) ORDER BY {order} LIMIT ?5'
+
+ORDERS = {'rank': 'rank, date DESC', 'date': 'date DESC, rank'}
+
+def has_fts(conn, schema='main'):
+    return conn.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE name = 'tasks_fts'").fetchone() is not None
+
+def to_match(query):
+    """Quote each term so plain input like ABC-123 is matched literally.
+
+    Input that already uses FTS5 syntax (quotes, *, :, AND/OR/NOT, NEAR) is
+    passed through unchanged.
+    """
+    terms = query.split()
+    if any(c in query for c in '"*:()') or any(t in ('AND', 'OR', 'NOT') or t.startswith('NEAR') for t in terms):
+        return query
+    return ' '.join('"' + t.replace('"', '""') + '"' for t in terms)
+
+def search(query, date_from=None, date_to=None, limit=20, order='rank'):
+    """Ranked matches from the hot file and every archive in range.
+
+    bm25 scores come from each database's own index, so archived matches
+    rank against their own year's statistics.
+    """
+    conn = storage.get_conn()
+    bounds = storage.day_range(date_from, date_to)
+    branches = [(FTS_BRANCH if has_fts(conn, s) else LIKE_BRANCH).format(schema=s)
+                for s in ['main'] + storage.archive_schemas(*bounds)]
+    sql = SEARCH_SQL.format(branches=' UNION ALL '.join(branches), order=ORDERS[order])
+    cur = conn.execute(sql, (to_match(query), f'%{query}%') + bounds + (limit,))
+    return [dict(r) for r in cur]
+
+def print_results(rows):
+    from rich.console import Console
+    from rich.markup import escape
+    from rich.table import Table
+    from .utils import format_seconds
+    hl = lambda s: escape(s or '').replace(HL_START, '[bold yellow]').replace(HL_END, '[/bold yellow]')
+    table = Table(title=f'{len(rows)} matching tasks')
+    table.add_column('ID', justify='right')
+    table.add_column('Date')
+    table.add_column('Task')
+    table.add_column('Category')
+    table.add_column('Duration', justify='right')
+    table.add_column('Match')
+    for r in rows:
+        table.add_row(str(r['id']), r['date'] or '', escape(r['task_name'] or ''), escape(r['category'] or ''),
+                      format_seconds(r['duration']), hl(r['snippet'] or r['notes']))
+    Console().print(table)
+
+def main(argv):
+    ap = argparse.ArgumentParser(prog='trackme search')
+    ap.add_argument('query', nargs='+')
+    ap.add_argument('--from', dest='date_from', type=storage.date_arg, metavar='YYYY-MM-DD')
+    ap.add_argument('--to', dest='date_to', type=storage.date_arg, metavar='YYYY-MM-DD')
+    ap.add_argument('--limit', type=int, default=20)
+    ap.add_argument('--sort', choices=list(ORDERS), default='rank')
+    ap.add_argument('--json', action='store_true')
+    args = ap.parse_args(argv)
+    try:
+        rows = search(' '.join(args.query), args.date_from, args.date_to, args.limit, args.sort)
+    except storage.sqlite3.OperationalError as e:
+        print(f'Bad search query: {e}')
+        return 2
+    if args.json:
+        for r in rows:
+            r['snippet'] = (r['snippet'] or '').replace(HL_START, '').replace(HL_END, '')
+        json.dump(rows, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    elif not rows:
+        print('No matching tasks.')
+    else:
+        print_results(rows)
+    return 0
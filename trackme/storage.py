@@ -1,18 +1,280 @@
+import os
 import sqlite3
+import sys
 from pathlib import Path
+from contextlib import contextmanager
+import functools
 import json, datetime
+from . import paths, prompt, profiling
+from .task import row_factory, named_row_factory
 
-DB_DIR = Path.home() / '.trackme'
-DB_DIR.mkdir(parents=True, exist_ok=True)
+# TRACKME_HOME points trackme at another data directory (scratch data for
+# benchmarks, ...) and TRACKME_PROFILE at a profile inside it (see profiles.py).
+DB_DIR = Path(paths.data_dir())
 DB_FILE = DB_DIR / 'trackme.db'
 PAUSED_FILE = DB_DIR / 'paused.json'
 ACTIVE_FILE = DB_DIR / 'active.json'
 META_FILE = DB_DIR / 'meta.json'
+PROMPT_FILE = DB_DIR / prompt.STATE_NAME
+
+# Applied once per connection. WAL lets readers run alongside the single
+# writer; synchronous=NORMAL is durable across application crashes in WAL mode.
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -8000',
+    'PRAGMA mmap_size = 67108864',
+    'PRAGMA temp_store = MEMORY',
+)
+
+# Replaced by a statement-timing subclass when instrumentation is on.
+CONNECTION_FACTORY = sqlite3.Connection
+
+# Seconds a writer waits for another process's transaction before giving up.
+BUSY_TIMEOUT = 30.0
+
+# Values per `IN (...)` list: stay under SQLITE_MAX_VARIABLE_NUMBER on older builds (999).
+IN_CHUNK = 900
+
+TASK_COLUMNS = ['id', 'task_name', 'category', 'notes', 'start_time', 'end_time', 'duration', 'date', 'status']
+
+class Engine:
+    """Owns the single long-lived SQLite connection of this process.
+
+    Migrations are checked once when the connection is opened, and statements
+    are issued with constant SQL text so sqlite3's statement cache keeps them
+    prepared between calls.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.depth = 0
+        self.pending = []
+        self.precommit = []
+        self.aborted = []
+        self.attached = set()
+
+    def connect(self):
+        if self.conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None, cached_statements=256,
+                                   factory=CONNECTION_FACTORY)
+            conn.row_factory = sqlite3.Row
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self.conn = conn
+            self.attached = set()
+            migrate(conn)
+        return self.conn
+
+    def attach(self, schema, path):
+        """ATTACH `path` as `schema` on this connection unless it already is."""
+        conn = self.connect()
+        if schema not in self.attached:
+            conn.execute(f'ATTACH DATABASE ? AS {schema}', (str(path),))
+            self.attached.add(schema)
+        return schema
+
+    @contextmanager
+    def transaction(self):
+        """BEGIN IMMEDIATE at the outermost level, SAVEPOINTs when nested."""
+        conn = self.connect()
+        depth = self.depth
+        conn.execute('BEGIN IMMEDIATE' if depth == 0 else f'SAVEPOINT sp{depth}')
+        self.depth += 1
+        hooks, prehooks = len(self.pending), len(self.precommit)
+        try:
+            yield conn
+            if depth == 0:
+                # Hooks may queue further hooks; those run in the same pass.
+                i = 0
+                while i < len(self.precommit):
+                    self.precommit[i]()
+                    i += 1
+                self.precommit = []
+        except BaseException:
+            self.depth = depth
+            del self.pending[hooks:]
+            del self.precommit[prehooks:]
+            if depth == 0:
+                conn.execute('ROLLBACK')
+                self._rolled_back()
+            else:
+                conn.execute(f'ROLLBACK TO sp{depth}')
+                conn.execute(f'RELEASE sp{depth}')
+            raise
+        self.depth = depth
+        conn.execute('COMMIT' if depth == 0 else f'RELEASE sp{depth}')
+        if depth == 0:
+            self.aborted = []
+            pending, self.pending = self.pending, []
+            for fn in pending:
+                fn()
+
+    def before_commit(self, fn):
+        """Run fn just before the outermost COMMIT, still holding the write lock.
+
+        It is dropped if its (sub)transaction rolls back, and an exception from
+        fn rolls the transaction back. Outside a transaction fn runs now.
+        """
+        if self.depth:
+            self.precommit.append(fn)
+        else:
+            fn()
+
+    def on_commit(self, fn):
+        """Run fn once the current transaction commits (now, if there is none)."""
+        if self.depth:
+            self.pending.append(fn)
+        else:
+            fn()
+
+    def on_rollback(self, fn):
+        """Run fn if the outermost transaction rolls back; dropped when it commits."""
+        if self.depth:
+            self.aborted.append(fn)
+
+    def _rolled_back(self):
+        aborted, self.aborted = self.aborted, []
+        for fn in aborted:
+            fn()
+
+    def close(self):
+        if self.conn is None:
+            return
+        if self.depth:
+            self.conn.execute('ROLLBACK')
+            self.depth = 0
+            self.pending = []
+            self.precommit = []
+            self._rolled_back()
+        try:
+            self.conn.execute('PRAGMA optimize')
+        except sqlite3.Error:
+            pass
+        self.conn.close()
+        self.conn = None
+        self.attached = set()
+
+_engine = None
+
+def engine():
+    global _engine
+    if _engine is None:
+        _engine = Engine(DB_FILE)
+    return _engine
+
+def get_conn():
+    return engine().connect()
+
+def transaction():
+    return engine().transaction()
+
+def atomic(fn):
+    """Decorator: run fn inside transaction(), so a state transition commits as a unit."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with transaction():
+            return fn(*args, **kwargs)
+    return wrapper
+
+def close():
+    """Shutdown hook: release the process-wide connection."""
+    global _engine
+    if _engine is not None:
+        _engine.close()
+        _engine = None
 
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.executescript("""
+    get_conn()
+    from . import journal
+    journal.ensure_base()
+
+# Hot/cold archival (see archive.py): tasks from before a cut-off date move to
+# one archive-YYYY.db per year next to trackme.db, with the same tasks table
+# and its own daily_rollup. Reads whose range reaches an archived year attach
+# that file to the connection on first use and union it with the hot tables.
+ARCHIVE_PREFIX = 'archive-'
+_archives = (None, frozenset())
+
+def archive_path(year):
+    return DB_DIR / f'{ARCHIVE_PREFIX}{year}.db'
+
+def archived_years():
+    """Years that have an archive file; the listing is cached on the data directory's mtime."""
+    global _archives
+    try:
+        mtime = os.stat(DB_DIR).st_mtime_ns
+    except OSError:
+        return frozenset()
+    if _archives[0] != mtime:
+        years = (p.stem[len(ARCHIVE_PREFIX):] for p in DB_DIR.glob(ARCHIVE_PREFIX + '*.db'))
+        _archives = (mtime, frozenset(int(y) for y in years if y.isdigit()))
+    return _archives[1]
+
+def _archive_schemas(first_year, last_year):
+    """Attach the archives of the years in range; returns their schema names."""
+    return [engine().attach(f'a{y}', archive_path(y)) for y in sorted(archived_years()) if first_year <= y <= last_year]
+
+def archive_schemas(first_day, last_day):
+    """Attach the archives a day range reaches into; returns their schema names."""
+    return _archive_schemas(int(day_date(first_day)[:4]), int(day_date(last_day)[:4]))
+
+def tasks_source(first_day, last_day, columns):
+    """'tasks', or a FROM-able union of `columns` of the hot and archived tasks.
+
+    ?1 and ?2 bound each branch to the day range [first_day, last_day], so
+    every branch can use its own indexes (profiles.union_sql does the same
+    across profiles).
+    """
+    schemas = archive_schemas(first_day, last_day)
+    if not schemas:
+        return 'tasks'
+    return '(' + ' UNION ALL '.join(f'SELECT {columns} FROM {s}.tasks WHERE day BETWEEN ?1 AND ?2'
+                                    for s in ['main'] + schemas) + ')'
+
+# Optional in-process cache of view queries (the REPL turns it on). Writes made
+# through this module invalidate the entries they affect; commits by other
+# processes are noticed through PRAGMA data_version, which only changes when
+# another connection has written to the database.
+_cache = None
+
+def enable_cache(maxsize=128):
+    global _cache
+    from .cache import ViewCache
+    _cache = ViewCache(maxsize)
+    return _cache
+
+def cache_stats():
+    return _cache.stats() if _cache is not None else None
+
+def _cached(key, tags, load):
+    # Reads inside a transaction may see uncommitted rows, so they bypass it.
+    if _cache is None or engine().depth:
+        return load()
+    _cache.check_version(get_conn().execute('PRAGMA data_version').fetchone()[0])
+    return _cache.get(key, load, tags)
+
+def clear_cache():
+    """Drop every cached view, after writes that affect more dates than are worth tagging."""
+    if _cache is not None:
+        _cache.clear()
+
+def _invalidate(*tags):
+    if _cache is not None:
+        _cache.invalidate(*tags)
+
+def _date_tags(date_str):
+    d = datetime.date.fromisoformat(date_str)
+    monday = d - datetime.timedelta(days=d.weekday())
+    return ('day', date_str), ('week', monday.isoformat()), ('month', date_str[:7])
+
+# Schema migrations, keyed on PRAGMA user_version. MIGRATIONS[n] upgrades a
+# database from version n to n + 1; append new steps, never edit old ones.
+def _migration_1(conn):
+    """Base tasks table; databases from before versioning gain the status column."""
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS tasks (
         id INTEGER PRIMARY KEY,
         task_name TEXT NOT NULL,
@@ -21,151 +283,535 @@ def init_db():
         start_time TEXT,
         end_time TEXT,
         duration INTEGER,
-        date TEXT
-    );
+        date TEXT,
+        status TEXT DEFAULT 'completed'
+    )
     """)
-    conn.commit()
-    # ensure 'status' column exists
-    cur.execute("PRAGMA table_info(tasks)")
-    cols = [r[1] for r in cur.fetchall()]
+    cols = [r[1] for r in conn.execute('PRAGMA table_info(tasks)')]
     if 'status' not in cols:
-        try:
-            cur.execute("ALTER TABLE tasks ADD COLUMN status TEXT DEFAULT 'completed'")
-            conn.commit()
-        except Exception:
-            pass
-    # set defaults for existing rows if any
+        conn.execute("ALTER TABLE tasks ADD COLUMN status TEXT DEFAULT 'completed'")
+    conn.execute("UPDATE tasks SET status = 'completed' WHERE status IS NULL OR status = ''")
+
+def _migration_2(conn):
+    """Indexes for the day view, the week/month summaries and per-category reports."""
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_date_start ON tasks (date, start_time)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_date_duration ON tasks (date, duration)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_category ON tasks (category, date, duration)')
+    conn.execute('ANALYZE')
+
+# daily_rollup holds per (date, category) totals. The triggers keep it in step
+# with tasks inside whatever transaction modifies tasks.
+ROLLUP_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS tasks_rollup_ins AFTER INSERT ON tasks BEGIN
+        INSERT INTO daily_rollup (date, category, total, count)
+        VALUES (NEW.date, COALESCE(NEW.category, ''), COALESCE(NEW.duration, 0), 1)
+        ON CONFLICT (date, category) DO UPDATE SET total = total + excluded.total, count = count + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_rollup_del AFTER DELETE ON tasks BEGIN
+        UPDATE daily_rollup SET total = total - COALESCE(OLD.duration, 0), count = count - 1
+        WHERE date = OLD.date AND category = COALESCE(OLD.category, '');
+        DELETE FROM daily_rollup WHERE date = OLD.date AND category = COALESCE(OLD.category, '') AND count <= 0;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_rollup_upd AFTER UPDATE OF date, category, duration ON tasks BEGIN
+        UPDATE daily_rollup SET total = total - COALESCE(OLD.duration, 0), count = count - 1
+        WHERE date = OLD.date AND category = COALESCE(OLD.category, '');
+        DELETE FROM daily_rollup WHERE date = OLD.date AND category = COALESCE(OLD.category, '') AND count <= 0;
+        INSERT INTO daily_rollup (date, category, total, count)
+        VALUES (NEW.date, COALESCE(NEW.category, ''), COALESCE(NEW.duration, 0), 1)
+        ON CONFLICT (date, category) DO UPDATE SET total = total + excluded.total, count = count + 1;
+    END""",
+)
+
+# tasks_rollup_upd as migration 9 recreates it: since version 7 date is
+# generated from day, and UPDATE OF does not fire for generated columns
+ROLLUP_UPDATE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS tasks_rollup_upd AFTER UPDATE OF day, category, duration ON tasks BEGIN
+        UPDATE daily_rollup SET total = total - COALESCE(OLD.duration, 0), count = count - 1
+        WHERE date = OLD.date AND category = COALESCE(OLD.category, '');
+        DELETE FROM daily_rollup WHERE date = OLD.date AND category = COALESCE(OLD.category, '') AND count <= 0;
+        INSERT INTO daily_rollup (date, category, total, count)
+        VALUES (NEW.date, COALESCE(NEW.category, ''), COALESCE(NEW.duration, 0), 1)
+        ON CONFLICT (date, category) DO UPDATE SET total = total + excluded.total, count = count + 1;
+    END"""
+# the rollup triggers of a tasks table created today (archive files)
+CURRENT_ROLLUP_TRIGGERS = ROLLUP_TRIGGERS[:2] + (ROLLUP_UPDATE_TRIGGER,)
+
+ROLLUP_SOURCE_SQL = """SELECT date, COALESCE(category, '') AS category, SUM(COALESCE(duration, 0)) AS total, COUNT(*) AS count
+    FROM tasks GROUP BY date, COALESCE(category, '')"""
+
+def _migration_3(conn):
+    """daily_rollup table, its triggers, and a backfill from existing tasks."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS daily_rollup (
+        date TEXT NOT NULL,
+        category TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (date, category)
+    ) WITHOUT ROWID
+    """)
+    for trigger in ROLLUP_TRIGGERS:
+        conn.execute(trigger)
+    conn.execute('DELETE FROM daily_rollup')
+    conn.execute('INSERT INTO daily_rollup (date, category, total, count) ' + ROLLUP_SOURCE_SQL)
+
+def _read_json(path, default):
     try:
-        cur.execute("UPDATE tasks SET status = 'completed' WHERE status IS NULL OR status = ''")
-        conn.commit()
+        text = path.read_text()
+        if profiling.enabled:
+            profiling.add_bytes('json_read', len(text.encode()))
+        return json.loads(text)
     except Exception:
-        pass
-    conn.close()
-    # ensure meta exists
-    if not META_FILE.exists():
-        META_FILE.write_text(json.dumps({'next_id': 1}))
+        return default
+
+def _migration_4(conn):
+    """Active/paused state and the id counter move from JSON files into SQLite."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS live_tasks (
+        id INTEGER PRIMARY KEY,
+        state TEXT NOT NULL CHECK (state IN ('active', 'paused')),
+        task_name TEXT NOT NULL,
+        category TEXT,
+        notes TEXT,
+        start_time TEXT,
+        elapsed INTEGER,
+        date TEXT
+    )
+    """)
+    # at most one active task; INSERT OR REPLACE swaps it out
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_live_active ON live_tasks (state) WHERE state = 'active'")
+    conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value) WITHOUT ROWID')
+    active = _read_json(ACTIVE_FILE, None)
+    if active:
+        _put_live(conn, 'active', active)
+    for p in _read_json(PAUSED_FILE, []):
+        _put_live(conn, 'paused', p)
+    next_id = max(
+        _read_json(META_FILE, {}).get('next_id', 1),
+        conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM tasks').fetchone()[0],
+        conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM live_tasks').fetchone()[0],
+    )
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)", (next_id,))
+    for path in (ACTIVE_FILE, PAUSED_FILE, META_FILE):
+        if path.exists():
+            path.replace(path.with_name(path.name + '.migrated'))
+
+def _migration_5(conn):
+    """Covering index for range reports: every group key plus duration, led by date."""
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_report ON tasks (date, category, task_name, start_time, duration)')
+    conn.execute('ANALYZE')
+
+FTS_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_ins AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts (rowid, task_name, notes) VALUES (NEW.id, NEW.task_name, NEW.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_del AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, task_name, notes) VALUES ('delete', OLD.id, OLD.task_name, OLD.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_upd AFTER UPDATE OF id, task_name, notes ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, task_name, notes) VALUES ('delete', OLD.id, OLD.task_name, OLD.notes);
+        INSERT INTO tasks_fts (rowid, task_name, notes) VALUES (NEW.id, NEW.task_name, NEW.notes);
+    END""",
+)
+
+# '-' and '_' are token characters so ticket ids like ABC-123 index as one token
+FTS_TABLE_SQL = """CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            task_name, notes, content='tasks', content_rowid='id', tokenize="unicode61 tokenchars '-_'")"""
+
+def _migration_6(conn):
+    """FTS5 index over task names and notes, backfilled from existing rows.
+
+    Skipped on SQLite builds without FTS5; search then falls back to LIKE.
+    """
+    try:
+        conn.execute(FTS_TABLE_SQL)
+    except sqlite3.OperationalError:
+        return
+    for trigger in FTS_TRIGGERS:
+        conn.execute(trigger)
+    conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+
+# Since version 7 tasks stores integer epoch seconds, the UTC offset they were
+# recorded at and the local date as a day number. start_time, end_time and
+# date are virtual columns generated from those, so readers are unchanged.
+TASKS_TABLE_SQL = """CREATE TABLE tasks (
+    id INTEGER PRIMARY KEY,
+    task_name TEXT NOT NULL,
+    category TEXT,
+    notes TEXT,
+    start_ts INTEGER,
+    end_ts INTEGER,
+    utc_offset INTEGER,
+    day INTEGER,
+    duration INTEGER,
+    status TEXT DEFAULT 'completed',
+    start_time TEXT GENERATED ALWAYS AS (strftime('%Y-%m-%dT%H:%M:%S', start_ts + utc_offset, 'unixepoch')) VIRTUAL,
+    end_time TEXT GENERATED ALWAYS AS (strftime('%Y-%m-%dT%H:%M:%S', end_ts + utc_offset, 'unixepoch')) VIRTUAL,
+    date TEXT GENERATED ALWAYS AS (date(day * 86400, 'unixepoch')) VIRTUAL
+)"""
+
+TASK_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_tasks_day_start ON tasks (day, start_ts)',
+    'CREATE INDEX IF NOT EXISTS idx_tasks_category ON tasks (category, day, duration)',
+    'CREATE INDEX IF NOT EXISTS idx_tasks_report ON tasks (day, category, task_name, start_ts, utc_offset, duration)',
+)
+
+def _migration_7(conn):
+    """Rebuild tasks with integer timestamps and day numbers (see TASKS_TABLE_SQL).
+
+    Indexes and triggers go with the old table and are recreated; tasks_fts
+    keeps its rowids, so it needs no rebuild. Timestamps that do not parse
+    are stored as NULL, but their original text is kept in tasks_unreadable
+    and the upgrade says how many there were.
+    """
+    unreadable = []
+
+    def convert(values):
+        try:
+            return task_row(values)
+        except (TypeError, ValueError):
+            unreadable.append((values[0], values[4], values[5], values[7]))
+            try:
+                day = day_number(values[7])
+            except (TypeError, ValueError):
+                day = None
+            return values[:4] + (None, None, None, day, values[6], values[8])
+
+    conn.execute(TASKS_TABLE_SQL.replace('CREATE TABLE tasks', 'CREATE TABLE tasks_new', 1))
+    old = conn.execute(f"SELECT {','.join(TASK_COLUMNS)} FROM tasks")
+    conn.executemany(INSERT_TASK_SQL.replace('INTO tasks', 'INTO tasks_new', 1), (convert(tuple(r)) for r in old))
+    conn.execute('DROP TABLE tasks')
+    conn.execute('ALTER TABLE tasks_new RENAME TO tasks')
+    for sql in TASK_INDEXES + ROLLUP_TRIGGERS:
+        conn.execute(sql)
+    if unreadable:
+        conn.execute('CREATE TABLE tasks_unreadable (id INTEGER PRIMARY KEY, start_time TEXT, end_time TEXT, date TEXT)')
+        conn.executemany('INSERT INTO tasks_unreadable VALUES (?, ?, ?, ?)', unreadable)
+        sys.stderr.write(f'trackme: {len(unreadable)} tasks had unreadable timestamps and lost their times '
+                         f'(ids {", ".join(str(u[0]) for u in unreadable[:10])}{", ..." if len(unreadable) > 10 else ""}); '
+                         'the original text is in the tasks_unreadable table\n')
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'").fetchone():
+        for trigger in FTS_TRIGGERS:
+            conn.execute(trigger)
+    conn.execute('ANALYZE')
+
+# Since version 8 every task also has a uid that identifies it across
+# machines (the integer id stays local), and changelog holds the latest change
+# to each task under an ever-increasing seq: the changes since seq N are a
+# range scan of changelog however large tasks is. See sync.py.
+SYNC_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS tasks_uid AFTER INSERT ON tasks WHEN NEW.uid IS NULL BEGIN
+        UPDATE tasks SET uid = lower(hex(randomblob(8))) WHERE id = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_changelog_ins AFTER INSERT ON tasks BEGIN
+        INSERT OR REPLACE INTO changelog (task_id, mtime) VALUES (NEW.id, CAST(strftime('%s', 'now') AS INTEGER));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_changelog_upd
+        AFTER UPDATE OF task_name, category, notes, start_ts, end_ts, utc_offset, day, duration, status ON tasks BEGIN
+        INSERT OR REPLACE INTO changelog (task_id, mtime) VALUES (NEW.id, CAST(strftime('%s', 'now') AS INTEGER));
+    END""",
+)
+
+def _migration_8(conn):
+    """uid column and changelog for delta sync, backfilled from existing rows.
+
+    Existing rows get a uid hashed from their id and content, so two copies
+    of one database (how machines were kept in step before) agree on the
+    uids of the history they share.
+    """
+    import hashlib
+    conn.execute('ALTER TABLE tasks ADD COLUMN uid TEXT')
+    rows = conn.execute(f"SELECT {','.join(STORED_COLUMNS)} FROM tasks").fetchall()
+    conn.executemany('UPDATE tasks SET uid = ? WHERE id = ?',
+                     ((hashlib.sha1(json.dumps(list(r)).encode()).hexdigest()[:16], r[0]) for r in rows))
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_uid ON tasks (uid)')
+    conn.execute("""CREATE TABLE IF NOT EXISTS changelog (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER NOT NULL UNIQUE,
+        mtime INTEGER NOT NULL
+    )""")
+    conn.execute('INSERT INTO changelog (task_id, mtime) SELECT id, COALESCE(end_ts, start_ts, 0) FROM tasks ORDER BY id')
+    for trigger in SYNC_TRIGGERS:
+        conn.execute(trigger)
+
+def _migration_9(conn):
+    """Recreate tasks_rollup_upd on day, and rebuild daily_rollup.
+
+    Version 7 made date a generated column, and an UPDATE OF trigger does not
+    fire for generated columns, so moving a task to another day left the
+    rollup behind.
+    """
+    conn.execute('DROP TRIGGER IF EXISTS tasks_rollup_upd')
+    conn.execute(ROLLUP_UPDATE_TRIGGER)
+    conn.execute('DELETE FROM daily_rollup')
+    conn.execute('INSERT INTO daily_rollup (date, category, total, count) ' + ROLLUP_SOURCE_SQL)
+
+MIGRATIONS = [
+    _migration_1,
+    _migration_2,
+    _migration_3,
+    _migration_4,
+    _migration_5,
+    _migration_6,
+    _migration_7,
+    _migration_8,
+    _migration_9,
+]
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn):
+    """Bring the database up to date. Steady state costs one PRAGMA read."""
+    if schema_version(conn) >= len(MIGRATIONS):
+        return
+    for version in range(len(MIGRATIONS)):
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # re-check under the write lock: another process may have got here first
+            if schema_version(conn) > version:
+                conn.execute('ROLLBACK')
+                continue
+            MIGRATIONS[version](conn)
+            conn.execute(f'PRAGMA user_version = {version + 1}')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+NEXT_ID_SQL = """SELECT MAX(
+    (SELECT value FROM meta WHERE key = 'next_id'),
+    (SELECT COALESCE(MAX(id), 0) + 1 FROM tasks),
+    (SELECT COALESCE(MAX(id), 0) + 1 FROM live_tasks))"""
 
 def _get_next_id():
-    if not META_FILE.exists():
-        META_FILE.write_text(json.dumps({'next_id': 1}))
-    data = json.loads(META_FILE.read_text())
-    nid = data.get('next_id', 1)
-    data['next_id'] = nid + 1
-    META_FILE.write_text(json.dumps(data))
+    """Allocate an id under the database write lock.
+
+    BEGIN IMMEDIATE serializes allocators across processes, and the MAX()
+    against both task tables keeps ids unique even if rows were written by
+    something that bypassed the counter.
+    """
+    with transaction() as conn:
+        nid = conn.execute(NEXT_ID_SQL).fetchone()[0]
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'next_id'", (nid + 1,))
     return nid
 
-# Paused tasks (persisted to JSON)
+# Active and paused tasks live in one table, keyed by task id, so that moving a
+# task between states is a single-row INSERT OR REPLACE.
+LIVE_SQL = "INSERT OR REPLACE INTO live_tasks (id, state, task_name, category, notes, start_time, elapsed, date) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+PAUSED_COLUMNS = 'id, task_name, category, notes, elapsed, date'
+ACTIVE_COLUMNS = 'id, task_name, category, notes, start_time, date'
+
+def _put_live(conn, state, task):
+    conn.execute(LIVE_SQL, (task['id'], state, task.get('task_name'), task.get('category', ''), task.get('notes', ''),
+                            task.get('start_time'), task.get('elapsed'), task.get('date')))
+
+# Paused tasks
 def load_paused():
-    if not PAUSED_FILE.exists():
-        return []
-    try:
-        return json.loads(PAUSED_FILE.read_text())
-    except Exception:
-        return []
+    return _cached(('paused',), (('live',),), _load_paused)
+
+def _live(sql, params=()):
+    cur = get_conn().execute(sql, params)
+    cur.row_factory = named_row_factory
+    return cur
+
+def _load_paused():
+    return _live(f"SELECT {PAUSED_COLUMNS}, state AS status FROM live_tasks WHERE state = 'paused' ORDER BY id").fetchall()
 
 def save_paused(paused_list):
-    PAUSED_FILE.write_text(json.dumps(paused_list, indent=2))
+    with transaction() as conn:
+        conn.execute("DELETE FROM live_tasks WHERE state = 'paused'")
+        for task in paused_list:
+            _put_live(conn, 'paused', task)
+    _invalidate(('live',))
 
 def add_paused(task):
-    paused = load_paused()
-    paused.append(task)
-    save_paused(paused)
+    _put_live(get_conn(), 'paused', task)
+    _invalidate(('live',))
 
 def remove_paused(task_id):
-    paused = load_paused()
-    new = [t for t in paused if t['id'] != task_id]
-    save_paused(new)
+    get_conn().execute("DELETE FROM live_tasks WHERE id = ? AND state = 'paused'", (task_id,))
+    _invalidate(('live',))
 
 def find_paused(task_id):
-    paused = load_paused()
-    for t in paused:
-        if t['id'] == task_id:
-            return t
-    return None
+    return _live(f"SELECT {PAUSED_COLUMNS}, state AS status FROM live_tasks WHERE id = ? AND state = 'paused'",
+                 (task_id,)).fetchone()
 
 def list_paused():
     return load_paused()
 
-# Active task file
+# Active task. Every change is mirrored, after commit, into PROMPT_FILE so
+# that `trackme prompt` can show it without opening the database.
+def _mirror_prompt(task):
+    # only a cache, and the transaction has already committed: a failed write
+    # must not fail the command (sync_prompt_state repairs it later)
+    try:
+        prompt.write_state(PROMPT_FILE, task)
+    except OSError:
+        pass
+
 def save_active(task):
-    ACTIVE_FILE.write_text(json.dumps(task, indent=2))
+    _put_live(get_conn(), 'active', task)
+    _invalidate(('live',))
+    engine().on_commit(lambda: _mirror_prompt(task))
 
 def load_active():
-    if not ACTIVE_FILE.exists():
-        return None
-    try:
-        return json.loads(ACTIVE_FILE.read_text())
-    except Exception:
-        return None
+    return _cached(('active',), (('live',),), _load_active)
+
+def _load_active():
+    return _live(f"SELECT {ACTIVE_COLUMNS}, state AS status FROM live_tasks WHERE state = 'active'").fetchone()
 
 def clear_active():
-    if ACTIVE_FILE.exists():
-        ACTIVE_FILE.unlink()
+    get_conn().execute("DELETE FROM live_tasks WHERE state = 'active'")
+    _invalidate(('live',))
+    engine().on_commit(lambda: _mirror_prompt(None))
+
+def sync_prompt_state(active):
+    """Rewrite PROMPT_FILE if it disagrees with the active task from the database."""
+    current = prompt.read_state(PROMPT_FILE)
+    if (current and current['id']) != (active and active['id']):
+        _mirror_prompt(active)
+
+# Completed tasks -> SQLite. Callers deal in TASK_COLUMNS values (ISO text);
+# task_row() converts them to the stored STORED_COLUMNS form.
+STORED_COLUMNS = ['id', 'task_name', 'category', 'notes', 'start_ts', 'end_ts', 'utc_offset', 'day', 'duration', 'status']
+INSERT_TASK_SQL = f"INSERT INTO tasks ({','.join(STORED_COLUMNS)}) VALUES ({','.join(['?'] * len(STORED_COLUMNS))})"
+EPOCH = datetime.datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+
+def day_number(date_str):
+    """'YYYY-MM-DD' -> days since 1970-01-01."""
+    return datetime.date.fromisoformat(date_str).toordinal() - EPOCH_ORDINAL
+
+def date_arg(text):
+    """argparse type= for YYYY-MM-DD options: the text, once it is known to be a real date."""
+    try:
+        datetime.date.fromisoformat(text)
+    except ValueError:
+        import argparse
+        raise argparse.ArgumentTypeError(f'{text!r} is not a YYYY-MM-DD date')
+    return text
+
+def day_range(date_from=None, date_to=None):
+    """Inclusive (first, last) day numbers for optional 'YYYY-MM-DD' bounds."""
+    return day_number(date_from or '0001-01-01'), day_number(date_to or '9999-12-31')
+
+def day_date(day):
+    return None if day is None else datetime.date.fromordinal(day + EPOCH_ORDINAL).isoformat()
+
+def to_epoch(ts):
+    """ISO timestamp -> (epoch seconds, UTC offset in seconds); naive times are local time."""
+    if not ts:
+        return None, None
+    dt = datetime.datetime.fromisoformat(ts).replace(microsecond=0)
+    if dt.tzinfo is None:
+        dt = dt.astimezone()
+    return int(dt.timestamp()), int(dt.utcoffset().total_seconds())
+
+def _wall(ts, offset):
+    return None if ts is None else (EPOCH + datetime.timedelta(seconds=ts + offset)).isoformat()
+
+def task_row(values):
+    """TASK_COLUMNS-ordered values -> a STORED_COLUMNS-ordered tuple for INSERT_TASK_SQL."""
+    tid, name, category, notes, start, end, duration, date, status = values
+    start_ts, offset = to_epoch(start)
+    end_ts, end_offset = to_epoch(end)
+    # one offset per task: an end time across a DST change reads back in the start's offset
+    if offset is None:
+        offset = end_offset
+    return (tid, name, category, notes, start_ts, end_ts, offset, day_number(date) if date else None, duration, status)
+
+def task_values(values):
+    """TASK_COLUMNS values as the tasks table will read them back (whole seconds, local wall time)."""
+    return stored_values(task_row(values))
+
+def stored_values(row):
+    """A STORED_COLUMNS-ordered row -> TASK_COLUMNS values."""
+    tid, name, category, notes, start_ts, end_ts, offset, day, duration, status = row
+    return [tid, name, category, notes, _wall(start_ts, offset), _wall(end_ts, offset), duration, day_date(day), status]
 
-# Completed tasks -> SQLite
 def save_completed(task):
-    """Save a completed task to SQLite. Handles schema differences and status."""
-    init_db()
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    # ensure status column exists
-    cur.execute("PRAGMA table_info(tasks)")
-    cols = [r[1] for r in cur.fetchall()]
-    if 'status' not in cols:
-        try:
-            cur.execute("ALTER TABLE tasks ADD COLUMN status TEXT DEFAULT 'completed'")
-            conn.commit()
-            cols.append('status')
-        except Exception:
-            pass
-    # prepare insert columns
-    base_cols = ['id', 'task_name', 'category', 'notes', 'start_time', 'end_time', 'duration', 'date']
-    insert_cols = [c for c in base_cols if c in cols]
-    values = [task.get(c) for c in insert_cols]
-    if 'status' in cols and 'status' not in insert_cols:
-        insert_cols.append('status')
-        values.append(task.get('status', 'completed'))
-    placeholders = ','.join(['?'] * len(insert_cols))
-    col_list_sql = ','.join(insert_cols)
-    cur.execute(f"INSERT INTO tasks ({col_list_sql}) VALUES ({placeholders})", tuple(values))
-    conn.commit()
-    conn.close()
+    """Save a completed task to SQLite."""
+    values = [task.get(c) for c in TASK_COLUMNS[:-1]]
+    values.append(task.get('status', 'completed'))
+    with transaction() as conn:
+        conn.execute(INSERT_TASK_SQL, task_row(values))
+    if task.get('date'):
+        _invalidate(*_date_tags(task['date']))
+
+# (day, start_ts) index order, with the rowid as tie-breaker: no sort step.
+DAY_SQL = f"SELECT {','.join(TASK_COLUMNS)} FROM tasks WHERE day = ? ORDER BY start_ts, id"
+DAY_COLUMNS = ','.join(TASK_COLUMNS + ['start_ts'])
 
 def get_tasks_for_date(date_str):
-    init_db()
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute('SELECT * FROM tasks WHERE date = ? ORDER BY start_time', (date_str,))
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    return _cached(('day', date_str), (('day', date_str),), lambda: _tasks_for_date(date_str))
+
+def _day_cursor(date_str):
+    day = day_number(date_str)
+    source = tasks_source(day, day, DAY_COLUMNS)
+    if source == 'tasks':
+        cur = get_conn().execute(DAY_SQL, (day,))
+    else:
+        cur = get_conn().execute(f"SELECT {','.join(TASK_COLUMNS)} FROM {source} ORDER BY start_ts, id", (day, day))
+    cur.row_factory = row_factory
+    return cur
+
+def _tasks_for_date(date_str):
+    return _day_cursor(date_str).fetchall()
+
+def iter_tasks_for_date(date_str):
+    """Yield the day's tasks in (start_ts, id) order without building a list.
+
+    When the view cache is on, the cached rows are used instead.
+    """
+    if _cache is not None:
+        yield from get_tasks_for_date(date_str)
+        return
+    yield from _day_cursor(date_str)
+
+def _summary(start, end):
+    sql = SUMMARY_SQL
+    schemas = _archive_schemas(start.year, end.year)
+    if schemas:
+        rollups = ' UNION ALL '.join(f'SELECT date, total FROM {s}.daily_rollup WHERE date BETWEEN ?1 AND ?2'
+                                     for s in ['main'] + schemas)
+        sql = f'SELECT date, SUM(total) as total FROM ({rollups}) GROUP BY date ORDER BY date'
+    cur = get_conn().execute(sql, (start.isoformat(), end.isoformat()))
+    return [dict(r) for r in cur.fetchall()]
+
+SUMMARY_SQL = 'SELECT date, SUM(total) as total FROM daily_rollup WHERE date BETWEEN ? AND ? GROUP BY date ORDER BY date'
 
 def get_weekly_summary(iso_date):
-    import datetime
     d = datetime.date.fromisoformat(iso_date)
     start = d - datetime.timedelta(days=d.weekday())
     end = start + datetime.timedelta(days=6)
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute('SELECT date, SUM(duration) as total FROM tasks WHERE date BETWEEN ? AND ? GROUP BY date ORDER BY date', (start.isoformat(), end.isoformat()))
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    key = ('week', start.isoformat())
+    return _cached(key, (key,), lambda: _summary(start, end))
 
 def get_monthly_summary(year, month):
-    import datetime, calendar
+    import calendar
     start = datetime.date(year, month, 1)
     last = calendar.monthrange(year, month)[1]
     end = datetime.date(year, month, last)
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute('SELECT date, SUM(duration) as total FROM tasks WHERE date BETWEEN ? AND ? GROUP BY date ORDER BY date', (start.isoformat(), end.isoformat()))
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    key = ('month', start.isoformat()[:7])
+    return _cached(key, (key,), lambda: _summary(start, end))
+
+def check_rollup():
+    """Compare daily_rollup with an aggregate of raw tasks.
+
+    Returns a list of (date, category, rollup, actual) where rollup/actual are
+    (total, count) tuples, or None when the row is missing on that side.
+    """
+    conn = get_conn()
+    actual = {(r[0], r[1]): (r[2], r[3]) for r in conn.execute(ROLLUP_SOURCE_SQL)}
+    rollup = {(r[0], r[1]): (r[2], r[3]) for r in conn.execute('SELECT date, category, total, count FROM daily_rollup')}
+    return [(k[0], k[1], rollup.get(k), actual.get(k))
+            for k in sorted(set(actual) | set(rollup)) if rollup.get(k) != actual.get(k)]
+
+def rebuild_rollup():
+    with transaction() as conn:
+        conn.execute('DELETE FROM daily_rollup')
+        conn.execute('INSERT INTO daily_rollup (date, category, total, count) ' + ROLLUP_SOURCE_SQL)
+    clear_cache()
 
 def generate_id():
     return _get_next_id()
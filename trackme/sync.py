@@ -0,0 +1,237 @@
+"""Incremental sync between machines through delta files (`trackme sync`).
+
+Every task has a uid that is the same on every machine, next to its integer
+id, which stays local. changelog records the latest change to each task
+under an ever-increasing seq; triggers keep both up to date (see storage).
+An export ships only the tasks changed after a given seq:
+
+    {"format": "trackme-delta", "version": 1, "since": N}    header
+    [uid, mtime, task_name, category, ..., status]          one line per task
+    {"seq": M, "count": n}                                  trailer
+
+so its cost follows the number of changes, not the size of the database.
+M is the --since of the next export to the same machine; `--peer NAME`
+keeps track of it. Files ending in .gz are gzip-compressed.
+
+Import inserts unknown uids under fresh local ids. When both sides have a
+uid with different contents, the version with the later mtime wins and a tie
+goes to the larger content, so every machine ends up with the same row
+whichever order deltas arrive in. Uids this machine has archived (see
+archive.py) are skipped: the archive keeps its copy. A delta is applied in one transaction, so
+a truncated file changes nothing. Only completed tasks sync; active and
+paused tasks belong to the machine they run on.
+"""
+import gzip
+import json
+import sys
+from itertools import islice
+
+from . import storage, journal
+from .journal import _dumps
+
+FORMAT = 'trackme-delta'
+VERSION = 1
+BATCH = 5000
+
+VALUE_COLUMNS = storage.STORED_COLUMNS[1:]
+ROW_COLUMNS = ['uid', 'mtime'] + VALUE_COLUMNS
+_INT_COLUMNS = ('start_ts', 'end_ts', 'utc_offset', 'day', 'duration')
+
+CHANGES_SQL = f"""SELECT c.seq, t.uid, c.mtime, {', '.join('t.' + c for c in VALUE_COLUMNS)}
+    FROM changelog c JOIN tasks t ON t.id = c.task_id WHERE c.seq > ? ORDER BY c.seq"""
+INSERT_SQL = f"INSERT INTO tasks (uid, {','.join(storage.STORED_COLUMNS)}) VALUES ({','.join(['?'] * len(ROW_COLUMNS))})"
+UPDATE_SQL = f"UPDATE tasks SET {', '.join(c + ' = ?' for c in VALUE_COLUMNS)} WHERE id = ?"
+MTIME_SQL = 'UPDATE changelog SET mtime = ? WHERE task_id = ?'
+
+class SyncError(ValueError):
+    """A delta file that cannot be applied."""
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def last_seq():
+    return storage.get_conn().execute('SELECT COALESCE(MAX(seq), 0) FROM changelog').fetchone()[0]
+
+# Export
+def export_delta(out, since=0):
+    """Write the tasks changed after seq `since`; returns (count, last seq)."""
+    out.write(_dumps({'format': FORMAT, 'version': VERSION, 'since': since}) + '\n')
+    seq, n = since, 0
+    for row in storage.get_conn().execute(CHANGES_SQL, (since,)):
+        out.write(_dumps(list(row[1:])) + '\n')
+        seq, n = row[0], n + 1
+    out.write(_dumps({'seq': seq, 'count': n}) + '\n')
+    return n, seq
+
+# Import
+def _check(n, row):
+    if not isinstance(row, list) or len(row) != len(ROW_COLUMNS):
+        raise SyncError(f'line {n}: expected a list of {len(ROW_COLUMNS)} values')
+    rec = dict(zip(ROW_COLUMNS, row))
+    if not isinstance(rec['uid'], str) or not rec['uid']:
+        raise SyncError(f'line {n}: bad uid {rec["uid"]!r}')
+    if not isinstance(rec['mtime'], int) or not isinstance(rec['task_name'], str):
+        raise SyncError(f'line {n}: bad mtime or task_name')
+    for c in _INT_COLUMNS:
+        if rec[c] is not None and not isinstance(rec[c], int):
+            raise SyncError(f'line {n}: {c} is not an integer: {rec[c]!r}')
+    for c in ('category', 'notes', 'status'):
+        if rec[c] is not None and not isinstance(rec[c], str):
+            raise SyncError(f'line {n}: {c} is not a string: {rec[c]!r}')
+    return row[0], row[1], tuple(row[2:])
+
+def _rows(lines, info):
+    """Yield (uid, mtime, values) and fill `info` from the header and trailer."""
+    try:
+        header = json.loads(next(lines, '') or 'null')
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get('format') != FORMAT:
+        raise SyncError('not a trackme delta file')
+    if header.get('version') != VERSION:
+        raise SyncError(f"unsupported delta version {header.get('version')!r}")
+    info['since'] = header.get('since')
+    count = 0
+    for n, line in enumerate(lines, 2):
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            raise SyncError(f'line {n}: bad JSON: {e}')
+        if isinstance(item, dict):
+            if item.get('count') != count:
+                raise SyncError(f"trailer says {item.get('count')} tasks, the file has {count}")
+            info['seq'] = item.get('seq')
+            return
+        count += 1
+        yield _check(n, item)
+    raise SyncError('the file is truncated (no trailer)')
+
+def _local(conn, uids):
+    """uid -> (id, mtime, values) for the uids this database already has."""
+    found = {}
+    cols = ', '.join('t.' + c for c in VALUE_COLUMNS)
+    for i in range(0, len(uids), storage.IN_CHUNK):
+        chunk = uids[i:i + storage.IN_CHUNK]
+        sql = (f"SELECT t.uid, t.id, COALESCE(c.mtime, 0), {cols} FROM tasks t LEFT JOIN changelog c ON c.task_id = t.id "
+               f"WHERE t.uid IN ({','.join('?' * len(chunk))})")
+        for r in conn.execute(sql, chunk):
+            found[r[0]] = (r[1], r[2], tuple(r[3:]))
+    return found
+
+def _archived(conn, uids):
+    """The uids among `uids` that have been moved to an archive file."""
+    found = set()
+    for schema in storage.archive_schemas(*storage.day_range()):
+        for i in range(0, len(uids), storage.IN_CHUNK):
+            chunk = uids[i:i + storage.IN_CHUNK]
+            sql = f"SELECT uid FROM {schema}.tasks WHERE uid IN ({','.join('?' * len(chunk))})"
+            found.update(r[0] for r in conn.execute(sql, chunk))
+    return found
+
+def _wins(mtime, values, other_mtime, other_values):
+    """The deterministic conflict rule: later mtime, then larger content."""
+    return (mtime, _dumps(values)) > (other_mtime, _dumps(other_values))
+
+def import_delta(lines):
+    """Apply a delta in one transaction; returns counts plus the delta's since/seq."""
+    result = dict.fromkeys(('new', 'updated', 'unchanged', 'kept', 'archived'), 0)
+    rows = _rows(iter(lines), result)
+    with storage.transaction() as conn:
+        next_free = conn.execute(storage.NEXT_ID_SQL).fetchone()[0]
+        while True:
+            chunk = list(islice(rows, BATCH))
+            if not chunk:
+                break
+            uids = list({r[0] for r in chunk})
+            local = _local(conn, uids)
+            archived = _archived(conn, [u for u in uids if u not in local])
+            inserts, updates, mtimes, events = [], [], [], []
+            for uid, mtime, values in chunk:
+                have = local.get(uid)
+                if have is None and uid in archived:
+                    result['archived'] += 1
+                    continue
+                if have is None:
+                    tid = next_free
+                    next_free += 1
+                    inserts.append((uid, tid) + values)
+                    result['new'] += 1
+                else:
+                    tid, have_mtime, have_values = have
+                    if values == have_values:
+                        result['unchanged'] += 1
+                        continue
+                    if not _wins(mtime, values, have_mtime, have_values):
+                        result['kept'] += 1
+                        continue
+                    updates.append(values + (tid,))
+                    result['updated'] += 1
+                local[uid] = (tid, mtime, values)
+                mtimes.append((mtime, tid))
+                events.append(storage.stored_values((tid,) + values))
+            conn.executemany(INSERT_SQL, inserts)
+            conn.executemany(UPDATE_SQL, updates)
+            # keep the writer's mtime rather than the time of this import
+            conn.executemany(MTIME_SQL, mtimes)
+            journal.record_many('sync', events)
+        conn.execute("UPDATE meta SET value = MAX(value, ?) WHERE key = 'next_id'", (next_free,))
+    return result
+
+# Peers
+def _sent_key(peer):
+    return f'sync_sent:{peer}'
+
+def peers():
+    """[(peer, last seq exported to it)] for exports made with --peer."""
+    rows = storage.get_conn().execute("SELECT key, value FROM meta WHERE key LIKE 'sync_sent:%' ORDER BY key")
+    return [(k.split(':', 1)[1], v) for k, v in rows]
+
+def main(argv):
+    """trackme sync export|import|status [...]"""
+    import argparse
+    ap = argparse.ArgumentParser(prog='trackme sync')
+    sub = ap.add_subparsers(dest='action', required=True)
+    ep = sub.add_parser('export', help='write the tasks changed since a seq as a delta file')
+    ep.add_argument('-o', '--output', default='-', help="file to write, .gz to compress (default stdout)")
+    ep.add_argument('--since', type=int, metavar='SEQ', help='changes after this seq (default: 0, or what --peer has seen)')
+    ep.add_argument('--peer', metavar='NAME', help='remember the last seq exported to NAME and continue from it')
+    ip = sub.add_parser('import', help='apply a delta file from another machine')
+    ip.add_argument('file', help="delta file, or '-' for stdin")
+    sub.add_parser('status', help='show the change seq and what each peer has been sent')
+    args = ap.parse_args(argv)
+
+    if args.action == 'status':
+        seq = last_seq()
+        print(f'Change seq: {seq}')
+        for peer, sent in peers():
+            pending = storage.get_conn().execute('SELECT COUNT(*) FROM changelog WHERE seq > ?', (sent,)).fetchone()[0]
+            print(f'  {peer}: sent up to {sent}, {pending} changes pending')
+        return 0
+    if args.action == 'export':
+        since = args.since
+        if since is None:
+            since = dict(peers()).get(args.peer, 0) if args.peer else 0
+        if args.output == '-':
+            n, seq = export_delta(sys.stdout, since)
+        else:
+            with _open(args.output, 'w') as out:
+                n, seq = export_delta(out, since)
+        if args.peer:
+            with storage.transaction() as conn:
+                conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (_sent_key(args.peer), seq))
+        print(f'Exported {n} changed tasks (seq {since}..{seq}); next time use --since {seq}.', file=sys.stderr)
+        return 0
+    try:
+        if args.file == '-':
+            result = import_delta(sys.stdin)
+        else:
+            with _open(args.file, 'r') as f:
+                result = import_delta(f)
+    except (SyncError, OSError, EOFError) as e:
+        print(f'trackme sync: {e}; nothing was applied', file=sys.stderr)
+        return 1
+    print('Applied delta seq {since}..{seq}: {new} new, {updated} updated, {unchanged} unchanged, '
+          '{kept} kept (local version is newer), {archived} archived.'.format(**result))
+    return 0
@@ -0,0 +1,125 @@
+"""Task: the record for active, paused and completed tasks.
+
+A __slots__ object instead of a dict per row: a fraction of the memory and
+plain attribute access. It still answers the mapping calls (task['id'],
+task.get('notes', ''), dict(task)) used by storage, the journal, the prompt
+state file and the view code, with None standing for "not set".
+
+Each state transition has one constructor: Task.start, and the pause,
+resume and complete methods, which return new records.
+"""
+import datetime
+
+FIELDS = ('id', 'task_name', 'category', 'notes', 'start_time', 'end_time', 'duration', 'date', 'status', 'elapsed')
+
+def _iso(dt):
+    return dt.isoformat(timespec='seconds')
+
+class Task:
+    __slots__ = FIELDS
+    id: int
+    task_name: str
+    category: str
+    notes: str
+    start_time: str     # ISO local time; set for active and completed tasks
+    end_time: str
+    duration: int       # seconds; completed tasks
+    date: str           # YYYY-MM-DD the task belongs to
+    status: str         # 'active', 'paused' or 'completed'
+    elapsed: int        # seconds tracked so far; paused tasks
+
+    def __init__(self, id=None, task_name=None, category=None, notes=None, start_time=None, end_time=None,
+                 duration=None, date=None, status=None, elapsed=None):
+        self.id = id
+        self.task_name = task_name
+        self.category = category
+        self.notes = notes
+        self.start_time = start_time
+        self.end_time = end_time
+        self.duration = duration
+        self.date = date
+        self.status = status
+        self.elapsed = elapsed
+
+    # Mapping compatibility
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in FIELDS and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        value = getattr(self, key) if key in FIELDS else None
+        return default if value is None else value
+
+    def keys(self):
+        return [k for k in FIELDS if getattr(self, k) is not None]
+
+    def copy(self):
+        return Task(*[getattr(self, k) for k in FIELDS])
+
+    def __eq__(self, other):
+        if not isinstance(other, Task):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in FIELDS)
+
+    def __repr__(self):
+        return 'Task(' + ', '.join(f'{k}={getattr(self, k)!r}' for k in self.keys()) + ')'
+
+    # Transitions
+    @classmethod
+    def start(cls, tid, task_name, category='', notes='', now=None):
+        now = now or datetime.datetime.now()
+        return cls(tid, task_name, category, notes, start_time=_iso(now), date=now.date().isoformat(), status='active')
+
+    def elapsed_at(self, now=None):
+        """Seconds tracked as of `now`: since start_time if active, else the stored elapsed."""
+        if self.status == 'active' and self.start_time:
+            now = now or datetime.datetime.now()
+            return int((now - datetime.datetime.fromisoformat(self.start_time)).total_seconds())
+        return int(self.elapsed or 0)
+
+    def pause(self, now=None):
+        now = now or datetime.datetime.now()
+        return Task(self.id, self.task_name, self.category or '', self.notes or '',
+                    date=self.date or now.date().isoformat(), status='paused', elapsed=self.elapsed_at(now))
+
+    def resume(self, now=None):
+        now = now or datetime.datetime.now()
+        start = now - datetime.timedelta(seconds=self.elapsed or 0)
+        return Task(self.id, self.task_name, self.category or '', self.notes or '', start_time=_iso(start),
+                    date=self.date or now.date().isoformat(), status='active')
+
+    def complete(self, now=None):
+        """Active or paused -> completed, ending now."""
+        now = now or datetime.datetime.now()
+        duration = self.elapsed_at(now)
+        if self.status == 'active' and self.start_time:
+            start = self.start_time
+        else:
+            start = _iso(now - datetime.timedelta(seconds=duration))
+        return Task(self.id, self.task_name, self.category or '', self.notes or '', start, _iso(now), duration,
+                    self.date or now.date().isoformat(), 'completed')
+
+    def for_day(self, now=None):
+        """Row for the day view: duration is the time tracked so far."""
+        row = self.copy()
+        row.duration = self.elapsed_at(now)
+        row.end_time = ''
+        return row
+
+# sqlite3 row factories
+def row_factory(cursor, row):
+    """For queries selecting columns in FIELDS order (storage.TASK_COLUMNS and on)."""
+    return Task(*row)
+
+def named_row_factory(cursor, row):
+    """For queries selecting any subset of FIELDS by name."""
+    return Task(**{d[0]: v for d, v in zip(cursor.description, row)})
@@ -1,27 +1,22 @@
-from rich.table import Table
-from rich.console import Console
-from rich import box
-from . import storage
+import sys, itertools, json
 import datetime
+from . import storage, profiling
+from .prompt import format_seconds
 
-console = Console()
-
-def format_seconds(s):
-    if not s:
-        return '0s'
-    m, sec = divmod(int(s), 60)
-    h, m = divmod(m, 60)
-    parts = []
-    if h:
-        parts.append(f"{h}h")
-    if m:
-        parts.append(f"{m}m")
-    if sec and not h:
-        parts.append(f"{sec}s")
-    return ' '.join(parts) if parts else '0s'
-
-def print_tasks_table(rows):
-    table = Table(title="Tasks for the day", box=box.SIMPLE_HEAVY)
+# rich is imported on first use: the tsv and json views never render a table
+console = None
+
+def _console():
+    global console
+    if console is None:
+        from rich.console import Console
+        console = Console()
+    return console
+
+def print_tasks_table(rows, title="Tasks for the day", show_total=True):
+    from rich import box
+    from rich.table import Table
+    table = Table(title=title, box=box.SIMPLE_HEAVY)
     table.add_column("ID", justify="right")
     table.add_column("Task")
     table.add_column("Category")
@@ -42,15 +37,17 @@ def print_tasks_table(rows):
         else:
             status_display = '[blue]Completed[/blue]'
         table.add_row(str(r.get('id')), r.get('task_name',''), r.get('category','') or '', status_display, start_short, end_short, dur, r.get('notes','') or '')
-    console.print(table)
-    total = sum([r.get('duration',0) for r in rows])
-    console.print(f"[bold]Total: {format_seconds(total)}[/bold]")
+    _console().print(table)
+    if show_total:
+        total = sum([r.get('duration',0) for r in rows])
+        _console().print(f"[bold]Total: {format_seconds(total)}[/bold]")
 
 def show_paused():
     paused = storage.list_paused()
     if not paused:
         print('No paused tasks.')
         return
+    from rich.table import Table
     table = Table(title='Paused Tasks')
     table.add_column('ID', justify='right')
     table.add_column('Task')
@@ -59,74 +56,95 @@ def show_paused():
     table.add_column('Notes')
     for p in paused:
         table.add_row(str(p['id']), p.get('task_name',''), p.get('category','') or '', format_seconds(p.get('elapsed',0)), p.get('notes','') or '')
-    console.print(table)
+    _console().print(table)
 
-def view_day(date_str=''):
-    import datetime as _dt
-    if not date_str:
-        date_str = _dt.date.today().isoformat()
+DAY_FIELDS = ('id', 'task_name', 'category', 'status', 'start_time', 'end_time', 'duration', 'notes')
+DAY_FORMATS = ('table', 'tsv', 'json')
+# Rows per rich table when a day is printed as a table; each page is rendered
+# and flushed before the next is read from the cursor.
+PAGE_SIZE = 200
 
-    # 1) Completed tasks from SQLite
-    rows = storage.get_tasks_for_date(date_str)
-    for r in rows:
-        if 'status' not in r or not r.get('status'):
-            r['status'] = 'completed'
+def _sort_key(r):
+    return (r.get('start_time') or '', r.get('id', 0))
 
-    # 2) Paused tasks
-    paused = storage.list_paused()
-    for p in paused:
-        if p.get('date') == date_str:
-            rows.append({
-                'id': p.get('id'),
-                'task_name': p.get('task_name'),
-                'category': p.get('category',''),
-                'start_time': p.get('start_time',''),
-                'end_time': '',
-                'duration': int(p.get('elapsed',0)),
-                'notes': p.get('notes','') or '',
-                'status': 'paused'
-            })
-
-    # 3) Active task
+def _live_rows(date_str):
+    """Paused and active tasks of date_str as day rows, sorted like the tasks query."""
+    rows = [p.for_day() for p in storage.list_paused() if p.date == date_str]
     active = storage.load_active()
-    if active and active.get('date') == date_str:
-        start = _dt.datetime.fromisoformat(active['start_time'])
-        elapsed = int((_dt.datetime.now() - start).total_seconds())
-        rows.append({
-            'id': active.get('id'),
-            'task_name': active.get('task_name'),
-            'category': active.get('category',''),
-            'start_time': active.get('start_time'),
-            'end_time': '',
-            'duration': elapsed,
-            'notes': active.get('notes','') or '',
-            'status': 'active'
-        })
-
-    # sort chronologically
-    def _sort_key(r):
-        st = r.get('start_time') or ''
-        return (st, r.get('id', 0))
-    rows_sorted = sorted(rows, key=_sort_key)
-    print_tasks_table(rows_sorted)
+    if active and active.date == date_str:
+        rows.append(active.for_day())
+    return sorted(rows, key=_sort_key)
+
+def iter_day(date_str, limit=None, offset=0):
+    """Yield completed, paused and active rows of a day in chronological order.
+
+    The tasks cursor is already sorted, so it is merged with the few live rows
+    instead of sorting everything in memory.
+    """
+    import heapq
+    completed = storage.iter_tasks_for_date(date_str)
+    rows = heapq.merge(completed, _live_rows(date_str), key=_sort_key)
+    stop = offset + limit if limit is not None else None
+    for r in itertools.islice(rows, offset, stop):
+        if not r.get('status'):
+            r['status'] = 'completed'
+        yield r
+
+def _tsv_field(value):
+    return '' if value is None else str(value).replace('\t', ' ').replace('\n', ' ')
+
+def write_day(rows, fmt, out=None):
+    """Write day rows as TSV (header first) or a JSON array, one row at a time."""
+    out = out or sys.stdout
+    if fmt == 'tsv':
+        out.write('\t'.join(DAY_FIELDS) + '\n')
+        for r in rows:
+            out.write('\t'.join(_tsv_field(r.get(k)) for k in DAY_FIELDS) + '\n')
+        return
+    sep = '\n'
+    out.write('[')
+    for r in rows:
+        out.write(sep + json.dumps({k: r.get(k) for k in DAY_FIELDS}, ensure_ascii=False))
+        sep = ',\n'
+    out.write('\n]\n')
+
+def view_day(date_str='', fmt='table', limit=None, offset=0):
+    if not date_str:
+        date_str = datetime.date.today().isoformat()
+    rows = iter_day(date_str, limit, offset)
+    if fmt != 'table':
+        write_day(rows, fmt)
+        return
+    page = list(itertools.islice(rows, PAGE_SIZE))
+    if len(page) < PAGE_SIZE:
+        print_tasks_table(page)
+        return
+    # Large day: print it a page at a time with a running total at the end.
+    total, first = 0, offset + 1
+    while page:
+        title = f"Tasks for the day (rows {first}-{first + len(page) - 1})"
+        print_tasks_table(page, title=title, show_total=False)
+        total += sum(r.get('duration') or 0 for r in page)
+        first += len(page)
+        page = list(itertools.islice(rows, PAGE_SIZE))
+    _console().print(f"[bold]Total: {format_seconds(total)}[/bold]")
 
 def view_week(date_str=''):
-    import datetime
     if not date_str:
         date_str = datetime.date.today().isoformat()
     rows = storage.get_weekly_summary(date_str)
     if not rows:
         print('No data for this week.')
         return
+    from rich.table import Table
     table = Table(title=f'Week summary')
     table.add_column('Date')
     table.add_column('Total (seconds)', justify='right')
     for r in rows:
         table.add_row(r['date'], str(r.get('total') or 0))
-    console.print(table)
+    _console().print(table)
 
 def view_month(year=None, month=None):
-    import datetime
     if not year or not month:
         today = datetime.date.today()
         year = today.year
@@ -135,9 +153,27 @@ def view_month(year=None, month=None):
     if not rows:
         print('No data for this month.') 
         return
+    from rich.table import Table
     table = Table(title=f'Month summary {year}-{month:02d}')
     table.add_column('Date')
     table.add_column('Total (seconds)', justify='right')
     for r in rows:
         table.add_row(r['date'], str(r.get('total') or 0))
-    console.print(table)
+    _console().print(table)
+
+
+def rollup(action='check'):
+    if action == 'rebuild':
+        storage.rebuild_rollup()
+        print('Rollup rebuilt from tasks.')
+        return
+    bad = storage.check_rollup()
+    if not bad:
+        print('Rollup is consistent with tasks.')
+        return
+    print(f'{len(bad)} rollup entries differ from tasks (run: trackme rollup rebuild)')
+    for date, category, have, want in bad:
+        print(f'  {date} {category or "-"}: rollup={have} tasks={want}')
+
+if profiling.enabled:
+    profiling.wrap_renderers(sys.modules[__name__])